@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Adaptive sampling rate for the vision readers
+
+The display only changes when someone (or a schedule) presses a button, so
+a fixed sampling interval is either too slow right after a change or
+wasteful for the rest of the night. AdaptiveSampler samples at
+min_interval for a burst of samples after an actuation or whenever the
+change gate sees the digits change. It then backs off exponentially
+towards max_interval while the display stays the same.
+
+Processes that do not call actuate_servo themselves (the standalone vision
+service) learn about actuations through a signal file that main.py
+touches; the sampler checks its modification time while waiting.
+
+    sampler = AdaptiveSampler(min_interval=5, max_interval=300)
+    while sampler.wait(stop_event):
+        result = read_frame()
+        sampler.observe(changed=result.get('display_changed', False))
+"""
+
+import os
+import threading
+import time
+
+MIN_INTERVAL = 3  # Seconds between samples during a burst
+MAX_INTERVAL = 300  # Slowest rate once the display has been stable for a while
+BURST_SAMPLES = 5  # Samples taken at MIN_INTERVAL after a trigger
+BACKOFF_FACTOR = 1.5
+ACTUATION_SIGNAL_FILE = "/var/tmp/thermostat_last_actuation"
+SIGNAL_POLL_INTERVAL = 1  # Seconds between checks of the signal file while waiting
+
+
+def signal_actuation(path=ACTUATION_SIGNAL_FILE):
+    """Tell samplers in other processes that a button was just pressed"""
+    try:
+        with open(path, 'a'):
+            os.utime(path, None)
+    except OSError:
+        pass
+
+
+class AdaptiveSampler:
+    """Burst after changes, exponential backoff while the display is stable"""
+
+    def __init__(self, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, burst_samples=BURST_SAMPLES,
+                 backoff_factor=BACKOFF_FACTOR, signal_file=None):
+        """
+        Args:
+            min_interval: Seconds between samples during a burst (the fastest rate)
+            max_interval: Longest interval the backoff reaches (the slowest rate)
+            burst_samples: Samples taken at min_interval after a trigger
+            backoff_factor: Interval multiplier for each unchanged sample after a burst
+            signal_file: Optional file whose modification triggers a burst (see signal_actuation)
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Need 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.burst_samples = burst_samples
+        self.backoff_factor = backoff_factor
+        self.signal_file = signal_file
+        self.signal_seen = self._signal_mtime()
+        self.interval = min_interval
+        self.burst_remaining = burst_samples  # Start fast, nothing is known yet
+        self.last_sample = 0
+        self.condition = threading.Condition()
+        self.stats = {'samples': 0, 'changed': 0, 'bursts': {}}
+        self.last_burst = None
+
+    def _signal_mtime(self):
+        if not self.signal_file:
+            return None
+        try:
+            return os.path.getmtime(self.signal_file)
+        except OSError:
+            return None
+
+    def burst(self, reason):
+        """Sample at min_interval for the next burst_samples samples"""
+        with self.condition:
+            self.interval = self.min_interval
+            self.burst_remaining = self.burst_samples
+            self.stats['bursts'][reason] = self.stats['bursts'].get(reason, 0) + 1
+            self.last_burst = {'reason': reason, 'time': time.time()}
+            # Cut short a long backoff wait
+            self.condition.notify_all()
+
+    def observe(self, changed):
+        """Record the outcome of a sample: whether the display had changed since the last one"""
+        with self.condition:
+            self.stats['samples'] += 1
+        if changed:
+            with self.condition:
+                self.stats['changed'] += 1
+            self.burst('change')
+            return
+        with self.condition:
+            if self.burst_remaining > 0:
+                self.burst_remaining -= 1
+            else:
+                self.interval = min(self.max_interval, self.interval * self.backoff_factor)
+
+    def seconds_until_due(self):
+        with self.condition:
+            return max(0.0, self.last_sample + self.interval - time.monotonic())
+
+    def due(self):
+        """True if a sample should be taken now (for callers that are offered frames)"""
+        self._check_signal()
+        return self._claim()
+
+    def _claim(self):
+        # The interval runs from when a sample is taken, not from when its result comes back
+        with self.condition:
+            now = time.monotonic()
+            if now < self.last_sample + self.interval:
+                return False
+            self.last_sample = now
+            return True
+
+    def _check_signal(self):
+        mtime = self._signal_mtime()
+        if mtime is not None and mtime != self.signal_seen:
+            self.signal_seen = mtime
+            self.burst('actuation')
+
+    def wait(self, stop_event=None):
+        """
+        Block until the next sample is due
+
+        Returns:
+            bool: False if stop_event was set while waiting
+        """
+        while stop_event is None or not stop_event.is_set():
+            self._check_signal()
+            if self._claim():
+                return True
+            remaining = self.seconds_until_due()
+            if self.signal_file or stop_event is not None:
+                # Wake regularly to notice the signal file and shutdown
+                remaining = min(remaining, SIGNAL_POLL_INTERVAL)
+            with self.condition:
+                self.condition.wait(remaining)
+        return False
+
+    def get_stats(self):
+        """Current (effective) interval and rate plus trigger counts"""
+        with self.condition:
+            return {
+                'effective_interval': round(self.interval, 2),
+                'effective_rate_per_min': round(60.0 / self.interval, 2),
+                'min_interval': self.min_interval,
+                'max_interval': self.max_interval,
+                'burst_remaining': self.burst_remaining,
+                'next_sample_in': round(max(0.0, self.last_sample + self.interval - time.monotonic()), 2),
+                'samples': self.stats['samples'],
+                'changed': self.stats['changed'],
+                'bursts': dict(self.stats['bursts']),
+                'last_burst': dict(self.last_burst) if self.last_burst else None,
+            }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark against a simulated Pi Zero
+
+Starts pi_zero_simulator.py and main.py (pointed at the simulator, not in
+--simulate mode) in a scratch directory, then drives realistic workloads:
+
+  - users changing the setpoint and mode while the UI polls status
+  - several schedules firing in the same minute
+
+and reports end-to-end request latency, lock/timeout errors, how late
+scheduled actuations completed, and whether the simulated display ended
+up agreeing with what main.py believes.
+
+    python benchmarks/e2e_latency_benchmark.py --users 4 --ops 10 --schedules 3
+    python benchmarks/e2e_latency_benchmark.py --press-latency 1.5 --hang-rate 0.05
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_DIR)
+
+from scheduler import LOCAL_TIMEZONE
+
+MAIN_PY = os.path.join(REPO_DIR, 'main.py')
+SIMULATOR_PY = os.path.join(REPO_DIR, 'pi_zero_simulator.py')
+
+POLL_ENDPOINTS = ['/set_temperature', '/current_mode', '/time_since_last_action', '/get_scheduled_events']
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Summarize (latency_ms, status) samples for one operation type"""
+    latencies = [latency for latency, _ in samples]
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'count': len(samples),
+        'statuses': statuses,
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'latency_max_ms': max(latencies) if latencies else None,
+    }
+
+
+def wait_for_health(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+class Recorder:
+    """Thread-safe collection of latency samples by operation name"""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def timed(self, name, func):
+        start = time.perf_counter()
+        try:
+            status = func().status_code
+        except requests.Timeout:
+            status = 'timeout'
+        except requests.RequestException:
+            status = 'connection_error'
+        latency = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.samples.setdefault(name, []).append((latency, status))
+        return status
+
+    def report(self):
+        with self.lock:
+            return {name: summarize(samples) for name, samples in self.samples.items()}
+
+
+def user_workload(base_url, recorder, ops, rng, think_time):
+    """One user nudging the setpoint and occasionally switching mode while polling"""
+    session = requests.Session()
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.5:
+            target = rng.randint(68, 78)
+            recorder.timed('set_temperature', lambda: session.post(
+                f"{base_url}/set_temperature", json={'temperature': target}, timeout=60))
+        elif roll < 0.6:
+            mode = rng.choice(['heat', 'cool'])
+            recorder.timed('set_mode', lambda: session.post(
+                f"{base_url}/set_mode", json={'mode': mode}, timeout=60))
+        else:
+            path = rng.choice(POLL_ENDPOINTS)
+            recorder.timed(f"GET {path}", lambda: session.get(f"{base_url}{path}", timeout=10))
+        time.sleep(rng.uniform(0, think_time))
+
+
+def create_schedules(base_url, count, rng):
+    """Create `count` schedules that all fire at the start of the next usable minute"""
+    now = datetime.datetime.now(LOCAL_TIMEZONE)
+    target = (now + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
+    if (target - now).total_seconds() < 15:
+        target += datetime.timedelta(minutes=1)
+
+    schedule_ids = []
+    for _ in range(count):
+        response = requests.post(f"{base_url}/set_schedule", json={
+            'time': target.strftime('%H:%M'),
+            'temperature': rng.randint(66, 80),
+            'mode': rng.choice(['heat', 'cool']),
+            'days_of_week': 'daily',
+        }, timeout=10)
+        response.raise_for_status()
+        schedule_ids.append(response.json()['schedule_id'])
+    return target, schedule_ids
+
+
+def schedule_results(base_url, target, schedule_ids, timeout):
+    """Wait for every schedule to record an execution and report completion lateness"""
+    deadline = time.time() + timeout
+    history = {}
+    while time.time() < deadline and len(history) < len(schedule_ids):
+        for schedule_id in schedule_ids:
+            if schedule_id in history:
+                continue
+            entries = requests.get(f"{base_url}/schedule_history/{schedule_id}", timeout=10).json()
+            if entries:
+                history[schedule_id] = entries[-1]
+        time.sleep(1)
+
+    lateness = []
+    successes = 0
+    for entry in history.values():
+        # execution_history timestamps are SQLite CURRENT_TIMESTAMP (UTC, whole seconds)
+        executed_at = datetime.datetime.strptime(entry['executed_at'], '%Y-%m-%d %H:%M:%S').replace(
+            tzinfo=datetime.timezone.utc)
+        lateness.append((executed_at - target).total_seconds())
+        successes += entry['success']
+
+    return {
+        'scheduled': len(schedule_ids),
+        'executed': len(history),
+        'succeeded': successes,
+        'target': target.isoformat(),
+        'completion_lateness_p50_s': percentile(lateness, 50),
+        'completion_lateness_max_s': max(lateness) if lateness else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive main.py against a simulated Pi Zero and report latencies")
+    parser.add_argument('--users', type=int, default=4, help='Concurrent simulated users')
+    parser.add_argument('--ops', type=int, default=10, help='Operations per user')
+    parser.add_argument('--think-time', type=float, default=2.0, help='Maximum pause between user operations')
+    parser.add_argument('--schedules', type=int, default=3, help='Schedules firing in the same minute (0 to skip)')
+    parser.add_argument('--press-latency', type=float, default=1.5, help='Simulated seconds per button press')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Press latency standard deviation')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of presses that fail')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Fraction of presses that outlast the timeout')
+    parser.add_argument('--main-port', type=int, default=5077, help='Port for main.py')
+    parser.add_argument('--sim-port', type=int, default=5078, help='Port for the Pi Zero simulator')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix='e2e_bench_')
+    main_url = f"http://127.0.0.1:{args.main_port}"
+    sim_url = f"http://127.0.0.1:{args.sim_port}"
+
+    sim_log = open(os.path.join(work_dir, 'simulator.out'), 'w')
+    main_log = open(os.path.join(work_dir, 'main.out'), 'w')
+    simulator = subprocess.Popen([
+        sys.executable, SIMULATOR_PY, '--port', str(args.sim_port),
+        '--press-latency', str(args.press_latency), '--jitter', str(args.jitter),
+        '--failure-rate', str(args.failure_rate), '--hang-rate', str(args.hang_rate),
+        '--seed', str(args.seed),
+    ], cwd=work_dir, stdout=sim_log, stderr=subprocess.STDOUT)
+    server = subprocess.Popen([
+        sys.executable, MAIN_PY, '--host', '127.0.0.1', '--port', str(args.main_port),
+        '--pi-zero-host', sim_url,
+    ], cwd=work_dir, stdout=main_log, stderr=subprocess.STDOUT)
+
+    try:
+        if not wait_for_health(sim_url) or not wait_for_health(main_url):
+            print(f"Servers did not start, see {work_dir}", file=sys.stderr)
+            return 1
+
+        recorder = Recorder()
+
+        # Both sides start in OFF; switch to HEAT so setpoint changes actuate
+        recorder.timed('set_mode', lambda: requests.post(f"{main_url}/set_mode", json={'mode': 'heat'}, timeout=60))
+
+        target = schedule_ids = None
+        if args.schedules:
+            target, schedule_ids = create_schedules(main_url, args.schedules, rng)
+            print(f"Created {len(schedule_ids)} schedules for {target.strftime('%H:%M')}", file=sys.stderr)
+
+        print(f"Running {args.users} users x {args.ops} operations...", file=sys.stderr)
+        users = [
+            threading.Thread(target=user_workload,
+                             args=(main_url, recorder, args.ops, random.Random(rng.random()), args.think_time))
+            for _ in range(args.users)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+
+        report = {
+            'benchmark': 'e2e_latency',
+            'config': vars(args),
+            'operations': recorder.report(),
+        }
+
+        if schedule_ids:
+            wait = max(0, (target - datetime.datetime.now(LOCAL_TIMEZONE)).total_seconds())
+            print(f"Waiting {wait:.0f}s for schedules to fire...", file=sys.stderr)
+            report['schedules'] = schedule_results(main_url, target, schedule_ids, timeout=wait + 180)
+
+        display = requests.get(f"{sim_url}/display_state", timeout=10).json()
+        believed_mode = requests.get(f"{main_url}/current_mode", timeout=10).json()['current_mode']
+        believed_temp = requests.get(f"{main_url}/set_temperature", timeout=10).json()['desired_temperature']
+        report['consistency'] = {
+            'display': display,
+            'main_mode': believed_mode,
+            'main_desired_temperature': believed_temp,
+            'mode_matches': display['mode'] == believed_mode,
+            'setpoint_matches': display['setpoint'] == believed_temp,
+        }
+        report['simulator'] = requests.get(f"{sim_url}/health", timeout=10).json()['stats']
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+
+        for name, summary in report['operations'].items():
+            print(f"{name:>32}: n={summary['count']:<4} p50 {summary['latency_p50_ms']:8.0f} ms  "
+                  f"p95 {summary['latency_p95_ms']:8.0f} ms  {summary['statuses']}", file=sys.stderr)
+        return 0
+    finally:
+        for process in (server, simulator):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        sim_log.close()
+        main_log.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
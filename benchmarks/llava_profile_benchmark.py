@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Latency, memory and accuracy of the LLaVA inference profiles
+
+Each profile from llava_docker_service.INFERENCE_PROFILES is loaded in its
+own subprocess, so resident memory is measured without interference from
+the other profiles. It is run over the same labeled frames. Profiles that
+square their input (int8) are fed the calibrated display ROI, as
+local_vision_ai_docker sends it; the fp32 baseline gets the full frame, as
+before. Needs torch and transformers, so run it in the LLaVA container or
+an equivalent environment.
+
+    python benchmarks/llava_profile_benchmark.py --count 30
+    python benchmarks/llava_profile_benchmark.py --corpus corpus/ --profiles fp32 int8 --output llava.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_DIR)
+
+from synthetic_frames import FrameGenerator, load_corpus
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def memory_mb():
+    """Current and peak resident set size of this process, in MB (Linux)"""
+    usage = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                key, value = line.split(':')
+                usage[key] = int(value.split()[0]) / 1024
+    return usage.get('VmRSS'), usage.get('VmHWM')
+
+
+def load_samples(args):
+    """Return a list of (jpeg_bytes, frame, setpoint)"""
+    if args.corpus:
+        samples = []
+        for entry in load_corpus(args.corpus)[:args.count]:
+            with open(entry['path'], 'rb') as f:
+                jpeg = f.read()
+            samples.append((jpeg, cv2.imread(entry['path'], cv2.IMREAD_GRAYSCALE), entry['setpoint']))
+        return samples
+
+    generator = FrameGenerator(seed=args.seed, severity=args.severity)
+    samples = []
+    for _ in range(args.count):
+        jpeg, label = generator.generate_jpeg()
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        samples.append((jpeg, frame, label.setpoint))
+    return samples
+
+
+def run_profile(args):
+    """Evaluate one profile in this process and print a JSON summary"""
+    from display_calibration import calibrate_display
+    from llava_docker_service import LLaVAModel
+
+    samples = load_samples(args)
+    rss_before, _ = memory_mb()
+    model = LLaVAModel(profile=args.run_profile)
+    start = time.perf_counter()
+    if not model.load_model():
+        print(json.dumps({'error': 'model failed to load'}))
+        return 1
+    load_seconds = time.perf_counter() - start
+    rss_loaded, _ = memory_mb()
+
+    calibration = calibrate_display(samples[0][1]) if model.settings['square_input'] else None
+    latencies = []
+    correct = confident = 0
+    for jpeg, frame, setpoint in samples:
+        if calibration is not None:
+            jpeg = cv2.imencode('.jpg', calibration.crop(frame, region='display'))[1].tobytes()
+        start = time.perf_counter()
+        result = model.extract_temperature(jpeg)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += result.get('temperature') == setpoint
+        confident += result.get('confidence') in ('HIGH', 'MEDIUM')
+
+    _, rss_peak = memory_mb()
+    total = len(samples)
+    print(json.dumps({
+        'profile': args.run_profile,
+        'model_id': model.model_id,
+        'input': 'calibrated ROI' if calibration is not None else 'full frame',
+        'frames': total,
+        'accuracy': correct / total if total else None,
+        'confident_rate': confident / total if total else None,
+        'load_seconds': load_seconds,
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'rss_model_mb': rss_loaded - rss_before,
+        'rss_peak_mb': rss_peak,
+    }))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LLaVA inference profiles")
+    parser.add_argument('--profiles', nargs='+', default=['fp32', 'int8'], help='Profiles to compare')
+    parser.add_argument('--corpus', help='Corpus directory with labels.jsonl (default: generate frames)')
+    parser.add_argument('--count', type=int, default=30, help='Frames per profile')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for generated frames')
+    parser.add_argument('--severity', type=float, default=0.3, help='Degradation severity for generated frames')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--run-profile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        return run_profile(args)
+
+    results = {}
+    for profile in args.profiles:
+        print(f"Evaluating {profile} on {args.count} frames...", file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), '--run-profile', profile,
+                   '--count', str(args.count), '--seed', str(args.seed), '--severity', str(args.severity)]
+        if args.corpus:
+            command += ['--corpus', args.corpus]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        lines = completed.stdout.strip().splitlines()
+        try:
+            results[profile] = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            results[profile] = {'error': completed.stderr.strip()[-500:]}
+
+    baseline = results.get('fp32', {})
+    for profile, result in results.items():
+        if profile != 'fp32' and baseline.get('latency_p50_ms') and result.get('latency_p50_ms'):
+            result['speedup_vs_fp32'] = baseline['latency_p50_ms'] / result['latency_p50_ms']
+            result['memory_ratio_vs_fp32'] = result['rss_model_mb'] / baseline['rss_model_mb']
+
+    report = {'benchmark': 'llava_profiles',
+              'corpus': args.corpus or f"synthetic seed={args.seed} severity={args.severity}",
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Scheduler scalability benchmark
+
+Generates synthetic schedules (10, 1k and 10k by default) with mixed
+days_of_week against a throwaway database and measures how
+ThermostatScheduler behaves as the schedule count grows:
+
+  - startup time (lease acquisition plus _load_all_schedules)
+  - create / update / delete throughput
+  - get_schedules latency
+  - RSS growth and thread count after loading
+  - timer firing accuracy while the scheduler is under load
+
+Results are written as JSON and can be compared against a stored baseline.
+Each report records the commit it was run at. Baselines are machine and
+commit specific, so regenerate them on the target hardware after changing
+what the scheduler does:
+
+    python benchmarks/scheduler_benchmark.py --save-baseline
+    python benchmarks/scheduler_benchmark.py --compare
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import scheduler as scheduler_module
+from scheduler import ThermostatScheduler, LOCAL_TIMEZONE, VALID_MODES, MIN_TEMPERATURE, MAX_TEMPERATURE
+
+DEFAULT_SIZES = [10, 1000, 10000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'scheduler_baseline.json')
+
+DAYS_OF_WEEK_CHOICES = [
+    'daily',
+    'weekdays',
+    'weekends',
+    'monday,wednesday,friday',
+    'tuesday,thursday',
+    'saturday',
+    'sunday,monday',
+]
+
+# name -> (direction, absolute noise floor). Direction is 'lower' or 'higher'
+# depending on which way is better; differences smaller than the floor are
+# never reported as regressions.
+METRICS = {
+    'load_seconds': ('lower', 0.05),
+    'create_ops_per_sec': ('higher', 5.0),
+    'update_ops_per_sec': ('higher', 5.0),
+    'delete_ops_per_sec': ('higher', 5.0),
+    'get_schedules_p50_ms': ('lower', 1.0),
+    'get_schedules_p95_ms': ('lower', 2.0),
+    'rss_delta_mb': ('lower', 2.0),
+    'threads_after_load': ('lower', 2),
+    'timer_lateness_p50_ms': ('lower', 5.0),
+    'timer_lateness_p95_ms': ('lower', 10.0),
+    'timer_lateness_max_ms': ('lower', 20.0),
+}
+
+
+class InstrumentedScheduler(ThermostatScheduler):
+    """ThermostatScheduler that records when probe timers actually fire"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.probe_targets = {}
+        self.probe_fired = {}
+        self.probe_finished = set()
+        self.probes_done = threading.Event()
+
+    def _execute_schedule(self, schedule_id: str):
+        is_probe = schedule_id in self.probe_targets and schedule_id not in self.probe_fired
+        if is_probe:
+            self.probe_fired[schedule_id] = time.time()
+        try:
+            super()._execute_schedule(schedule_id)
+        finally:
+            if is_probe:
+                # Only signal once the execution has finished touching the DB
+                self.probe_finished.add(schedule_id)
+                if len(self.probe_finished) == len(self.probe_targets):
+                    self.probes_done.set()
+
+
+def current_rss_mb():
+    """Return the current resident set size in MB (Linux), or None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def random_schedule(rng):
+    """Build a random (time, temperature, mode, days_of_week) tuple"""
+    time_str = f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+    temperature = rng.randint(MIN_TEMPERATURE, MAX_TEMPERATURE)
+    mode = rng.choice(VALID_MODES)
+    days_of_week = rng.choice(DAYS_OF_WEEK_CHOICES)
+    return time_str, temperature, mode, days_of_week
+
+
+def populate_database(sched, count, rng):
+    """Bulk insert synthetic schedules directly, bypassing timer creation"""
+    rows = []
+    for i in range(count):
+        time_str, temperature, mode, days_of_week = random_schedule(rng)
+        next_execution = sched._calculate_next_execution(time_str, days_of_week)
+        rows.append((f"bench-{i:06d}", time_str, temperature, mode, days_of_week, next_execution.isoformat()))
+
+    with scheduler_module.get_db_connection() as conn:
+        conn.executemany('''
+            INSERT INTO schedules (id, time, temperature, mode, enabled, days_of_week, next_execution)
+            VALUES (?, ?, ?, ?, 1, ?, ?)
+        ''', rows)
+        conn.commit()
+
+
+def measure_crud(sched, ops, rng):
+    """Measure create, update and delete throughput in operations per second"""
+    created = []
+    start = time.perf_counter()
+    for _ in range(ops):
+        time_str, temperature, mode, days_of_week = random_schedule(rng)
+        created.append(sched.create_schedule(time_str, temperature, mode, days_of_week))
+    create_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for schedule_id in created:
+        time_str, temperature, _, days_of_week = random_schedule(rng)
+        sched.update_schedule(schedule_id, time=time_str, temperature=temperature, days_of_week=days_of_week)
+    update_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for schedule_id in created:
+        sched.delete_schedule(schedule_id)
+    delete_elapsed = time.perf_counter() - start
+
+    return {
+        'create_ops_per_sec': ops / create_elapsed if create_elapsed else None,
+        'update_ops_per_sec': ops / update_elapsed if update_elapsed else None,
+        'delete_ops_per_sec': ops / delete_elapsed if delete_elapsed else None,
+    }
+
+
+def measure_get_schedules(sched, repeats):
+    """Measure get_schedules latency in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        sched.get_schedules()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'get_schedules_p50_ms': percentile(samples, 50),
+        'get_schedules_p95_ms': percentile(samples, 95),
+    }
+
+
+def measure_timer_accuracy(sched, probes, lead_seconds):
+    """
+    Fire a batch of probe timers while another thread hammers get_schedules
+    and report how late each one started executing.
+    """
+    now = datetime.datetime.now(LOCAL_TIMEZONE)
+    far_future = (now + datetime.timedelta(days=1)).isoformat()
+    probe_ids = [f"probe-{i:04d}" for i in range(probes)]
+
+    with scheduler_module.get_db_connection() as conn:
+        conn.executemany('''
+            INSERT INTO schedules (id, time, temperature, mode, enabled, days_of_week, next_execution, last_executed)
+            VALUES (?, '12:00', 70, 'off', 1, 'daily', ?, ?)
+        ''', [(probe_id, far_future, far_future) for probe_id in probe_ids])
+        conn.commit()
+
+    stop_load = threading.Event()
+
+    def background_load():
+        while not stop_load.is_set():
+            sched.get_schedules()
+
+    load_thread = threading.Thread(target=background_load, daemon=True)
+    load_thread.start()
+
+    for i, probe_id in enumerate(probe_ids):
+        target = now + datetime.timedelta(seconds=lead_seconds + i * 0.01)
+        sched.probe_targets[probe_id] = target.timestamp()
+        sched._schedule_timer(probe_id, target)
+
+    sched.probes_done.wait(timeout=lead_seconds + 30)
+    stop_load.set()
+    load_thread.join(timeout=30)
+
+    lateness = [
+        (sched.probe_fired[probe_id] - sched.probe_targets[probe_id]) * 1000
+        for probe_id in probe_ids if probe_id in sched.probe_fired
+    ]
+    return {
+        'timer_probes_fired': len(lateness),
+        'timer_lateness_p50_ms': percentile(lateness, 50),
+        'timer_lateness_p95_ms': percentile(lateness, 95),
+        'timer_lateness_max_ms': max(lateness) if lateness else None,
+    }
+
+
+def run_size(size, args):
+    """Run every measurement for a single schedule count against a fresh DB"""
+    rng = random.Random(args.seed + size)
+    tmp_dir = tempfile.mkdtemp(prefix='scheduler_bench_')
+    scheduler_module.DB_PATH = os.path.join(tmp_dir, 'thermostat_schedules.db')
+
+    sched = InstrumentedScheduler(temperature_callback=lambda temp: True,
+                                  mode_callback=lambda mode: True)
+    try:
+        populate_database(sched, size, rng)
+
+        threads_before = threading.active_count()
+        rss_before = current_rss_mb()
+
+        # Taking the lease is what loads every schedule and arms its timer
+        start = time.perf_counter()
+        sched._renew_lease()
+        load_seconds = time.perf_counter() - start
+        sched.lease_thread = threading.Thread(target=sched._maintain_lease, daemon=True)
+        sched.lease_thread.start()
+
+        rss_after = current_rss_mb()
+        result = {
+            'schedules': size,
+            'is_leader': sched.is_leader,
+            'load_seconds': load_seconds,
+            'active_timers': len(sched.active_timers),
+            'threads_before_load': threads_before,
+            'threads_after_load': threading.active_count(),
+            'rss_delta_mb': (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+        }
+        result.update(measure_crud(sched, min(size, args.crud_ops), rng))
+        result.update(measure_get_schedules(sched, args.get_repeats))
+        result.update(measure_timer_accuracy(sched, args.probes, args.probe_lead))
+        return result
+    finally:
+        sched.stop()
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+
+def git_commit():
+    """Short hash of the checked-out commit (with -dirty for local changes), or None"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(results, baseline, tolerance):
+    """
+    Compare results against a baseline and return a list of regressions.
+
+    A metric regresses when it is worse than the baseline by more than
+    `tolerance` (relative) and by more than the metric's noise floor. The
+    table goes to stderr so stdout stays parseable JSON.
+    """
+    regressions = []
+    print(f"\nBaseline taken at commit {baseline.get('commit') or 'unknown'} on {baseline.get('timestamp')}",
+          file=sys.stderr)
+    print(f"{'size':>6}  {'metric':<24} {'baseline':>12} {'current':>12} {'change':>8}", file=sys.stderr)
+    print("-" * 68, file=sys.stderr)
+    for size, current in results.items():
+        base = baseline.get('results', {}).get(size)
+        if not base:
+            print(f"{size:>6}  (no baseline)", file=sys.stderr)
+            continue
+        for metric, (direction, floor) in METRICS.items():
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            delta = new - old
+            worse = delta > 0 if direction == 'lower' else delta < 0
+            change = (delta / old * 100) if old else 0.0
+            flag = ''
+            if worse and abs(delta) > floor and abs(delta) > tolerance * abs(old):
+                flag = '  REGRESSION'
+                regressions.append({'size': size, 'metric': metric, 'baseline': old, 'current': new})
+            print(f"{size:>6}  {metric:<24} {old:>12.2f} {new:>12.2f} {change:>+7.1f}%{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ThermostatScheduler as schedule count grows")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Schedule counts to test')
+    parser.add_argument('--crud-ops', type=int, default=200, help='Create/update/delete operations per size')
+    parser.add_argument('--get-repeats', type=int, default=20, help='get_schedules calls per size')
+    parser.add_argument('--probes', type=int, default=20, help='Probe timers used to measure firing accuracy')
+    parser.add_argument('--probe-lead', type=float, default=2.0, help='Seconds until the first probe fires')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed for synthetic schedules')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare against the baseline, exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Relative slack before flagging a regression')
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        print(f"Benchmarking {size} schedules...", file=sys.stderr)
+        results[str(size)] = run_size(size, args)
+
+    report = {
+        'benchmark': 'scheduler',
+        'timestamp': datetime.datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline found at {args.baseline}", file=sys.stderr)
+            return 2
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against baseline", file=sys.stderr)
+            return 1
+        print("\nNo regressions against baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
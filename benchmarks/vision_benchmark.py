@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency benchmark for the vision temperature readers
+
+Evaluates readers against a labeled corpus, either generated on the fly
+with synthetic_frames.FrameGenerator or loaded from a corpus directory
+written by `synthetic_frames.py corpus`. Readers that can decode an
+in-memory frame are timed on that path; the others read the JPEG from
+disk. --cascade also evaluates the backends as one cascade and reports
+how often each backend was consulted.
+
+    python benchmarks/vision_benchmark.py --backends seven_segment --count 500
+    python benchmarks/vision_benchmark.py --corpus corpus/ --backends seven_segment tesseract_simple --cascade
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from synthetic_frames import FrameGenerator, load_corpus
+from vision_reader import create_cascade, create_reader
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def load_samples(args):
+    """Return a list of (path, frame, label_dict) for the corpus"""
+    if args.corpus:
+        return [(entry['path'], cv2.imread(entry['path'], cv2.IMREAD_GRAYSCALE), entry)
+                for entry in load_corpus(args.corpus)[:args.count]]
+
+    generator = FrameGenerator(seed=args.seed, severity=args.severity)
+    tmp_dir = tempfile.mkdtemp(prefix='vision_bench_')
+    samples = []
+    for _ in range(args.count):
+        jpeg, label = generator.generate_jpeg()
+        path = os.path.join(tmp_dir, f"frame_{label.frame_id:06d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(jpeg)
+        samples.append((path, cv2.imread(path, cv2.IMREAD_GRAYSCALE),
+                        {'setpoint': label.setpoint, 'backlight': label.backlight}))
+    return samples
+
+
+def evaluate(backend, samples):
+    """Run one backend over every sample and summarize accuracy and latency"""
+    latencies = []
+    correct = confident = confident_correct = 0
+    for path, frame, label in samples:
+        start = time.perf_counter()
+        result = backend.read(image_path=path, frame=frame if backend.accepts_frames else None)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        is_correct = result.get('temperature') == label['setpoint']
+        correct += is_correct
+        if result.get('confidence') in ('HIGH', 'MEDIUM'):
+            confident += 1
+            confident_correct += is_correct
+
+    total = len(samples)
+    return {
+        'frames': total,
+        'accuracy': correct / total if total else None,
+        'confident_rate': confident / total if total else None,
+        'confident_precision': confident_correct / confident if confident else None,
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'frames_per_sec': total / (sum(latencies) / 1000) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vision readers on a labeled corpus")
+    parser.add_argument('--backends', nargs='+', default=['seven_segment'], help='Readers to evaluate')
+    parser.add_argument('--cascade', action='store_true', help='Also evaluate the backends as a cascade')
+    parser.add_argument('--corpus', help='Corpus directory with labels.jsonl (default: generate frames)')
+    parser.add_argument('--count', type=int, default=300, help='Frames to evaluate')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for generated frames')
+    parser.add_argument('--severity', type=float, default=0.5, help='Degradation severity for generated frames')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    args = parser.parse_args()
+
+    samples = load_samples(args)
+    results = {}
+    for name in args.backends:
+        try:
+            # Uncached, so repeated frames are really read
+            backend = create_reader(name, cache=False)
+            backend.load_model()
+        except Exception as e:
+            print(f"Skipping {name}: {e}", file=sys.stderr)
+            results[name] = {'error': str(e)}
+            continue
+        print(f"Evaluating {name} on {len(samples)} frames...", file=sys.stderr)
+        results[name] = evaluate(backend, samples)
+
+    if args.cascade:
+        available = [name for name in args.backends if 'error' not in results[name]]
+        # No rate limits, so the counts show what the cascade would ask of each backend
+        cascade = create_cascade(available, cache=False, min_intervals={})
+        print(f"Evaluating cascade {','.join(available)}...", file=sys.stderr)
+        results['cascade'] = evaluate(cascade, samples)
+        results['cascade']['stats'] = cascade.get_stats()
+
+    report = {'benchmark': 'vision', 'corpus': args.corpus or f"synthetic seed={args.seed} severity={args.severity}",
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for main.py
+
+Starts main.py in simulation mode once per server configuration (the
+Werkzeug dev server, then gunicorn in --production mode), drives the
+read-heavy endpoints the web UI polls with concurrent keep-alive clients,
+and reports throughput and latency for each so the two can be compared.
+
+Each server runs in a scratch working directory so its settings, log and
+schedule database do not touch the real ones.
+
+    python benchmarks/wsgi_load_test.py --clients 16 --duration 15
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MAIN_PY = os.path.join(REPO_DIR, 'main.py')
+
+# Endpoints polled by static/script.js, weighted roughly by how often it hits them
+ENDPOINTS = [
+    '/time_since_last_action',
+    '/current_mode',
+    '/set_temperature',
+    '/ambient_temperature',
+    '/temperature_settings',
+    '/get_scheduled_events',
+    '/health',
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def wait_for_server(base_url, timeout):
+    """Poll /health until the server answers or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def start_server(name, port, extra_args, work_dir):
+    """Launch main.py in simulation mode with the given server arguments"""
+    cmd = [sys.executable, MAIN_PY, '--simulate', '--host', '127.0.0.1', '--port', str(port)] + extra_args
+    log = open(os.path.join(work_dir, f'{name}_server.out'), 'w')
+    return subprocess.Popen(cmd, cwd=work_dir, stdout=log, stderr=subprocess.STDOUT), log
+
+
+def run_clients(base_url, clients, duration):
+    """Hammer the endpoints from `clients` threads for `duration` seconds"""
+    latencies = []
+    errors = [0]
+    results_lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(index):
+        session = requests.Session()  # keep-alive connection per client
+        local_latencies = []
+        local_errors = 0
+        i = index
+        while time.time() < stop_at:
+            path = ENDPOINTS[i % len(ENDPOINTS)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = session.get(f"{base_url}{path}", timeout=10)
+                if response.status_code >= 500:
+                    local_errors += 1
+            except requests.RequestException:
+                local_errors += 1
+                continue
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        with results_lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_sec': len(latencies) / elapsed if elapsed else None,
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'latency_p99_ms': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare main.py throughput under the dev and production servers")
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds to drive load per server')
+    parser.add_argument('--port', type=int, default=5055, help='Port to run the server under test on')
+    parser.add_argument('--workers', type=int, default=1, help='Production mode worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='Production mode threads per worker')
+    parser.add_argument('--keepalive', type=int, default=5, help='Production mode keep-alive seconds')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    args = parser.parse_args()
+
+    configurations = [
+        ('dev', []),
+        ('production', ['--production', '--workers', str(args.workers),
+                        '--threads', str(args.threads), '--keepalive', str(args.keepalive)]),
+    ]
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+
+    for name, extra_args in configurations:
+        work_dir = tempfile.mkdtemp(prefix=f'wsgi_load_{name}_')
+        process, log = start_server(name, args.port, extra_args, work_dir)
+        keep_work_dir = False
+        try:
+            if not wait_for_server(base_url, timeout=30):
+                keep_work_dir = True  # Leave the server log for a post-mortem
+                print(f"{name}: server did not come up, see {os.path.join(work_dir, f'{name}_server.out')}",
+                      file=sys.stderr)
+                results[name] = {'error': 'server did not start'}
+                continue
+            # Warm up connections and lazy imports before measuring
+            run_clients(base_url, args.clients, 1)
+            print(f"Driving {name} server for {args.duration:.0f}s with {args.clients} clients...", file=sys.stderr)
+            results[name] = run_clients(base_url, args.clients, args.duration)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            log.close()
+            if not keep_work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'benchmark': 'wsgi_load',
+        'clients': args.clients,
+        'duration': args.duration,
+        'production': {'workers': args.workers, 'threads': args.threads, 'keepalive': args.keepalive},
+        'results': results,
+    }
+    if 'requests_per_sec' in results.get('dev', {}) and 'requests_per_sec' in results.get('production', {}):
+        report['speedup'] = results['production']['requests_per_sec'] / results['dev']['requests_per_sec']
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for name, result in results.items():
+        if 'requests_per_sec' in result:
+            print(f"{name:>10}: {result['requests_per_sec']:8.1f} req/s  "
+                  f"p50 {result['latency_p50_ms']:.1f} ms  p95 {result['latency_p95_ms']:.1f} ms  "
+                  f"errors {result['errors']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Queued servo commands for the Pi Zero
+
+/actuate_servo used to hold the HTTP request open for the whole press
+(0.5 s hold and 1 s release per press), so a client timeout or dropped
+connection left the caller unsure whether the press landed. Instead a
+command (one servo, pressed `count` times) is queued and its id returned at
+once; a single worker thread presses in submission order and records when
+each press started and finished, which the caller polls with
+/commands/<id>:
+
+    {"id": ..., "state": "queued" | "running" | "done" | "failed" | "cancelled",
+     "count": 3, "presses": [{"started_at": ..., "finished_at": ...}, ...], ...}
+
+len(presses) is exactly the number of presses that landed; "ahead" is the
+number of presses queued before the command's first one when it was
+submitted, so a caller can size its deadline. A cancel stops a
+command before its next press; a press already under way still completes.
+
+This module only needs the standard library, so it is copied to the Pi Zero
+alongside pi_zero_servo_control.py (the simulator uses it too).
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+COMMAND_HISTORY = 200  # Finished commands kept for /commands/<id>
+FINISHED = ('done', 'failed', 'cancelled')
+
+
+class CommandQueue:
+    """Servo commands run one at a time on a worker thread, in submission order"""
+
+    def __init__(self, press, history=COMMAND_HISTORY):
+        """
+        Args:
+            press: Callable (servo, start_angle, target_angle) doing one press; raising fails the command
+            history: Number of commands kept for status queries
+        """
+        self.press = press
+        self.history = history
+        self.pending = queue.Queue()
+        self.commands = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'submitted': 0, 'done': 0, 'failed': 0, 'cancelled': 0, 'presses': 0, 'max_depth': 0}
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name='command-queue').start()
+        return self
+
+    def submit(self, servo, start_angle, target_angle, count=1):
+        """Queue a command and return its status"""
+        command = {
+            'id': uuid.uuid4().hex[:12],
+            'servo': servo,
+            'start_angle': start_angle,
+            'target_angle': target_angle,
+            'count': count,
+            'state': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'presses': [],
+            'error': None,
+            'cancel': False,
+        }
+        with self.lock:
+            # Presses still to run before this command's first one
+            command['ahead'] = sum(queued['count'] - len(queued['presses'])
+                                   for queued in self.commands.values() if queued['state'] not in FINISHED)
+            self.commands[command['id']] = command
+            self._trim()
+            self.stats['submitted'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self._depth())
+            status = self._status(command)
+        self.pending.put(command)
+        return status
+
+    def get(self, command_id):
+        """Status of a command, or None if unknown (or long finished)"""
+        with self.lock:
+            command = self.commands.get(command_id)
+            return self._status(command) if command else None
+
+    def cancel(self, command_id):
+        """Skip the command's remaining presses; returns its status, or None if unknown"""
+        with self.lock:
+            command = self.commands.get(command_id)
+            if command is None:
+                return None
+            if command['state'] == 'queued':
+                self._finish(command, 'cancelled')
+            elif command['state'] == 'running':
+                command['cancel'] = True
+            return self._status(command)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, depth=self._depth())
+
+    def _run(self):
+        while True:
+            command = self.pending.get()
+            with self.lock:
+                if command['state'] != 'queued':
+                    continue  # Cancelled while waiting
+                command['state'] = 'running'
+                command['started_at'] = time.time()
+            error = None
+            for _ in range(command['count']):
+                with self.lock:
+                    if command['cancel']:
+                        break
+                started_at = time.time()
+                try:
+                    self.press(command['servo'], command['start_angle'], command['target_angle'])
+                except Exception as e:
+                    error = str(e)
+                    break
+                with self.lock:
+                    command['presses'].append({'started_at': started_at, 'finished_at': time.time()})
+                    self.stats['presses'] += 1
+            with self.lock:
+                if error is not None:
+                    command['error'] = error
+                    self._finish(command, 'failed')
+                else:
+                    # A cancel that came after the last press skipped nothing
+                    self._finish(command, 'done' if len(command['presses']) == command['count'] else 'cancelled')
+            logging.info(f"Command {command['id']} {command['state']}: {len(command['presses'])} of "
+                         f"{command['count']} {command['servo']} presses"
+                         + (f" ({error})" if error else ""))
+
+    def _finish(self, command, state):
+        command['state'] = state
+        command['finished_at'] = time.time()
+        self.stats[state] += 1
+
+    def _depth(self):
+        return sum(1 for command in self.commands.values() if command['state'] not in FINISHED)
+
+    def _trim(self):
+        finished = [command_id for command_id, command in self.commands.items() if command['state'] in FINISHED]
+        for command_id in finished[:max(0, len(self.commands) - self.history)]:
+            del self.commands[command_id]
+
+    @staticmethod
+    def _status(command):
+        status = {key: value for key, value in command.items() if key != 'cancel'}
+        status['presses'] = list(command['presses'])
+        status['landed'] = len(command['presses'])
+        return status
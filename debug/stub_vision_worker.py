@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Stub vision worker speaking vision_worker's line protocol
+
+Reads {"id", "image_path", "prompt"} lines on stdin and answers
+{"id", "text"} on stdout, decoding the image with the seven-segment
+decoder when it can and falling back to a fixed answer. --delay, --hang-every
+and --fail-every exercise the pool's deadlines and restarts without a
+real model:
+
+    python vision_worker.py frame.jpg --command "python debug/stub_vision_worker.py --delay 0.2"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub worker for vision_worker.ExternalVisionPool")
+    parser.add_argument('--answer', default='72', help='Answer when the image cannot be decoded')
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before each answer')
+    parser.add_argument('--hang-every', type=int, default=0, help='Never answer every Nth request')
+    parser.add_argument('--fail-every', type=int, default=0, help='Answer every Nth request with an error')
+    args = parser.parse_args()
+
+    try:
+        from seven_segment_decoder import SevenSegmentDecoder
+        decoder = SevenSegmentDecoder()
+    except ImportError:
+        decoder = None
+
+    for count, line in enumerate(sys.stdin, start=1):
+        request = json.loads(line)
+        time.sleep(args.delay)
+        if args.hang_every and count % args.hang_every == 0:
+            continue
+        if args.fail_every and count % args.fail_every == 0:
+            reply = {'id': request['id'], 'error': 'stub failure'}
+        else:
+            text = args.answer
+            if decoder is not None and request.get('image_path') and os.path.exists(request['image_path']):
+                result = decoder.extract_temperature(request['image_path'])
+                if result['temperature'] is not None:
+                    text = str(result['temperature'])
+            reply = {'id': request['id'], 'text': text, 'pid': os.getpid()}
+        print(json.dumps(reply), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Automatic display and digit ROI calibration
+
+Locates the thermostat display and its digits once, persists the geometry
+to experimental/display_calibration.json, and lets every reader crop later
+frames to it instead of hard-coding its own crop fractions. The digit box
+is found from the bright segment blobs and then refined by searching
+nearby boxes for the one the seven-segment decoder reads with the widest
+margin.
+
+Each frame is checked for camera movement by correlating the edges of a
+downsampled frame (digits masked out, since they change with the
+setpoint) against the edges stored at calibration time. Only a few
+consecutive low-correlation frames trigger re-calibration.
+
+    python display_calibration.py image.jpg        # calibrate and save
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from seven_segment_decoder import SevenSegmentDecoder, MEDIUM_MARGIN
+
+CALIBRATION_FILE = "experimental/display_calibration.json"
+
+DRIFT_DOWNSAMPLE = 8  # Drift check runs on a 1/8 scale frame (100x56 for Pi Zero frames)
+DRIFT_THRESHOLD = 0.6  # Edge correlation below this counts as movement
+DRIFT_CONFIRM_FRAMES = 3  # Consecutive moved frames before re-calibrating
+MIN_EDGE_ENERGY = 0.3  # Frames with less edge energy than this fraction of the reference are not judged
+CALIBRATION_RETRY_INTERVAL = 10  # Seconds between attempts while calibration keeps failing
+OCR_PADDING = 0.1  # Padding around the digits for OCR crops, as a fraction of the box size
+
+# Offsets tried around the coarse digit box, as fractions of its width/height.
+# Leading digits without lit left segments (7) make the blob narrower than the cell.
+REFINE_LEFT = (-0.12, -0.08, -0.04, 0.0, 0.02)
+REFINE_RIGHT = (-0.02, 0.0, 0.04, 0.08)
+REFINE_VERTICAL = (-0.04, 0.0, 0.04)
+
+
+@dataclass
+class DisplayCalibration:
+    """Display and digit geometry as fractions of the frame, plus the drift reference"""
+    display_box: tuple
+    digits_box: tuple
+    frame_shape: tuple
+    margin: float  # Decoder margin of the frame used for calibration
+    calibrated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    reference_edges: list = field(default_factory=list, repr=False)
+    reference_energy: float = 0.0
+
+    def box_pixels(self, box, shape):
+        """Convert a fractional box to pixel coordinates for a frame shape"""
+        height, width = shape[:2]
+        x0, y0, x1, y1 = box
+        return (max(0, int(x0 * width)), max(0, int(y0 * height)),
+                min(width, int(np.ceil(x1 * width))), min(height, int(np.ceil(y1 * height))))
+
+    def ocr_roi(self, padding=OCR_PADDING):
+        """Digits box with padding, as fractions, for OCR-style readers"""
+        x0, y0, x1, y1 = self.digits_box
+        pad_x, pad_y = (x1 - x0) * padding, (y1 - y0) * padding
+        return (max(0.0, x0 - pad_x), max(0.0, y0 - pad_y), min(1.0, x1 + pad_x), min(1.0, y1 + pad_y))
+
+    def crop(self, frame, region='digits', padding=OCR_PADDING):
+        """Crop a frame to the padded digits box or the display box"""
+        box = self.ocr_roi(padding) if region == 'digits' else self.display_box
+        x0, y0, x1, y1 = self.box_pixels(box, frame.shape)
+        return frame[y0:y1, x0:x1]
+
+    def transport_roi(self, padding=OCR_PADDING):
+        """Smallest box covering the display and the padded digits: what the Pi Zero sends as raw ROI frames"""
+        boxes = (self.display_box, self.ocr_roi(padding))
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    def within(self, roi_pixels, roi_shape):
+        """
+        The same calibration expressed relative to an ROI cut out of a full frame
+
+        Args:
+            roi_pixels: (x0, y0, x1, y1) of the ROI in full-frame pixels
+            roi_shape: frame_shape of the full frame the ROI came from
+
+        Returns:
+            DisplayCalibration whose boxes are fractions of the ROI, so readers
+            can crop an ROI frame exactly like a full one
+        """
+        height, width = roi_shape[:2]
+        rx0, ry0, rx1, ry1 = roi_pixels
+
+        def relative(box):
+            x0, y0, x1, y1 = box
+            return ((x0 * width - rx0) / (rx1 - rx0), (y0 * height - ry0) / (ry1 - ry0),
+                    (x1 * width - rx0) / (rx1 - rx0), (y1 * height - ry0) / (ry1 - ry0))
+
+        return DisplayCalibration(display_box=relative(self.display_box), digits_box=relative(self.digits_box),
+                                  frame_shape=(ry1 - ry0, rx1 - rx0), margin=self.margin,
+                                  calibrated_at=self.calibrated_at)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        for key in ('display_box', 'digits_box', 'frame_shape'):
+            data[key] = tuple(data[key])
+        return cls(**data)
+
+
+def save_calibration(calibration, path=CALIBRATION_FILE):
+    """Persist a calibration atomically"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_file = path + ".tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(calibration.to_dict(), f)
+    os.replace(temp_file, path)
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """Load the persisted calibration, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return DisplayCalibration.from_dict(json.load(f))
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable display calibration {path}: {e}")
+        return None
+
+
+def calibrated_roi(default, padding=OCR_PADDING, path=CALIBRATION_FILE):
+    """Padded digit ROI from the persisted calibration, or `default` (x0, y0, x1, y1 fractions)"""
+    calibration = load_calibration(path)
+    return calibration.ocr_roi(padding) if calibration else default
+
+
+def _to_gray(frame):
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+def edge_signature(frame, digits_box):
+    """
+    Normalized edge magnitude of a downsampled frame with the digits masked out
+
+    Returns:
+        (signature, energy): zero-mean unit-norm float32 array and the mean edge magnitude
+    """
+    gray = _to_gray(frame)
+    height, width = gray.shape
+    small = cv2.resize(gray, (max(1, width // DRIFT_DOWNSAMPLE), max(1, height // DRIFT_DOWNSAMPLE)),
+                       interpolation=cv2.INTER_AREA).astype(np.float32)
+    magnitude = cv2.magnitude(cv2.Sobel(small, cv2.CV_32F, 1, 0), cv2.Sobel(small, cv2.CV_32F, 0, 1))
+
+    # The digits change with the setpoint, so they must not count as movement
+    sh, sw = magnitude.shape
+    x0, y0, x1, y1 = digits_box
+    pad_x, pad_y = (x1 - x0) * 0.1, (y1 - y0) * 0.1
+    magnitude[max(0, int((y0 - pad_y) * sh)):int(np.ceil((y1 + pad_y) * sh)),
+              max(0, int((x0 - pad_x) * sw)):int(np.ceil((x1 + pad_x) * sw))] = 0
+
+    energy = float(magnitude.mean())
+    signature = magnitude - magnitude.mean()
+    norm = np.linalg.norm(signature)
+    return (signature / norm if norm > 0 else signature), energy
+
+
+def _find_digit_blob(gray):
+    """Bounding box (pixels) of the largest row of digit-sized bright blobs, or None"""
+    height, width = gray.shape
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, bright = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Merge the segments of each digit into one blob
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 30), max(3, height // 30)))
+    merged = cv2.morphologyEx(bright, cv2.MORPH_CLOSE, kernel)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(merged)
+    blobs = [tuple(stats[label][:4]) for label in range(1, count) if stats[label][3] >= height * 0.08]
+
+    # Digits sit side by side with the same height; a lone "1" is only a
+    # thin bar, so group blobs into rows before judging the shape
+    best, best_area = None, 0
+    for x, y, w, h in blobs:
+        x0, y0, x1, y1 = x, y, x + w, y + h
+        for ox, oy, ow, oh in blobs:
+            overlap = min(y1, oy + oh) - max(y0, oy)
+            if overlap > 0.7 * max(h, oh) and abs(oh - h) < 0.3 * h and min(abs(ox - x1), abs(x0 - ox - ow)) < 1.5 * h:
+                x0, y0, x1, y1 = min(x0, ox), min(y0, oy), max(x1, ox + ow), max(y1, oy + oh)
+        row_w, row_h = x1 - x0, y1 - y0
+        if 0.6 <= row_w / row_h <= 3.5 and row_w * row_h > best_area:
+            best, best_area = (x0, y0, x1, y1), row_w * row_h
+    return best
+
+
+def _refine_digits_box(gray, blob):
+    """Search around the blob for the box the decoder reads with the widest margin"""
+    height, width = gray.shape
+    x0, y0, x1, y1 = blob
+    box_w, box_h = x1 - x0, y1 - y0
+
+    best_box, best_result = None, None
+    for dx0 in REFINE_LEFT:
+        for dx1 in REFINE_RIGHT:
+            for dy0 in REFINE_VERTICAL:
+                for dy1 in REFINE_VERTICAL:
+                    box = ((x0 + dx0 * box_w) / width, (y0 + dy0 * box_h) / height,
+                           (x1 + dx1 * box_w) / width, (y1 + dy1 * box_h) / height)
+                    result = SevenSegmentDecoder(digits_box=box).decode(gray)
+                    if result['temperature'] is None or result['confidence'] == 'LOW':
+                        continue
+                    if best_result is None or result['min_margin'] > best_result['min_margin']:
+                        best_box, best_result = box, result
+    return best_box, best_result
+
+
+def _find_display_box(gray, digits_px):
+    """Bounding box (pixels) of the lit display panel around the digits"""
+    height, width = gray.shape
+    x0, y0, x1, y1 = digits_px
+    blurred = cv2.GaussianBlur(gray, (9, 9), 0)
+
+    border = np.concatenate([blurred[:height // 20].ravel(), blurred[-height // 20:].ravel(),
+                             blurred[:, :width // 20].ravel(), blurred[:, -width // 20:].ravel()])
+    housing = float(np.median(border))
+
+    # The panel just outside the digit box, excluding the digits themselves
+    ring = blurred[max(0, y0 - (y1 - y0) // 8):y0, x0:x1]
+    panel = float(np.median(ring)) if ring.size else housing
+
+    fallback_pad_x, fallback_pad_y = (x1 - x0) // 4, (y1 - y0) // 4
+    fallback = (max(0, x0 - fallback_pad_x), max(0, y0 - fallback_pad_y),
+                min(width, x1 + fallback_pad_x), min(height, y1 + fallback_pad_y))
+    if panel - housing < 8:
+        return fallback
+
+    mask = (blurred > (panel + housing) / 2).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask)
+    label = labels[(y0 + y1) // 2, x0]
+    if label == 0:
+        return fallback
+    x, y, w, h, _ = stats[label]
+    if w * h > 0.9 * width * height:
+        return fallback
+    return (min(x, x0), min(y, y0), max(x + w, x1), max(y + h, y1))
+
+
+def calibrate_display(frame):
+    """
+    Locate the display and digits in a frame showing a readable setpoint
+
+    Returns:
+        DisplayCalibration, or None if no readable display was found
+    """
+    gray = _to_gray(frame)
+    height, width = gray.shape
+
+    blob = _find_digit_blob(gray)
+    if blob is None:
+        return None
+    digits_box, result = _refine_digits_box(gray, blob)
+    if digits_box is None or result['min_margin'] < MEDIUM_MARGIN:
+        return None
+
+    digits_px = (int(digits_box[0] * width), int(digits_box[1] * height),
+                 int(digits_box[2] * width), int(digits_box[3] * height))
+    dx0, dy0, dx1, dy1 = _find_display_box(gray, digits_px)
+    display_box = (dx0 / width, dy0 / height, dx1 / width, dy1 / height)
+
+    signature, energy = edge_signature(gray, digits_box)
+    return DisplayCalibration(
+        display_box=tuple(round(float(v), 4) for v in display_box),
+        digits_box=tuple(round(float(v), 4) for v in digits_box),
+        frame_shape=(height, width),
+        margin=round(float(result['min_margin']), 3),
+        reference_edges=np.round(signature, 5).tolist(),
+        reference_energy=energy,
+    )
+
+
+class DisplayCalibrator:
+    """Keeps a display calibration current across frames"""
+
+    def __init__(self, path=CALIBRATION_FILE, drift_threshold=DRIFT_THRESHOLD,
+                 confirm_frames=DRIFT_CONFIRM_FRAMES, retry_interval=CALIBRATION_RETRY_INTERVAL):
+        """
+        Args:
+            path: Where the calibration is persisted (None to keep it in memory only)
+            drift_threshold: Edge correlation below which a frame counts as moved
+            confirm_frames: Consecutive moved frames required before re-calibrating
+            retry_interval: Seconds between calibration attempts after a failure
+        """
+        self.path = path
+        self.drift_threshold = drift_threshold
+        self.confirm_frames = confirm_frames
+        self.retry_interval = retry_interval
+        self.calibration = load_calibration(path) if path else None
+        self._reference = None
+        self.moved_frames = 0
+        self.last_attempt = 0
+        self.last_correlation = None
+        self.stats = {'frames': 0, 'drift_checks': 0, 'drift_inconclusive': 0, 'drift_detected': 0,
+                      'calibrations': 0, 'calibration_failures': 0, 'drift_check_ms': 0.0}
+        self.lock = threading.Lock()
+
+    def calibrate(self, frame):
+        """Calibrate from this frame and persist the result; returns it or None"""
+        self.last_attempt = time.time()
+        calibration = calibrate_display(frame)
+        if calibration is None:
+            self.stats['calibration_failures'] += 1
+            return None
+
+        self.calibration = calibration
+        self._reference = None
+        self.moved_frames = 0
+        self.stats['calibrations'] += 1
+        logging.info(f"[CALIBRATION] Display at {calibration.display_box}, digits at {calibration.digits_box} "
+                     f"(margin {calibration.margin:.2f})")
+        if self.path:
+            save_calibration(calibration, self.path)
+        return calibration
+
+    def check_drift(self, frame):
+        """
+        Compare the frame's edges with the calibration reference
+
+        Returns:
+            float correlation, or None when the frame has too little structure to judge
+        """
+        start = time.perf_counter()
+        calibration = self.calibration
+        if self._reference is None:
+            self._reference = np.asarray(calibration.reference_edges, dtype=np.float32)
+        signature, energy = edge_signature(frame, calibration.digits_box)
+        self.stats['drift_checks'] += 1
+        self.stats['drift_check_ms'] = (time.perf_counter() - start) * 1000
+
+        # A dark backlight or an overexposed frame has few edges; do not
+        # mistake that for movement
+        if energy < MIN_EDGE_ENERGY * calibration.reference_energy or signature.shape != self._reference.shape:
+            self.stats['drift_inconclusive'] += 1
+            return None
+        self.last_correlation = float((signature * self._reference).sum())
+        return self.last_correlation
+
+    def process(self, frame):
+        """
+        Return the calibration to use for this frame, calibrating on first use
+        and re-calibrating after the camera has moved
+
+        Returns:
+            DisplayCalibration, or None if the display has not been located yet
+        """
+        with self.lock:
+            self.stats['frames'] += 1
+
+            if self.calibration is None:
+                if time.time() - self.last_attempt >= self.retry_interval:
+                    self.calibrate(frame)
+                return self.calibration
+
+            correlation = self.check_drift(frame)
+            if correlation is None:
+                return self.calibration
+            if correlation >= self.drift_threshold:
+                self.moved_frames = 0
+                return self.calibration
+
+            self.moved_frames += 1
+            if self.moved_frames >= self.confirm_frames and time.time() - self.last_attempt >= self.retry_interval:
+                self.stats['drift_detected'] += 1
+                logging.warning(f"[CALIBRATION] Camera moved (edge correlation {correlation:.2f}), re-calibrating")
+                self.calibrate(frame)
+            return self.calibration
+
+    def reset(self):
+        """Forget the calibration so the next frame calibrates from scratch"""
+        with self.lock:
+            self.calibration = None
+            self._reference = None
+            self.last_attempt = 0
+
+    def get_status(self):
+        with self.lock:
+            calibration = self.calibration
+            return {
+                'calibrated': calibration is not None,
+                'display_box': calibration.display_box if calibration else None,
+                'digits_box': calibration.digits_box if calibration else None,
+                'transport_roi': calibration.transport_roi() if calibration else None,
+                'calibrated_at': calibration.calibrated_at if calibration else None,
+                'margin': calibration.margin if calibration else None,
+                'last_correlation': self.last_correlation,
+                'moved_frames': self.moved_frames,
+                'stats': dict(self.stats),
+            }
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) > 1:
+        image = cv2.imread(sys.argv[1], cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"Could not load image: {sys.argv[1]}")
+            sys.exit(1)
+        start = time.perf_counter()
+        calibration = calibrate_display(image)
+        elapsed = (time.perf_counter() - start) * 1000
+        if calibration is None:
+            print("No readable display found")
+            sys.exit(1)
+        save_calibration(calibration)
+        print(f"Display box: {calibration.display_box}")
+        print(f"Digits box: {calibration.digits_box}")
+        print(f"Margin: {calibration.margin}")
+        print(f"Calibrated in {elapsed:.1f} ms, saved to {CALIBRATION_FILE}")
+    else:
+        print("Usage: python display_calibration.py <image_path>")
@@ -14,15 +14,20 @@ def find_temperature_region(image):
     # Convert to grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # The temperature display appears to be in the center-upper portion
-    # Based on the image, let's focus on that area
+    # Use the digit region found by display_calibration.py if there is one;
+    # otherwise the display appears to be in the center-upper portion
     height, width = gray.shape
-    
-    # Define ROI - adjust these values based on your thermostat
-    roi_y_start = int(height * 0.15)  # Start 15% from top
-    roi_y_end = int(height * 0.55)    # End 55% from top
-    roi_x_start = int(width * 0.25)   # Start 25% from left
-    roi_x_end = int(width * 0.75)     # End 75% from left
+    default_roi = (0.25, 0.15, 0.75, 0.55)
+    try:
+        from display_calibration import calibrated_roi
+        x0, y0, x1, y1 = calibrated_roi(default_roi)
+    except ImportError:
+        x0, y0, x1, y1 = default_roi
+    
+    roi_y_start = int(height * y0)
+    roi_y_end = int(height * y1)
+    roi_x_start = int(width * x0)
+    roi_x_end = int(width * x1)
     
     roi = gray[roi_y_start:roi_y_end, roi_x_start:roi_x_end]
     
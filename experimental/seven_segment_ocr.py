@@ -26,6 +26,14 @@ def create_seven_segment_templates():
     
     return patterns
 
+def get_display_roi(default):
+    """Digit ROI saved by display_calibration.py, or the default (x0, y0, x1, y1) fractions"""
+    try:
+        from display_calibration import calibrated_roi
+        return calibrated_roi(default)
+    except ImportError:
+        return default
+
 def preprocess_for_seven_segment(image):
     """Preprocess image specifically for seven-segment display recognition"""
     # Convert to grayscale if needed
@@ -84,8 +92,9 @@ def extract_temperature_with_contours(image_path, save_debug=True):
     
     # Focus on temperature display area
     height, width = image.shape[:2]
-    roi = image[int(height*0.18):int(height*0.42), 
-                int(width*0.32):int(width*0.68)]
+    x0, y0, x1, y1 = get_display_roi((0.32, 0.18, 0.68, 0.42))
+    roi = image[int(height*y0):int(height*y1), 
+                int(width*x0):int(width*x1)]
     
     # Preprocess
     enhanced, binary, cleaned = preprocess_for_seven_segment(roi)
@@ -148,8 +157,9 @@ def analyze_with_edge_detection(image_path):
     
     # Focus on temperature area
     height, width = image.shape[:2]
-    roi = image[int(height*0.18):int(height*0.42), 
-                int(width*0.32):int(width*0.68)]
+    x0, y0, x1, y1 = get_display_roi((0.32, 0.18, 0.68, 0.42))
+    roi = image[int(height*y0):int(height*y1), 
+                int(width*x0):int(width*x1)]
     
     gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
     
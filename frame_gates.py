@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Cheap gates that run before the temperature readers
+
+QualityGate measures the digit region (mean luminance, fraction of
+saturated pixels, Laplacian variance) and classifies the frame as usable,
+backlight_off, glare or blurred, so readers never waste OCR passes on
+frames they cannot read. Without a display calibration there is no digit
+region to measure, so frames pass unchecked.
+
+ChangeGate compares a small downsampled copy of the digit region with the
+one from the frame that produced the last confident reading. When nothing
+in the region changed, the previous reading is reused and no reader runs.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+# The digit ROI is shrunk to this many cells (width, height) before comparing
+SIGNATURE_SIZE = (32, 16)
+# A cell whose level moved more than this (grey levels, after removing any
+# global brightness shift) means a segment changed
+CHANGE_THRESHOLD = 30
+# Re-read at least this often even when the display looks unchanged
+MAX_REUSE_SECONDS = 300
+CONFIDENT = ('HIGH', 'MEDIUM')
+
+# Quality thresholds, measured on the digit ROI
+DARK_LUMINANCE = 50  # Mean grey level below which the backlight is taken to be off
+SATURATION_LEVEL = 250
+GLARE_FRACTION = 0.2  # Fraction of saturated pixels that means the digits are washed out
+BLUR_VARIANCE = 150  # Laplacian variance below which the frame is too blurred
+QUALITY_WIDTH = 64  # The ROI is shrunk to this width first, which averages out sensor noise
+RECENT_REJECTIONS = 20
+
+
+def _roi(frame, calibration):
+    """Grayscale digit region of a frame, or the whole frame without a calibration"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if calibration is None:
+        return gray
+    return calibration.crop(gray, region='digits')
+
+
+class QualityGate:
+    """Classifies frames as usable, backlight_off, glare or blurred"""
+
+    def __init__(self, dark_luminance=DARK_LUMINANCE, glare_fraction=GLARE_FRACTION,
+                 blur_variance=BLUR_VARIANCE):
+        """
+        Args:
+            dark_luminance: Mean ROI level below which the backlight is off
+            glare_fraction: Fraction of saturated ROI pixels that counts as glare
+            blur_variance: Laplacian variance of the shrunken ROI below which it is blurred
+        """
+        self.dark_luminance = dark_luminance
+        self.glare_fraction = glare_fraction
+        self.blur_variance = blur_variance
+        self.counts = {'usable': 0, 'backlight_off': 0, 'glare': 0, 'blurred': 0, 'unchecked': 0}
+        self.recent_rejections = deque(maxlen=RECENT_REJECTIONS)
+        self.gate_time_ms = 0.0
+        self.lock = threading.Lock()
+
+    def measure(self, frame, calibration=None):
+        """Mean luminance, saturated fraction and sharpness of the digit region"""
+        roi = _roi(frame, calibration)
+        height, width = roi.shape
+        small = cv2.resize(roi, (QUALITY_WIDTH, max(1, height * QUALITY_WIDTH // width)),
+                           interpolation=cv2.INTER_AREA)
+        return {
+            'luminance': float(roi.mean()),
+            'saturation': float(np.count_nonzero(roi >= SATURATION_LEVEL)) / roi.size,
+            'sharpness': float(cv2.Laplacian(small, cv2.CV_32F).var()),
+        }
+
+    def check(self, frame, calibration=None):
+        """
+        Classify a frame
+
+        Returns:
+            (verdict, metrics): 'usable', 'backlight_off', 'glare' or 'blurred', and the measurements
+        """
+        if calibration is None:
+            # The thresholds are for the digit region: a lit LCD in a dark
+            # housing averages below DARK_LUMINANCE over the whole frame
+            with self.lock:
+                self.counts['unchecked'] += 1
+            return 'usable', {}
+        start = time.perf_counter()
+        metrics = self.measure(frame, calibration)
+        if metrics['luminance'] < self.dark_luminance:
+            verdict = 'backlight_off'
+        elif metrics['saturation'] > self.glare_fraction:
+            verdict = 'glare'
+        elif metrics['sharpness'] < self.blur_variance:
+            verdict = 'blurred'
+        else:
+            verdict = 'usable'
+
+        with self.lock:
+            self.counts[verdict] += 1
+            self.gate_time_ms += (time.perf_counter() - start) * 1000
+            if verdict != 'usable':
+                self.recent_rejections.append({
+                    'timestamp': datetime.now().isoformat(),
+                    'reason': verdict,
+                    'metrics': {key: round(value, 3) for key, value in metrics.items()},
+                })
+        return verdict, metrics
+
+    def get_stats(self):
+        with self.lock:
+            frames = sum(self.counts.values())
+            checked = frames - self.counts['unchecked']
+            return {
+                'frames': frames,
+                'counts': dict(self.counts),
+                'rejection_rate': (checked - self.counts['usable']) / checked if checked else None,
+                'gate_latency_mean_ms': self.gate_time_ms / checked if checked else None,
+                'recent_rejections': list(self.recent_rejections),
+            }
+
+
+class ChangeGate:
+    """Reuses the last confident reading while the digit region is unchanged"""
+
+    def __init__(self, threshold=CHANGE_THRESHOLD, max_reuse_seconds=MAX_REUSE_SECONDS):
+        """
+        Args:
+            threshold: Largest per-cell change (grey levels) still treated as unchanged
+            max_reuse_seconds: Force a fresh read after reusing a result this long
+        """
+        self.threshold = threshold
+        self.max_reuse_seconds = max_reuse_seconds
+        self.reference = None  # Signature of the frame behind the cached result
+        self.reference_key = None
+        self.result = None
+        self.result_time = 0
+        self.last_difference = None
+        self.stats = {'frames': 0, 'skipped': 0, 'changed': 0, 'expired': 0, 'gate_time_ms': 0.0}
+        self.lock = threading.Lock()
+
+    def signature(self, frame, calibration=None):
+        """Downsampled float32 copy of the digit region"""
+        return cv2.resize(_roi(frame, calibration), SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def check(self, frame, calibration=None):
+        """
+        Decide whether the frame needs reading
+
+        Returns:
+            (cached_result, signature, changed): the reusable result (None if
+            the frame must be read), the frame's signature to pass to
+            remember(), and whether the digit region moved by more than the
+            threshold since the last confident reading (False without one,
+            or when only max_reuse_seconds forced a re-read)
+        """
+        start = time.perf_counter()
+        signature = self.signature(frame, calibration)
+        key = calibration.digits_box if calibration is not None else None
+
+        with self.lock:
+            self.stats['frames'] += 1
+            cached = None
+            changed = False
+            if self.reference is not None and self.reference_key == key:
+                difference = signature - self.reference
+                # Ignore a uniform brightness change (exposure, room light)
+                difference = np.abs(difference - np.median(difference))
+                self.last_difference = float(difference.max())
+                if self.last_difference > self.threshold:
+                    self.stats['changed'] += 1
+                    changed = True
+                elif time.time() - self.result_time > self.max_reuse_seconds:
+                    self.stats['expired'] += 1
+                else:
+                    self.stats['skipped'] += 1
+                    cached = dict(self.result)
+                    cached['reused'] = True
+            self.stats['gate_time_ms'] += (time.perf_counter() - start) * 1000
+        return cached, signature, changed
+
+    def remember(self, signature, result, calibration=None):
+        """Cache a fresh result; only confident readings are worth reusing"""
+        with self.lock:
+            if result.get('temperature') is not None and result.get('confidence') in CONFIDENT:
+                self.reference = signature
+                self.reference_key = calibration.digits_box if calibration is not None else None
+                self.result = result
+                self.result_time = time.time()
+            else:
+                # Keep reading until something confident comes back
+                self.reference = None
+
+    def get_stats(self):
+        with self.lock:
+            frames = self.stats['frames']
+            return {
+                'frames': frames,
+                'skipped': self.stats['skipped'],
+                'changed': self.stats['changed'],
+                'expired': self.stats['expired'],
+                'skip_rate': self.stats['skipped'] / frames if frames else None,
+                'gate_latency_mean_ms': self.stats['gate_time_ms'] / frames if frames else None,
+                'last_difference': self.last_difference,
+            }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Building blocks for staged frame pipelines
+
+Stages run on their own threads and hand work to each other through
+mailboxes, so a slow stage never holds up capture:
+
+  LatestMailbox   holds one item; a new item replaces an unread one (which is
+                  counted as dropped), so a slow consumer always gets the
+                  freshest frame rather than a backlog
+  DropOldestQueue bounded FIFO for results that should all be seen when the
+                  consumer keeps up; when full the oldest entry is dropped
+  StageStats      per-stage counts, drops and latency percentiles
+"""
+
+import threading
+import time
+from collections import deque
+
+TIMING_WINDOW = 200  # Timings kept per stage
+
+
+class LatestMailbox:
+    """Single-slot mailbox that always holds the newest item"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.has_item = False
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        """Deliver an item, replacing (and dropping) any unread one"""
+        with self.condition:
+            if self.has_item:
+                self.dropped += 1
+            self.item = item
+            self.has_item = True
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Take the item, waiting up to timeout; None on timeout or once closed"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.has_item or self.closed, timeout):
+                return None
+            if not self.has_item:
+                return None
+            item, self.item, self.has_item = self.item, None, False
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class DropOldestQueue:
+    """Bounded FIFO that discards its oldest entry instead of blocking the producer"""
+
+    def __init__(self, maxsize):
+        self.condition = threading.Condition()
+        self.items = deque()
+        self.maxsize = maxsize
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Oldest item, waiting up to timeout; None on timeout or once closed and empty"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            return self.items.popleft() if self.items else None
+
+    def qsize(self):
+        with self.condition:
+            return len(self.items)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class StageStats:
+    """Latency and throughput of each pipeline stage"""
+
+    def __init__(self, stages):
+        self.lock = threading.Lock()
+        self.stages = {stage: {'count': 0, 'dropped': 0, 'timings': deque(maxlen=TIMING_WINDOW)}
+                       for stage in stages}
+
+    def record(self, stage, elapsed_ms):
+        with self.lock:
+            self.stages[stage]['count'] += 1
+            self.stages[stage]['timings'].append(elapsed_ms)
+
+    def drop(self, stage, count=1):
+        with self.lock:
+            self.stages[stage]['dropped'] += count
+
+    def timed(self, stage):
+        """Context manager recording the time spent in a block"""
+        return _Timer(self, stage)
+
+    def get_stats(self):
+        with self.lock:
+            stats = {}
+            for stage, data in self.stages.items():
+                ordered = sorted(data['timings'])
+                stats[stage] = {
+                    'count': data['count'],
+                    'dropped': data['dropped'],
+                    'mean_ms': round(sum(ordered) / len(ordered), 2) if ordered else None,
+                    'p50_ms': round(ordered[len(ordered) // 2], 2) if ordered else None,
+                    'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2) if ordered else None,
+                }
+            return stats
+
+
+class _Timer:
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.stage, (time.perf_counter() - self.start) * 1000)
+        return False
@@ -1,13 +1,37 @@
 #!/usr/bin/env python3
 """
 LLaVA Docker Service - Runs in container to provide vision AI
+
+Requests are served on threads and meet in a BatchingQueue, which waits up
+to --max-wait-ms for up to --max-batch images and reads them with one
+generate call. Uploads already answered are served from result_cache first.
+/metrics reports batch sizes, queue wait, inference time and cache hits.
+
+`--convert` (run while building the image) saves the model with its
+inference profile applied. At start-up the service loads that file with
+mmap instead of downloading and converting. It listens at once, and /ready
+reports the load stage, progress, seconds per stage and peak RSS.
+
+mmap only saves the file read for tensors used as stored (fp32 weights,
+embeddings, norms). Under the int8 profile every dynamically quantized
+Linear re-packs its weights when unpickled (LinearPackedParams.__setstate__
+-> linear_prepack), so the bulk of the model is still copied into anonymous
+memory at load time; the packed layout is backend specific and cannot be
+saved. The gain there is skipping the download and the quantization pass.
 """
 
+import argparse
 import json
 import logging
 import os
+import queue
+import re
+import resource
 import sys
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import base64
 from PIL import Image
@@ -15,115 +39,395 @@ import io
 import torch
 from transformers import LlavaForConditionalGeneration, AutoProcessor
 
+from result_cache import ResultCache, get_result_cache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+MAX_BATCH = 4  # Images per generate call
+MAX_WAIT_MS = 50  # How long a request waits for others to share its batch
+METRICS_WINDOW = 500  # Batches and requests kept for /metrics
+
+# Inference profiles:
+#   quantize        dynamic int8 quantization of every nn.Linear (weights int8,
+#                   activations quantized on the fly), the bulk of the model
+#   square_input    letterbox the (ROI) image to a square at the vision tower's
+#                   input size, so the processor neither crops the sides of a
+#                   wide display nor resizes a large upload
+#   max_new_tokens  a two-digit answer needs only a few tokens
+INFERENCE_PROFILES = {
+    'fp32': {'quantize': False, 'square_input': False, 'max_new_tokens': 20},
+    'int8': {'quantize': True, 'square_input': True, 'max_new_tokens': 4},
+}
+DEFAULT_PROFILE = os.environ.get('LLAVA_PROFILE', 'fp32')
+MODEL_IDS = ["llava-hf/llava-1.5-7b-hf", "llava-hf/bakLlava-v1-hf"]
+
+WEIGHTS_DIR = os.environ.get('LLAVA_WEIGHTS_DIR', '/app/weights')
+WEIGHTS_FILE = 'model.pt'  # The whole (quantized) module, loaded with mmap (see above for int8)
+MANIFEST_FILE = 'manifest.json'
+
 class LLaVAModel:
     """Wrapper for LLaVA model"""
     
-    def __init__(self):
+    def __init__(self, profile=DEFAULT_PROFILE, weights_dir=WEIGHTS_DIR):
+        """
+        Args:
+            profile: Key into INFERENCE_PROFILES
+            weights_dir: Directory written by --convert; from_pretrained is used without it
+        """
+        if profile not in INFERENCE_PROFILES:
+            raise ValueError(f"Unknown inference profile: {profile}")
+        self.profile = profile
+        self.settings = INFERENCE_PROFILES[profile]
+        self.weights_dir = weights_dir
         self.model = None
         self.processor = None
+        self.model_id = None
+        self.input_size = None
         self.device = "cpu"
+        self.ready = False
+        self.stage = 'not started'
+        self.progress = 0.0
+        self.source = None
+        self.load_started = None
+        self.load_seconds = None
+        self.stage_seconds = {}
+        self.stage_started = None
         
-    def load_model(self):
-        """Load LLaVA model"""
-        logging.info("Loading LLaVA model... this may take a few minutes")
+    def _set_stage(self, stage, progress):
+        now = time.time()
+        if self.stage_started is not None:
+            self.stage_seconds[self.stage] = round(now - self.stage_started, 2)
+        self.stage_started = now
+        self.stage = stage
+        self.progress = progress
+        logging.info(f"[LOAD] {stage} ({progress:.0%})")
         
-        # Use the smaller LLaVA model
-        model_id = "llava-hf/llava-1.5-7b-hf"
+    def load_status(self):
+        """Readiness and load progress for /ready"""
+        return {
+            'ready': self.ready,
+            'stage': self.stage,
+            'progress': self.progress,
+            'source': self.source,
+            'model_id': self.model_id,
+            'profile': self.profile,
+            'elapsed_seconds': (self.load_seconds if self.load_seconds is not None else
+                                time.time() - self.load_started if self.load_started else None),
+            'stage_seconds': dict(self.stage_seconds),
+            # ru_maxrss is in KB on Linux
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
         
-        try:
-            # Load processor and model
-            self.processor = AutoProcessor.from_pretrained(model_id)
-            self.model = LlavaForConditionalGeneration.from_pretrained(
-                model_id,
-                torch_dtype=torch.float32,
-                low_cpu_mem_usage=True
-            ).to(self.device)
-            
-            logging.info("LLaVA model loaded successfully")
-            return True
+    def load_model(self):
+        """Load the pre-converted weights if present, otherwise the pretrained model"""
+        self.load_started = time.time()
+        manifest = read_manifest(self.weights_dir)
+        if manifest and manifest['profile'] == self.profile:
+            try:
+                self._load_converted(manifest)
+                return self._finish_load()
+            except Exception as e:
+                logging.error(f"Failed to load converted weights: {e}")
+        elif manifest:
+            logging.warning(f"Converted weights are for the {manifest['profile']} profile, not {self.profile}")
             
-        except Exception as e:
-            logging.error(f"Failed to load model: {e}")
-            # Fallback to a smaller model if the main one fails
+        logging.info(f"Loading LLaVA model ({self.profile} profile)... this may take a few minutes")
+        for model_id in MODEL_IDS:
             try:
-                logging.info("Trying alternative model...")
-                model_id = "llava-hf/bakLlava-v1-hf"
-                self.processor = AutoProcessor.from_pretrained(model_id)
-                self.model = LlavaForConditionalGeneration.from_pretrained(
-                    model_id,
-                    torch_dtype=torch.float32,
-                    low_cpu_mem_usage=True
-                ).to(self.device)
-                logging.info("Alternative model loaded successfully")
-                return True
-            except Exception as e2:
-                logging.error(f"Failed to load alternative model: {e2}")
-                return False
-    
+                self._set_stage(f"loading {model_id}", 0.1)
+                self._activate(self._load_pretrained(model_id), model_id)
+                self.source = 'pretrained'
+                logging.info(f"{model_id} loaded successfully")
+                return self._finish_load()
+            except Exception as e:
+                logging.error(f"Failed to load {model_id}: {e}")
+        self._set_stage('failed', 0.0)
+        return False
+        
+    def _load_pretrained(self, model_id):
+        """Load one model from the hub and apply the inference profile"""
+        self.processor = AutoProcessor.from_pretrained(model_id)
+        model = LlavaForConditionalGeneration.from_pretrained(
+            model_id,
+            torch_dtype=torch.float32,
+            low_cpu_mem_usage=True
+        ).to(self.device)
+        model.eval()
+        
+        if self.settings['quantize']:
+            self._set_stage('quantizing', 0.5)
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logging.info("Quantized linear layers to int8")
+        return model
+        
+    def _load_converted(self, manifest):
+        """Load the weights baked in by --convert (int8 Linear weights are re-packed, not mapped)"""
+        self._set_stage('loading processor', 0.05)
+        self.processor = AutoProcessor.from_pretrained(os.path.join(self.weights_dir, 'processor'))
+        self._set_stage('mapping weights', 0.2)
+        model = torch.load(os.path.join(self.weights_dir, WEIGHTS_FILE), mmap=True, weights_only=False)
+        model.eval()
+        self._activate(model, manifest['model_id'])
+        self.source = 'converted'
+        
+    def _activate(self, model, model_id):
+        # The vision tower's fixed input resolution (336 for llava-1.5)
+        crop_size = self.processor.image_processor.crop_size
+        self.input_size = crop_size['height'] if isinstance(crop_size, dict) else crop_size
+        self.model = model
+        self.model_id = model_id
+        
+    def _finish_load(self):
+        """Run one tiny generate so the first request does not fault in the weights"""
+        self._set_stage('warming up', 0.7)
+        image = io.BytesIO()
+        Image.new('RGB', (64, 32)).save(image, format='JPEG')
+        self.extract_temperature(image.getvalue())
+        self.load_seconds = time.time() - self.load_started
+        self.ready = True
+        self._set_stage('ready', 1.0)
+        logging.info(f"Model ready in {self.load_seconds:.1f}s from {self.source} weights "
+                     f"(stages {self.stage_seconds}, peak RSS {self.load_status()['peak_rss_mb']} MB)")
+        return True
+        
+    def _prepare_image(self, image):
+        """Letterbox to a square at the vision tower's input size (square_input profiles)"""
+        if not self.settings['square_input']:
+            return image
+        width, height = image.size
+        scale = self.input_size / max(width, height)
+        resized = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BICUBIC)
+        # Pad with the processor's mean colour so the border normalizes to zero
+        fill = tuple(int(value * 255) for value in self.processor.image_processor.image_mean)
+        square = Image.new('RGB', (self.input_size, self.input_size), fill)
+        square.paste(resized, ((self.input_size - resized.width) // 2, (self.input_size - resized.height) // 2))
+        return square
+        
     def extract_temperature(self, image_bytes):
         """Extract temperature from image bytes"""
-        try:
-            # Load image from bytes
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        return self.extract_temperature_batch([image_bytes])[0]
+        
+    def extract_temperature_batch(self, images):
+        """
+        Extract temperatures from several images with one generate call
+        
+        Args:
+            images: List of encoded image bytes
             
+        Returns:
+            list: One result dict per image, in order
+        """
+        results = [None] * len(images)
+        decoded = []
+        for index, image_bytes in enumerate(images):
+            try:
+                image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+                decoded.append((index, self._prepare_image(image)))
+            except Exception as e:
+                logging.error(f"Could not decode image: {e}")
+                results[index] = {'temperature': None, 'confidence': 'ERROR', 'raw_response': str(e)}
+        if not decoded:
+            return results
+            
+        try:
             # Prepare prompt
             prompt = "USER: <image>\nWhat temperature number is shown on this thermostat display? Reply with just the number.\nASSISTANT:"
             
-            # Process image and prompt
-            inputs = self.processor(prompt, image, return_tensors="pt").to(self.device)
+            # Process images and prompts; pad on the left so every sequence
+            # ends where generation starts
+            self.processor.tokenizer.padding_side = 'left'
+            inputs = self.processor(text=[prompt] * len(decoded), images=[image for _, image in decoded],
+                                    return_tensors="pt", padding=True).to(self.device)
             
-            # Generate response
+            # Generate responses
             with torch.no_grad():
                 output = self.model.generate(
                     **inputs,
-                    max_new_tokens=20,
+                    max_new_tokens=self.settings['max_new_tokens'],
                     do_sample=False,
                     temperature=0.1
                 )
             
-            # Decode response
-            response = self.processor.decode(output[0], skip_special_tokens=True)
-            
-            # Extract temperature from response
-            if "ASSISTANT:" in response:
-                response = response.split("ASSISTANT:")[-1].strip()
+            # Decode responses
+            responses = self.processor.batch_decode(output, skip_special_tokens=True)
+            for (index, _), response in zip(decoded, responses):
+                results[index] = self._parse_response(response)
                 
-            logging.info(f"Model response: '{response}'")
+        except Exception as e:
+            logging.error(f"Error extracting temperature: {e}")
+            for index, _ in decoded:
+                results[index] = {
+                    'temperature': None,
+                    'confidence': 'ERROR',
+                    'raw_response': str(e)
+                }
+        return results
+        
+    def _parse_response(self, response):
+        """Turn the decoded model output into a result dict"""
+        # Extract temperature from response
+        if "ASSISTANT:" in response:
+            response = response.split("ASSISTANT:")[-1].strip()
             
-            # Parse temperature
-            import re
-            numbers = re.findall(r'\b\d{1,2}\b', response)
+        logging.info(f"Model response: '{response}'")
+        
+        # Parse temperature
+        numbers = re.findall(r'\b\d{1,2}\b', response)
+        
+        if numbers:
+            for num_str in numbers:
+                temp = int(num_str)
+                if 50 <= temp <= 90:
+                    return {
+                        'temperature': temp,
+                        'confidence': 'HIGH' if len(response.split()) <= 2 else 'MEDIUM',
+                        'raw_response': response
+                    }
+                    
+        return {
+            'temperature': None,
+            'confidence': 'LOW',
+            'raw_response': response
+        }
+
+
+class BatchingQueue:
+    """Collects concurrent requests into batches for one generate call"""
+    
+    def __init__(self, model, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        """
+        Args:
+            model: LLaVAModel with extract_temperature_batch
+            max_batch: Largest number of images per generate call
+            max_wait_ms: How long the first request of a batch waits for company
+        """
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self.queue_waits = deque(maxlen=METRICS_WINDOW)
+        self.inference_times = deque(maxlen=METRICS_WINDOW)
+        self.requests = 0
+        self.batches = 0
+        self.thread = threading.Thread(target=self._run, daemon=True, name='llava-batcher')
+        self.thread.start()
+        
+    def submit(self, image_bytes):
+        """Queue one image and block until its result is ready"""
+        item = {'image': image_bytes, 'queued': time.perf_counter(), 'done': threading.Event(), 'result': None}
+        self.pending.put(item)
+        item['done'].wait()
+        return item['result']
+        
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait is over"""
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+        
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                results = self.model.extract_temperature_batch([item['image'] for item in batch])
+            except Exception as e:
+                logging.error(f"Batch of {len(batch)} failed: {e}")
+                results = [{'temperature': None, 'confidence': 'ERROR', 'raw_response': str(e)}] * len(batch)
+            inference_ms = (time.perf_counter() - start) * 1000
             
-            if numbers:
-                for num_str in numbers:
-                    temp = int(num_str)
-                    if 50 <= temp <= 90:
-                        return {
-                            'temperature': temp,
-                            'confidence': 'HIGH' if len(response.split()) <= 2 else 'MEDIUM',
-                            'raw_response': response
-                        }
-                        
+            with self.lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes.append(len(batch))
+                self.inference_times.append(inference_ms)
+                self.queue_waits.extend((start - item['queued']) * 1000 for item in batch)
+            for item, result in zip(batch, results):
+                item['result'] = result
+                item['done'].set()
+                
+    def get_metrics(self):
+        with self.lock:
+            sizes = list(self.batch_sizes)
             return {
-                'temperature': None,
-                'confidence': 'LOW',
-                'raw_response': response
+                'requests': self.requests,
+                'batches': self.batches,
+                'queued': self.pending.qsize(),
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'batch_size_mean': sum(sizes) / len(sizes) if sizes else None,
+                'batch_size_histogram': {str(size): sizes.count(size) for size in sorted(set(sizes))},
+                'queue_wait_ms': _summary(self.queue_waits),
+                'inference_ms': _summary(self.inference_times),
             }
-            
+
+
+def _summary(values):
+    """Mean, p50 and p95 of a window of timings"""
+    ordered = sorted(values)
+    if not ordered:
+        return {'mean': None, 'p50': None, 'p95': None}
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def read_manifest(weights_dir):
+    """Manifest of converted weights, or None if there are none"""
+    if not weights_dir:
+        return None
+    path = os.path.join(weights_dir, MANIFEST_FILE)
+    if not (os.path.exists(path) and os.path.exists(os.path.join(weights_dir, WEIGHTS_FILE))):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def convert_weights(profile, output_dir):
+    """
+    Build-time conversion: load the model, apply the profile, and save it
+    so the service can load it instead of downloading and converting
+    
+    Returns:
+        bool: True if a model was converted
+    """
+    converter = LLaVAModel(profile=profile, weights_dir=None)
+    os.makedirs(output_dir, exist_ok=True)
+    for model_id in MODEL_IDS:
+        try:
+            model = converter._load_pretrained(model_id)
         except Exception as e:
-            logging.error(f"Error extracting temperature: {e}")
-            return {
-                'temperature': None,
-                'confidence': 'ERROR',
-                'raw_response': str(e)
-            }
+            logging.error(f"Failed to load {model_id}: {e}")
+            continue
+        converter.processor.save_pretrained(os.path.join(output_dir, 'processor'))
+        torch.save(model, os.path.join(output_dir, WEIGHTS_FILE))
+        with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+            json.dump({'model_id': model_id, 'profile': profile, 'torch': torch.__version__,
+                       'converted_at': time.strftime('%Y-%m-%dT%H:%M:%S')}, f, indent=2)
+        size_gb = os.path.getsize(os.path.join(output_dir, WEIGHTS_FILE)) / 1e9
+        logging.info(f"Converted {model_id} ({profile}) to {output_dir} ({size_gb:.1f} GB)")
+        return True
+    return False
 
 
-# Global model instance
+# Global model instance, its batching queue (created in main) and the result
+# cache; VISION_RESULT_CACHE names a file that keeps the cache across restarts
 model = LLaVAModel()
+batcher = None
+result_cache = get_result_cache()
 
 
 class VisionHandler(BaseHTTPRequestHandler):
@@ -132,6 +436,10 @@ class VisionHandler(BaseHTTPRequestHandler):
     def do_POST(self):
         """Handle POST requests"""
         if self.path == '/extract_temperature':
+            if not model.ready:
+                self._send_json(503, {'temperature': None, 'confidence': 'ERROR',
+                                      'raw_response': f"Model not ready: {model.stage}"})
+                return
             try:
                 # Get content length
                 content_length = int(self.headers['Content-Length'])
@@ -139,8 +447,13 @@ class VisionHandler(BaseHTTPRequestHandler):
                 # Read image data
                 image_data = self.rfile.read(content_length)
                 
-                # Extract temperature
-                result = model.extract_temperature(image_data)
+                # Identical uploads (retries, unchanged frames) skip the model
+                key = ResultCache.key(image_data, 'llava', f"{model.model_id}/{model.profile}")
+                result = result_cache.get(key)
+                if result is None:
+                    # Extract temperature, batched with any concurrent requests
+                    result = batcher.submit(image_data)
+                    result_cache.put(key, result)
                 
                 # Send response
                 self.send_response(200)
@@ -170,14 +483,33 @@ class VisionHandler(BaseHTTPRequestHandler):
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
             health = {
-                'status': 'healthy' if model.model is not None else 'loading',
-                'model_loaded': model.model is not None
+                'status': 'healthy' if model.ready else 'loading',
+                'model_loaded': model.ready,
+                'model_id': model.model_id,
+                'profile': model.profile
             }
             self.wfile.write(json.dumps(health).encode())
+        elif self.path == '/ready':
+            # 503 until the model is loaded, with the load stage and progress
+            status = model.load_status()
+            self._send_json(200 if status['ready'] else 503, status)
+        elif self.path == '/metrics':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            metrics = batcher.get_metrics() if batcher else {}
+            metrics['result_cache'] = result_cache.get_stats()
+            self.wfile.write(json.dumps(metrics).encode())
         else:
             self.send_response(404)
             self.end_headers()
             
+    def _send_json(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(payload).encode())
+        
     def log_message(self, format, *args):
         """Override to use logging module"""
         logging.info(f"{self.address_string()} - {format % args}")
@@ -185,18 +517,40 @@ class VisionHandler(BaseHTTPRequestHandler):
 
 def main():
     """Main function"""
-    # Load model
-    if not model.load_model():
-        logging.error("Failed to load model, exiting")
-        sys.exit(1)
-        
-    # Start HTTP server
-    server_address = ('', 8000)
-    httpd = HTTPServer(server_address, VisionHandler)
+    global model, batcher
+    parser = argparse.ArgumentParser(description="LLaVA temperature reading service")
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--max-batch', type=int, default=int(os.environ.get('LLAVA_MAX_BATCH', MAX_BATCH)),
+                        help='Images per generate call')
+    parser.add_argument('--max-wait-ms', type=float, default=float(os.environ.get('LLAVA_MAX_WAIT_MS', MAX_WAIT_MS)),
+                        help='Time a request waits for others to batch with')
+    parser.add_argument('--profile', choices=sorted(INFERENCE_PROFILES), default=DEFAULT_PROFILE,
+                        help='Inference profile (int8 quantizes linear layers and shrinks the input)')
+    parser.add_argument('--weights-dir', default=WEIGHTS_DIR, help='Directory of converted weights')
+    parser.add_argument('--convert', action='store_true',
+                        help='Convert the model for --profile into --weights-dir and exit (image build step)')
+    args = parser.parse_args()
+    
+    if args.convert:
+        sys.exit(0 if convert_weights(args.profile, args.weights_dir) else 1)
+        
+    # Listen right away so /ready can report progress while the model loads
+    model = LLaVAModel(profile=args.profile, weights_dir=args.weights_dir)
+    batcher = BatchingQueue(model, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    server_address = ('', args.port)
+    httpd = ThreadingHTTPServer(server_address, VisionHandler)
+    
+    def load():
+        if not model.load_model():
+            logging.error("Failed to load model, exiting")
+            os._exit(1)
+    threading.Thread(target=load, daemon=True, name='llava-loader').start()
     
-    logging.info("LLaVA service running on port 8000")
+    # Each connection gets a thread that waits on the batcher
+    logging.info(f"LLaVA service running on port {args.port} (batches of up to {args.max_batch}, "
+                 f"{args.max_wait_ms:.0f} ms wait)")
     httpd.serve_forever()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
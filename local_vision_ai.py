@@ -11,18 +11,35 @@ import numpy as np
 from PIL import Image
 import subprocess
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PREPROCESS_VARIANTS = ('otsu', 'adaptive', 'simple')
+UPSCALE_TARGET_HEIGHT = 200  # Digit ROIs are upscaled to about this height for OCR
+MAX_UPSCALE = 4
 
 class LocalVisionAI:
     """Local OCR-based vision AI for reading thermostat temperatures"""
     
-    def __init__(self, ocr_method="easyocr"):
+    def __init__(self, ocr_method="easyocr", debug=False, max_workers=len(PREPROCESS_VARIANTS), worker_pool=None):
         """
         Initialize the local vision AI
         
         Args:
             ocr_method: OCR method to use ('easyocr', 'tesseract')
+            debug: Save each preprocessed variant to /tmp/debug_<name>.jpg
+            max_workers: Threads used to preprocess and OCR the variants concurrently
+            worker_pool: Optional ocr_worker_pool.OCRWorkerPool whose warm workers
+                         run the OCR instead of this process
         """
         self.ocr_method = ocr_method
+        self.debug = debug
+        self.max_workers = max_workers
+        self.executor = None
+        self.worker_pool = worker_pool
+        # EasyOCR's model is not documented as thread-safe; tesseract runs as
+        # a separate process per call, so only EasyOCR calls are serialized
+        self.reader_lock = threading.Lock()
         self.is_loaded = False
         
         logging.info(f"Initializing LocalVisionAI with OCR method: {ocr_method}")
@@ -30,7 +47,12 @@ class LocalVisionAI:
     def load_model(self):
         """Load/initialize the OCR system"""
         try:
-            if self.ocr_method == "easyocr":
+            if self.worker_pool is not None:
+                # The pool's workers already hold a loaded engine
+                self.ocr_method = self.worker_pool.engine
+                self.worker_pool.start()
+                logging.info(f"Using warm {self.ocr_method} worker pool")
+            elif self.ocr_method == "easyocr":
                 try:
                     import easyocr
                     self.reader = easyocr.Reader(['en'])
@@ -39,13 +61,16 @@ class LocalVisionAI:
                     logging.warning("EasyOCR not available, falling back to tesseract")
                     self.ocr_method = "tesseract"
                     
-            if self.ocr_method == "tesseract":
+            if self.ocr_method == "tesseract" and self.worker_pool is None:
                 # Check if tesseract is available
                 result = subprocess.run(['which', 'tesseract'], capture_output=True)
                 if result.returncode != 0:
                     raise Exception("Tesseract not found")
                 logging.info("Tesseract OCR initialized successfully")
                 
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix='ocr-variant')
             self.is_loaded = True
             
         except Exception as e:
@@ -53,12 +78,14 @@ class LocalVisionAI:
             self.is_loaded = False
             raise
             
-    def extract_temperature(self, image_path):
+    def extract_temperature(self, image_path, roi=None):
         """
         Extract temperature from thermostat image using OCR
         
         Args:
             image_path: Path to the thermostat image
+            roi: Optional (x0, y0, x1, y1) crop as fractions of the image; the
+                 saved display calibration, or the whole image, is used otherwise
             
         Returns:
             dict: {'temperature': int, 'confidence': str, 'raw_response': str}
@@ -67,50 +94,44 @@ class LocalVisionAI:
             self.load_model()
             
         try:
-            # Try multiple preprocessing approaches
-            processed_images = self._preprocess_image_multiple(image_path)
+            gray = self._load_roi(image_path, roi)
             
-            best_result = None
-            best_confidence = 'LOW'
+            # Preprocess and OCR every variant concurrently; OpenCV and the
+            # OCR engines release the GIL while they work
+            cancelled = threading.Event()
+            futures = {
+                self.executor.submit(self._read_variant, gray, name, cancelled): name
+                for name in PREPROCESS_VARIANTS
+            }
             
-            # Try OCR on each processed image
-            for name, processed_image in processed_images:
+            results = {}
+            for future in as_completed(futures):
+                name = futures[future]
                 try:
-                    if self.ocr_method == "easyocr":
-                        results = self.reader.readtext(processed_image)
-                        raw_text = " ".join([result[1] for result in results])
-                    else:  # tesseract
-                        import pytesseract
-                        raw_text = pytesseract.image_to_string(processed_image, config='--psm 6 -c tessedit_char_whitelist=0123456789')
-                    
-                    logging.info(f"OCR text from {name}: '{raw_text}'")
-                    
-                    # Parse temperature from this approach
-                    result = self._parse_temperature_response(raw_text)
-                    
-                    # Keep the best result
-                    if result['temperature'] is not None and (best_result is None or result['confidence'] == 'HIGH'):
-                        best_result = result
-                        best_result['raw_response'] = f"{name}: {raw_text}"
-                        best_confidence = result['confidence']
-                        
-                        # If we got a high confidence result, stop trying
-                        if result['confidence'] == 'HIGH':
-                            break
-                            
+                    result = future.result()
                 except Exception as e:
                     logging.warning(f"OCR failed for {name}: {e}")
                     continue
+                if result is None:
+                    continue
+                results[name] = result
+                
+                # A high confidence result makes the other variants pointless
+                if result['confidence'] == 'HIGH':
+                    cancelled.set()
+                    for other in futures:
+                        other.cancel()
+                    return result
             
-            # Return best result or a failure result
-            if best_result:
-                return best_result
-            else:
-                return {
-                    'temperature': None,
-                    'confidence': 'LOW',
-                    'raw_response': 'No temperature detected in any processed image'
-                }
+            # Otherwise prefer variants in their usual order
+            for name in PREPROCESS_VARIANTS:
+                if name in results:
+                    return results[name]
+            return {
+                'temperature': None,
+                'confidence': 'LOW',
+                'raw_response': 'No temperature detected in any processed image'
+            }
             
         except Exception as e:
             logging.error(f"Error extracting temperature: {e}")
@@ -120,52 +141,113 @@ class LocalVisionAI:
                 'raw_response': str(e)
             }
             
-    def _preprocess_image_multiple(self, image_path):
+    def _load_roi(self, image_path, roi=None):
         """
-        Preprocess image for better OCR accuracy
+        Load the image as grayscale, cropped to the digit ROI and upscaled
         
         Args:
             image_path: Path to the image
+            roi: Optional (x0, y0, x1, y1) crop as fractions of the image; the
+                 region saved by display_calibration is used when not given
             
         Returns:
-            list: List of (name, processed_image) tuples
+            numpy.ndarray: Grayscale image ready for preprocessing
         """
-        # Load image
         image = cv2.imread(image_path)
-        
-        # Convert to grayscale
+        if image is None:
+            raise ValueError(f"Could not load image: {image_path}")
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
-        # Try different preprocessing approaches
-        processed_images = []
+        if roi is None:
+            try:
+                from display_calibration import calibrated_roi
+                roi = calibrated_roi(None)
+            except ImportError:
+                pass
+        if roi is None:
+            # Without a calibrated ROI, upscaling the whole frame costs far more than it helps
+            return gray
         
-        # Approach 1: Basic preprocessing
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, thresh1 = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        processed_images.append(('otsu', thresh1))
+        height, width = gray.shape
+        x0, y0, x1, y1 = roi
+        gray = gray[int(height * y0):int(height * y1), int(width * x0):int(width * x1)]
         
-        # Approach 2: Adaptive threshold
-        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-        processed_images.append(('adaptive', adaptive))
+        # Only the small digit region is upscaled for better OCR
+        scale = min(MAX_UPSCALE, UPSCALE_TARGET_HEIGHT / max(1, gray.shape[0]))
+        if scale > 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        return gray
         
-        # Approach 3: Simple threshold
-        _, thresh2 = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        processed_images.append(('simple', thresh2))
+    def _preprocess_variant(self, gray, name):
+        """
+        Apply one preprocessing approach
         
-        # Resize all images for better OCR and save debug images
-        final_images = []
-        for name, img in processed_images:
-            # Resize for better OCR (make it larger)
-            height, width = img.shape
-            resized = cv2.resize(img, (width * 4, height * 4), interpolation=cv2.INTER_CUBIC)
-            final_images.append((name, resized))
+        Args:
+            gray: Grayscale image from _load_roi
+            name: One of PREPROCESS_VARIANTS
             
-            # Save debug image
+        Returns:
+            numpy.ndarray: Binary image for OCR
+        """
+        if name == 'otsu':
+            # Basic preprocessing
+            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            _, processed = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        elif name == 'adaptive':
+            processed = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        else:
+            _, processed = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+        
+        if self.debug:
             debug_path = f"/tmp/debug_{name}.jpg"
-            cv2.imwrite(debug_path, resized)
+            cv2.imwrite(debug_path, processed)
             logging.info(f"Saved debug image: {debug_path}")
+        return processed
         
-        return final_images
+    def _read_variant(self, gray, name, cancelled):
+        """
+        Preprocess and OCR one variant, unless another variant already won
+        
+        Returns:
+            dict or None: Parsed result with a temperature, or None
+        """
+        if cancelled.is_set():
+            return None
+        processed = self._preprocess_variant(gray, name)
+        if cancelled.is_set():
+            return None
+        
+        if self.worker_pool is not None:
+            raw_text = self.worker_pool.ocr(processed, config='--psm 6 -c tessedit_char_whitelist=0123456789')
+        elif self.ocr_method == "easyocr":
+            with self.reader_lock:
+                results = self.reader.readtext(processed)
+            raw_text = " ".join([result[1] for result in results])
+        else:  # tesseract
+            import pytesseract
+            raw_text = pytesseract.image_to_string(processed, config='--psm 6 -c tessedit_char_whitelist=0123456789')
+        
+        logging.info(f"OCR text from {name}: '{raw_text}'")
+        
+        result = self._parse_temperature_response(raw_text)
+        if result['temperature'] is None:
+            return None
+        result['raw_response'] = f"{name}: {raw_text}"
+        return result
+        
+    def _preprocess_image_multiple(self, image_path, roi=None):
+        """
+        Preprocess image for better OCR accuracy
+        
+        Args:
+            image_path: Path to the image
+            roi: Optional (x0, y0, x1, y1) crop as fractions of the image
+            
+        Returns:
+            list: List of (name, processed_image) tuples
+        """
+        gray = self._load_roi(image_path, roi)
+        return [(name, self._preprocess_variant(gray, name)) for name in PREPROCESS_VARIANTS]
             
     def _parse_temperature_response(self, response):
         """
@@ -239,6 +321,9 @@ class LocalVisionAI:
         """Clean up OCR resources"""
         if hasattr(self, 'reader'):
             del self.reader
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
             
         self.is_loaded = False
         logging.info("LocalVisionAI cleaned up")
@@ -12,16 +12,19 @@ import os
 class LocalVisionAI:
     """Docker-based vision AI for reading thermostat temperatures"""
     
-    def __init__(self, container_name="llava-vision", port=8000):
+    def __init__(self, container_name="llava-vision", port=8000, ready_timeout=600):
         """
         Initialize the Docker-based vision AI
         
         Args:
             container_name: Name of the Docker container
             port: Port where the service runs
+            ready_timeout: Seconds to wait for the model to load; the wait
+                           ends early if the service reports a failed load
         """
         self.container_name = container_name
         self.port = port
+        self.ready_timeout = ready_timeout
         self.service_url = f"http://localhost:{port}"
         self.is_loaded = False
         
@@ -39,7 +42,7 @@ class LocalVisionAI:
             
             if result.stdout.strip():
                 logging.info("Docker container already running")
-                self.is_loaded = True
+                self._wait_until_ready()
                 return
                 
             # Check if container exists but is stopped
@@ -68,22 +71,7 @@ class LocalVisionAI:
                     "llava-vision:latest"
                 ], check=True)
             
-            # Wait for service to be ready
-            logging.info("Waiting for LLaVA service to be ready...")
-            for i in range(60):  # Wait up to 60 seconds
-                try:
-                    response = requests.get(f"{self.service_url}/health", timeout=2)
-                    if response.status_code == 200:
-                        health = response.json()
-                        if health.get('model_loaded'):
-                            logging.info("LLaVA service is ready")
-                            self.is_loaded = True
-                            return
-                except:
-                    pass
-                time.sleep(1)
-                
-            raise Exception("LLaVA service failed to start")
+            self._wait_until_ready()
             
         except subprocess.CalledProcessError as e:
             logging.error(f"Docker command failed: {e}")
@@ -92,12 +80,39 @@ class LocalVisionAI:
             logging.error(f"Failed to start Docker container: {e}")
             raise
             
-    def extract_temperature(self, image_path):
+    def _wait_until_ready(self):
+        """Poll /ready, logging the service's load progress, until the model is loaded"""
+        logging.info("Waiting for LLaVA service to be ready...")
+        deadline = time.time() + self.ready_timeout
+        last_stage = None
+        while time.time() < deadline:
+            try:
+                response = requests.get(f"{self.service_url}/ready", timeout=2)
+                status = response.json()
+                if response.status_code == 200 and status.get('ready'):
+                    logging.info(f"LLaVA service is ready ({status.get('source')} weights, "
+                                 f"loaded in {status.get('elapsed_seconds', 0):.1f}s)")
+                    self.is_loaded = True
+                    return
+                if status.get('stage') == 'failed':
+                    raise Exception("LLaVA service failed to load the model")
+                if status.get('stage') != last_stage:
+                    last_stage = status.get('stage')
+                    logging.info(f"LLaVA service loading: {last_stage} ({status.get('progress', 0):.0%})")
+            except requests.RequestException:
+                pass  # Not listening yet
+            time.sleep(1)
+            
+        raise Exception(f"LLaVA service not ready after {self.ready_timeout}s")
+        
+    def extract_temperature(self, image_path, roi=None):
         """
         Extract temperature from thermostat image
         
         Args:
             image_path: Path to the thermostat image
+            roi: Optional (x0, y0, x1, y1) crop as fractions of the image, e.g.
+                 from display_calibration; the whole image is sent otherwise
             
         Returns:
             dict: {'temperature': int, 'confidence': str, 'raw_response': str}
@@ -107,8 +122,17 @@ class LocalVisionAI:
             
         try:
             # Read image file
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
+            if roi is None:
+                with open(image_path, 'rb') as f:
+                    image_data = f.read()
+            else:
+                # Send only the calibrated region so the model sees the digits up close
+                import cv2
+                image = cv2.imread(image_path)
+                height, width = image.shape[:2]
+                x0, y0, x1, y1 = roi
+                crop = image[int(height * y0):int(height * y1), int(width * x0):int(width * x1)]
+                image_data = cv2.imencode('.jpg', crop)[1].tobytes()
                 
             # Send to Docker service
             response = requests.post(
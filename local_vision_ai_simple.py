@@ -17,29 +17,49 @@ import numpy as np
 class LocalVisionAI:
     """Simplified vision AI that actually works in your environment"""
     
-    def __init__(self):
+    def __init__(self, worker_pool=None):
+        """
+        Args:
+            worker_pool: Optional ocr_worker_pool.OCRWorkerPool; without one every
+                         OCR call forks a tesseract process through pytesseract
+        """
+        self.worker_pool = worker_pool
         self.is_loaded = True
         logging.info("Initializing simplified LocalVisionAI")
         
     def load_model(self):
-        """No model to load - using direct OCR"""
-        pass
+        """Start the worker pool if there is one; direct OCR needs no model"""
+        if self.worker_pool is not None:
+            self.worker_pool.start()
+            
+    def _ocr(self, image, config):
+        if self.worker_pool is not None:
+            return self.worker_pool.ocr(image, config=config)
+        return pytesseract.image_to_string(image, config=config)
+        
+    def extract_temperature(self, image_path, roi=None):
+        """
+        Extract temperature using image processing + OCR
         
-    def extract_temperature(self, image_path):
-        """Extract temperature using image processing + OCR"""
+        Args:
+            image_path: Path to the thermostat image
+            roi: Optional (x0, y0, x1, y1) crop as fractions of the image, e.g.
+                 from display_calibration; defaults to the centre of the frame
+        """
         try:
             # Load and preprocess image
             image = cv2.imread(image_path)
             if image is None:
                 raise ValueError(f"Could not load image: {image_path}")
                 
-            # Focus on the display area (crop to center region where numbers typically are)
+            # Focus on the display area: the calibrated digit region if known,
+            # otherwise the center 60% horizontally and 40% vertically
             height, width = image.shape[:2]
-            # Crop to center 60% horizontally and 40% vertically
-            x_start = int(width * 0.2)
-            x_end = int(width * 0.8)
-            y_start = int(height * 0.3)
-            y_end = int(height * 0.7)
+            x0, y0, x1, y1 = roi or (0.2, 0.3, 0.8, 0.7)
+            x_start = int(width * x0)
+            x_end = int(width * x1)
+            y_start = int(height * y0)
+            y_end = int(height * y1)
             cropped = image[y_start:y_end, x_start:x_end]
             
             # Convert to grayscale
@@ -50,20 +70,20 @@ class LocalVisionAI:
             
             # Method 1: Threshold for LCD-like displays
             _, thresh1 = cv2.threshold(gray, 100, 255, cv2.THRESH_BINARY)
-            text1 = pytesseract.image_to_string(thresh1, config='--psm 7 -c tessedit_char_whitelist=0123456789')
+            text1 = self._ocr(thresh1, '--psm 7 -c tessedit_char_whitelist=0123456789')
             results.append(('threshold', text1.strip()))
             
             # Method 2: Invert and threshold (for dark displays)
             inverted = cv2.bitwise_not(gray)
             _, thresh2 = cv2.threshold(inverted, 150, 255, cv2.THRESH_BINARY)
-            text2 = pytesseract.image_to_string(thresh2, config='--psm 7 -c tessedit_char_whitelist=0123456789')
+            text2 = self._ocr(thresh2, '--psm 7 -c tessedit_char_whitelist=0123456789')
             results.append(('inverted', text2.strip()))
             
             # Method 3: Edge detection for segmented displays
             edges = cv2.Canny(gray, 50, 150)
             kernel = np.ones((2,2), np.uint8)
             dilated = cv2.dilate(edges, kernel, iterations=1)
-            text3 = pytesseract.image_to_string(dilated, config='--psm 8 -c tessedit_char_whitelist=0123456789')
+            text3 = self._ocr(dilated, '--psm 8 -c tessedit_char_whitelist=0123456789')
             results.append(('edges', text3.strip()))
             
             # Log all results
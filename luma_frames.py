@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Raw luminance ROI frames sent from the Pi Zero to the blade
+
+Instead of JPEG-encoding the whole 800x450 Y plane, the Pi Zero can send
+only the calibrated display region as raw 8-bit luminance (optionally
+zlib-compressed, which is lossless), behind a small fixed header:
+
+    magic 'LUMA', version, flags, frame id, capture timestamp,
+    full frame width/height, ROI x/y/width/height (pixels)
+
+The blade wraps an uncompressed body with np.frombuffer, so the ROI is
+read straight out of the request body without a decode or a copy.
+
+This module only needs NumPy, so it is copied to the Pi Zero alongside
+pi_zero_servo_control.py.
+"""
+
+import struct
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b'LUMA'
+VERSION = 1
+FLAG_ZLIB = 0x01
+HEADER = struct.Struct('<4sBBIdHHHHHH')
+CONTENT_TYPE = 'application/x-luma-roi'
+ZLIB_LEVEL = 1  # Fastest level; the digits compress well even at this level
+
+
+class LumaFrameError(ValueError):
+    """Raised for data that is not a valid luminance ROI frame"""
+
+
+def max_packed_size(pixels):
+    """
+    Largest packed frame for an ROI of this many pixels, compressed or not
+
+    zlib can expand incompressible input (sensor noise, a full-frame ROI);
+    this is zlib's compressBound plus its 2-byte header and 4-byte checksum
+    and a small margin, so a buffer of this size always fits.
+    """
+    return HEADER.size + pixels + (pixels >> 12) + (pixels >> 14) + (pixels >> 25) + 13 + 6 + 64
+
+
+def box_pixels(box, shape):
+    """Pixel coordinates of a fractional (x0, y0, x1, y1) box, rounded like DisplayCalibration"""
+    height, width = shape[:2]
+    x0, y0, x1, y1 = box
+    return (max(0, int(x0 * width)), max(0, int(y0 * height)),
+            min(width, int(np.ceil(x1 * width))), min(height, int(np.ceil(y1 * height))))
+
+
+def pack_roi(gray, box, frame_id, timestamp=None, compress=False, out=None):
+    """
+    Crop a grayscale frame to a fractional box and pack it with its header
+
+    Args:
+        gray: Full 2-D uint8 luminance frame
+        box: ROI as fractions of the frame (x0, y0, x1, y1)
+        frame_id: Sequence number of the capture
+        timestamp: Capture time (defaults to now)
+        compress: zlib-compress the pixels
+        out: Optional preallocated bytearray of at least max_packed_size(frame size)
+             bytes to pack into; the frame is then returned as a view of it. Compressed
+             frames are fed to zlib row by row and only the (small) compressed
+             output is copied into out, so no full ROI copy is made either way.
+
+    Returns:
+        bytes or memoryview: header followed by the ROI pixels, row by row
+    """
+    x0, y0, x1, y1 = box_pixels(box, gray.shape)
+    if x1 <= x0 or y1 <= y0:
+        raise LumaFrameError(f"Empty ROI {box} for a {gray.shape[1]}x{gray.shape[0]} frame")
+    size = (x1 - x0) * (y1 - y0)
+    fields = (MAGIC, VERSION, FLAG_ZLIB if compress else 0, frame_id & 0xFFFFFFFF,
+              time.time() if timestamp is None else timestamp,
+              gray.shape[1], gray.shape[0], x0, y0, x1 - x0, y1 - y0)
+    if out is None:
+        pixels = np.ascontiguousarray(gray[y0:y1, x0:x1], dtype=np.uint8)
+        body = zlib.compress(pixels, ZLIB_LEVEL) if compress else pixels.data
+        return HEADER.pack(*fields) + bytes(body)
+
+    if len(out) < (max_packed_size(size) if compress else HEADER.size + size):
+        raise LumaFrameError(f"Buffer of {len(out)} bytes cannot hold a {x1 - x0}x{y1 - y0} ROI")
+    view = memoryview(out)
+    if compress:
+        # zlib cannot write into a caller's buffer, but each ROI row is
+        # contiguous in the frame, so compress the rows where they are
+        compressor = zlib.compressobj(ZLIB_LEVEL)
+        end = HEADER.size
+        for row in gray[y0:y1, x0:x1]:
+            end = _append(view, end, compressor.compress(row))
+        end = _append(view, end, compressor.flush())
+    else:
+        end = HEADER.size + size
+        pixels = np.frombuffer(out, dtype=np.uint8, count=size, offset=HEADER.size)
+        np.copyto(pixels.reshape(y1 - y0, x1 - x0), gray[y0:y1, x0:x1])
+    HEADER.pack_into(out, 0, *fields)
+    return view[:end]
+
+
+def _append(view, end, chunk):
+    """Copy a compressed chunk into the output buffer at end; returns the new end"""
+    if end + len(chunk) > len(view):
+        raise LumaFrameError(f"Compressed ROI does not fit in a buffer of {len(view)} bytes")
+    view[end:end + len(chunk)] = chunk
+    return end + len(chunk)
+
+
+def unpack_roi(data):
+    """
+    Parse a packed ROI frame
+
+    Returns:
+        (header, roi): header dict and a read-only 2-D uint8 array; for an
+        uncompressed frame the array is a view of data, not a copy
+    """
+    if len(data) < HEADER.size:
+        raise LumaFrameError(f"Frame of {len(data)} bytes is shorter than the header")
+    magic, version, flags, frame_id, timestamp, frame_w, frame_h, x, y, w, h = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise LumaFrameError(f"Not a luminance ROI frame (magic {magic!r}, version {version})")
+    if flags & FLAG_ZLIB:
+        try:
+            pixels, offset = zlib.decompress(memoryview(data)[HEADER.size:]), 0
+        except zlib.error as e:
+            raise LumaFrameError(f"Corrupt compressed ROI: {e}") from e
+    else:
+        pixels, offset = data, HEADER.size
+    if len(pixels) - offset != w * h:
+        raise LumaFrameError(f"Expected {w * h} ROI bytes for {w}x{h}, got {len(pixels) - offset}")
+    roi = np.frombuffer(pixels, dtype=np.uint8, count=w * h, offset=offset).reshape(h, w)
+    header = {
+        'frame_id': frame_id,
+        'timestamp': timestamp,
+        'frame_shape': (frame_h, frame_w),
+        'roi': (x, y, x + w, y + h),
+        'compressed': bool(flags & FLAG_ZLIB),
+    }
+    return header, roi
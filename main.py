@@ -1,6 +1,7 @@
 from flask import Flask, Response, render_template, request, jsonify
 # from picamera2 import Picamera2
 import cv2
+import numpy as np
 import time
 import threading
 import argparse
@@ -12,6 +13,12 @@ import requests
 import os
 import pytz
 from scheduler import ThermostatScheduler, SchedulerError
+from vision_reader import create_cascade, GatedVisionReader
+from ocr_worker_pool import get_pool_stats, stop_pools
+from result_cache import get_result_cache
+from adaptive_sampler import AdaptiveSampler, MIN_INTERVAL, signal_actuation
+from display_calibration import DisplayCalibrator
+from luma_frames import CONTENT_TYPE as LUMA_CONTENT_TYPE, LumaFrameError, unpack_roi
 
 # Application version - update this when making changes
 APP_VERSION = "1.3.2"  # Removed confidence display from vision section 
@@ -48,6 +55,12 @@ logging.getLogger('werkzeug').setLevel(logging.ERROR)
 
 PI_ZERO_HOST = "http://10.0.0.191:5000"
 
+# The Pi Zero queues presses and answers /actuate_servo with a command id;
+# the blade polls /commands/<id> until the presses are done
+COMMAND_POLL_INTERVAL = 0.25
+PRESS_TIMEOUT = 5  # Seconds allowed per press (ours and the presses queued ahead) before cancelling the rest
+CANCEL_GRACE = 10  # Seconds to wait for a press under way to finish after a cancel
+
 # Create servo objects for channels
 # logging.debug("Creating servo objects for channels")
 servo_down = "down"  # Servo for down temperature
@@ -75,57 +88,134 @@ current_desired_temp = None
 # Global variable to store the latest frame
 latest_frame = None
 
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description="Smart Thermostat Control")
-parser.add_argument('--simulate', action='store_true', help='Run in simulation mode (no servo actuation)')
-args = parser.parse_args()
+def build_arg_parser():
+    """Build the command-line parser for the thermostat server."""
+    parser = argparse.ArgumentParser(description="Smart Thermostat Control")
+    parser.add_argument('--simulate', action='store_true', help='Run in simulation mode (no servo actuation)')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+    parser.add_argument('--pi-zero-host', default=PI_ZERO_HOST,
+                        help='Base URL of the Pi Zero servo server (e.g. a pi_zero_simulator.py instance)')
+    parser.add_argument('--production', action='store_true',
+                        help='Serve with the threaded gunicorn WSGI server instead of the Werkzeug dev server')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes in production mode. Thermostat state lives in process memory, '
+                             'so keep this at 1 unless every worker can tolerate a stale view')
+    parser.add_argument('--threads', type=int, default=8, help='Request threads per worker in production mode')
+    parser.add_argument('--keepalive', type=int, default=5,
+                        help='Seconds to hold idle HTTP keep-alive connections open in production mode')
+    parser.add_argument('--vision-backends', default='seven_segment,claude',
+                        help='Comma-separated vision readers, cheapest first; later ones only run when '
+                             'earlier ones are unsure (seven_segment, tesseract_simple, tesseract, easyocr, '
+                             'llava_docker, claude)')
+    parser.add_argument('--vision-min-interval', type=float, default=MIN_INTERVAL,
+                        help='Seconds between vision samples right after a button press or display change')
+    parser.add_argument('--vision-max-interval', type=float, default=120,
+                        help='Longest interval between vision samples while the display is stable')
+    return parser
+
+# Defaults until main() parses the real command line, so importing this
+# module (WSGI servers, debug scripts) never touches sys.argv
+args = build_arg_parser().parse_args([])
 
 app = Flask(__name__)
 # Updated CORS configuration to allow specific origins
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 
-def actuate_servo(servo_name, start_angle, target_angle):
-    """Send a request to the Pi Zero to actuate a servo."""
+def actuate_servo(servo_name, start_angle, target_angle, count=1):
+    """
+    Have the Pi Zero press a servo button count times.
+
+    All presses go to the Pi Zero as one queued command, so they do not each
+    wait for a round trip. Returns the number of presses that landed (0 on
+    failure), which is exact even when the command failed part way.
+    """
     global last_action_time
-    logging.info("Sending request to Pi Zero to actuate servo %s from %d to %d", servo_name, start_angle, target_angle)
+    logging.info("Sending request to Pi Zero to actuate servo %s from %d to %d (%d presses)",
+                 servo_name, start_angle, target_angle, count)
     
     if args.simulate:
         logging.debug(f"Simulating servo movement: {servo_name} from {start_angle} to {target_angle}")
-        return True
+        notify_actuation()
+        return count
     else:
         try:
             response = requests.post(
                 f"{PI_ZERO_HOST}/actuate_servo",
-                json={"servo": servo_name, "start_angle": start_angle, "target_angle": target_angle},
-                timeout=5  # Adjust timeout as necessary
+                json={"servo": servo_name, "start_angle": start_angle, "target_angle": target_angle,
+                      "count": count},
+                timeout=5  # Only the submission; the presses run on the Pi Zero's command queue
             )
             response.raise_for_status()
+            command = wait_for_command(response.json()['command'])
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logging.error("Error actuating servo: %s", e)
+            return 0
+        landed = len(command['presses'])
+        if landed:
             last_action_time = time.time()  # Update the last action time
+            notify_actuation()
+        if command['state'] == 'done':
             logging.info("Servo %s actuated successfully", servo_name)
-            return True
-        except requests.RequestException as e:
-            logging.error("Error actuating servo: %s", e)
-            return False
+        else:
+            logging.error("Servo %s command %s %s after %d of %d presses: %s", servo_name, command['id'],
+                          command['state'], landed, count, command.get('error'))
+        return landed
+
+def wait_for_command(command):
+    """
+    Poll the Pi Zero until a queued command has finished.
+
+    Past its deadline the rest of the command is cancelled, then polled until
+    the press under way lands. Returns the last status seen.
+    """
+    deadline = time.time() + PRESS_TIMEOUT * (command['count'] + command.get('ahead', 0))
+    cancelled = False
+    while command['state'] not in ('done', 'failed', 'cancelled'):
+        if time.time() > deadline:
+            if cancelled:
+                logging.error("Command %s did not finish after cancelling; %d presses landed so far",
+                              command['id'], len(command['presses']))
+                break
+            logging.warning("Command %s is taking too long, cancelling its remaining presses", command['id'])
+            try:
+                requests.delete(f"{PI_ZERO_HOST}/commands/{command['id']}", timeout=5).raise_for_status()
+            except requests.RequestException as e:
+                logging.error("Error cancelling command %s: %s", command['id'], e)
+            cancelled = True
+            deadline = time.time() + CANCEL_GRACE
+        time.sleep(COMMAND_POLL_INTERVAL)
+        try:
+            response = requests.get(f"{PI_ZERO_HOST}/commands/{command['id']}", timeout=5)
+            response.raise_for_status()
+            command = response.json()
+        except (requests.RequestException, ValueError) as e:
+            # The presses carry on regardless; keep asking until the deadline
+            logging.warning("Error polling command %s: %s", command['id'], e)
+    return command
+
+def notify_actuation():
+    """Sample the display quickly while it shows the result of a button press."""
+    vision_sampler.burst('actuation')
+    # The standalone vision service samples on its own schedule
+    signal_actuation()
+    schedule_confirmation_capture()
 
 def cycle_mode_to_desired(desired_mode):
     """Cycle through the modes until the desired mode is reached."""
     logging.info("Cycling mode to desired mode: %s", ['OFF', 'HEAT', 'COOL'][desired_mode])
     global current_mode
-    while current_mode != desired_mode:
-        result = actuate_servo(servo_mode, 0, 180)
-        if not result:
-            logging.error("Failed to actuate servo_mode to cycle mode")
-            return False
-        if current_mode == MODE_OFF:
-            current_mode = MODE_HEAT
-        elif current_mode == MODE_HEAT:
-            current_mode = MODE_COOL
-        elif current_mode == MODE_COOL:
-            current_mode = MODE_OFF  # Add manual mode in the cycle
-        else:
-            current_mode = MODE_OFF
-        logging.debug("Mode changed to: %s", ['OFF', 'HEAT', 'COOL'][current_mode])
+    if current_mode == desired_mode:
+        return True
+    # Each press moves OFF -> HEAT -> COOL -> OFF
+    presses = (desired_mode - current_mode) % 3
+    landed = actuate_servo(servo_mode, 0, 180, count=presses)
+    current_mode = (current_mode + landed) % 3
+    logging.debug("Mode changed to: %s", ['OFF', 'HEAT', 'COOL'][current_mode])
+    if landed < presses:
+        logging.error("Failed to actuate servo_mode to cycle mode")
+        return False
     return True
 
 def set_temperature_logic(target_temp):
@@ -162,33 +252,33 @@ def set_temperature_logic(target_temp):
                 logging.info("More than 45 seconds since last action, activating screen")
                 activate_screen()
             logging.info("Increasing temperature by %d degrees", temp_difference)
-            for _ in range(temp_difference):
-                logging.debug("Actuating servo to increase temperature")
-                actuation_result = actuate_servo(servo_up, 180, 0)
-                if not actuation_result:
-                    logging.error("Failed to actuate servo_up to increase temperature")
-                    success = False
-                    break
-            if success:
-                logging.debug("Updated last_action_time after increasing temperature")
+            landed = actuate_servo(servo_up, 180, 0, count=temp_difference)
+            if landed < temp_difference:
+                logging.error("Failed to actuate servo_up to increase temperature (%d of %d presses landed)",
+                              landed, temp_difference)
+                success = False
         elif temp_difference < 0:  # Decrease temperature
             if time.time() - last_action_time > 45:
                 logging.info("More than 45 seconds since last action, activating screen")
                 activate_screen()
             logging.info("Decreasing temperature by %d degrees", abs(temp_difference))
-            for _ in range(abs(temp_difference)):
-                logging.debug("Actuating servo to decrease temperature")
-                actuation_result = actuate_servo(servo_down, 0, 180)
-                if not actuation_result:
-                    logging.error("Failed to actuate servo_down to decrease temperature")
-                    success = False
-                    break
-            if success:
-                logging.debug("Updated last_action_time after decreasing temperature")
+            landed = -actuate_servo(servo_down, 0, 180, count=abs(temp_difference))
+            if landed > temp_difference:
+                logging.error("Failed to actuate servo_down to decrease temperature (%d of %d presses landed)",
+                              -landed, abs(temp_difference))
+                success = False
         else:
             logging.info("No temperature change needed")
             return {"status": "success", "message": "Temperature already at desired value"}
 
+        if not success and landed:
+            # The Pi Zero reports exactly which presses landed; track them so
+            # the next request corrects from the real setpoint
+            if current_mode == MODE_HEAT:
+                current_heat_temp += landed
+            else:
+                current_cool_temp += landed
+
         if success:
             # Only update the variables if all actuations succeeded
             if current_mode == MODE_HEAT:
@@ -306,6 +396,11 @@ def log_info():
     global current_heat_temp, current_cool_temp, ambient_temp, current_mode, last_action_time
 
     while True:
+        # With several workers only the scheduler leader writes the file
+        if scheduler is not None and not scheduler.is_leader:
+            time.sleep(1)
+            continue
+
         with lock:
             time_since_last_action = time.time() - last_action_time
             # Read the latest ambient temperature from the file
@@ -514,13 +609,10 @@ def receive_image():
     if file.filename == '':
         return jsonify({"status": "error", "message": "No selected file"}), 400
     if file:
-        # Save the image
-        filename = 'latest_image.jpg'
-        filepath = os.path.join(IMAGE_SAVE_PATH, filename)
-        file.save(filepath)
-        with lock:
-            latest_image_path = filepath  # Update the global variable
-        logging.info("Received and saved new image: %s", filepath)
+        # In ROI transport mode full frames only refresh the UI and the calibration.
+        # The Pi Zero marks frames whose display changed; read those right away.
+        ingest_frame(file.read(), force=request.form.get('changed') == '1',
+                     read=request.form.get('purpose') != 'ui')
         return jsonify({"status": "success"}), 200
     else:
         return jsonify({"status": "error", "message": "File not allowed"}), 400
@@ -561,6 +653,228 @@ def video_feed():
 vision_temperature_history = []
 vision_last_detection = None
 
+# Readers run cheapest first on every received frame that changed; expensive
+# backends only see frames the cheap ones could not read confidently.
+# Built from the command line by create_vision_services(), not at import.
+vision_reader = None
+# Display geometry is found once, persisted, and re-checked for camera drift
+display_calibrator = DisplayCalibrator()
+# Frames arrive every few seconds; the sampler decides which ones are read
+vision_sampler = None
+VISION_DB_LOG_INTERVAL = 10  # Seconds between frame readings written to the database
+last_vision_reading_time = 0
+last_vision_db_log_time = 0
+
+def record_vision_reading(temperature, confidence):
+    """Publish a confident reading to the shared vision state, history and database."""
+    global vision_last_detection, last_vision_reading_time, last_vision_db_log_time
+    from vision_state import save_state
+
+    now = datetime.datetime.now()
+    save_state(temperature, now)
+    last_vision_reading_time = time.time()
+
+    vision_last_detection = {
+        'temperature': temperature,
+        'confidence': confidence,
+        'timestamp': now.isoformat()
+    }
+    vision_temperature_history.append(vision_last_detection)
+    if len(vision_temperature_history) > 100:  # Keep last 100 readings
+        vision_temperature_history.pop(0)
+
+    if time.time() - last_vision_db_log_time >= VISION_DB_LOG_INTERVAL:
+        from vision_database import log_vision_reading
+        log_vision_reading(temperature, confidence)
+        last_vision_db_log_time = time.time()
+
+def update_vision_from_frame(image_bytes, image_path=None, force=False, read=True):
+    """Calibrate from an uploaded JPEG, then read the setpoint if a sample is due and record it if confident."""
+    frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if frame is None:
+        logging.warning("[VISION] Could not decode received image")
+        return None
+
+    # Every full frame keeps the calibration (and its drift check) current,
+    # whether or not the sampler wants a reading from it
+    calibration = display_calibrator.process(frame)
+    if not read or (not force and not vision_sampler.due()):
+        return None
+    return read_vision_frame(frame, calibration, image_path)
+
+def update_vision_from_roi(data, force=False):
+    """Read the setpoint from a raw luminance ROI frame if a sample is due."""
+    header, roi = unpack_roi(data)  # A view of the request body, not a copy
+    if not force and not vision_sampler.due():
+        return None
+    calibration = display_calibrator.calibration
+    if calibration is None:
+        logging.warning("[VISION] ROI frame received before the display is calibrated")
+        return None
+    roi_calibration = calibration.within(header['roi'], header['frame_shape'])
+    if min(roi_calibration.digits_box) < -0.01 or max(roi_calibration.digits_box) > 1.01:
+        # The Pi Zero still crops to an old calibration; it refreshes its ROI regularly
+        logging.warning(f"[VISION] ROI {header['roi']} of frame {header['frame_id']} misses the digits")
+        return None
+    return read_vision_frame(roi, roi_calibration)
+
+def read_vision_frame(frame, calibration, image_path=None):
+    """Run the vision reader on a frame and record the reading if confident."""
+    result = vision_reader.read(image_path=image_path, frame=frame, calibration=calibration)
+    logging.debug(f"[VISION] {result['backend']}: {result['raw_response']} -> "
+                  f"{result['temperature']} ({result['confidence']}, escalations {result['escalations']})")
+    if result['temperature'] is not None and result['confidence'] in ('HIGH', 'MEDIUM'):
+        record_vision_reading(result['temperature'], result['confidence'])
+    # Burst only on a real change: failed readings and periodic re-reads do not count
+    vision_sampler.observe(changed=result.get('display_changed', False))
+    return result
+
+def ingest_frame(image_bytes, force=False, read=True):
+    """Save a frame from the Pi Zero as the latest image and read it if a sample is due."""
+    global latest_image_path
+    filepath = os.path.join(IMAGE_SAVE_PATH, 'latest_image.jpg')
+    with open(filepath, 'wb') as f:
+        f.write(image_bytes)
+    with lock:
+        latest_image_path = filepath  # Update the global variable
+    logging.info("Received and saved new image: %s", filepath)
+    try:
+        return update_vision_from_frame(image_bytes, filepath, force=force, read=read)
+    except Exception as e:
+        logging.error(f"Error decoding received image: {e}")
+        return None
+
+# Frames on demand from the Pi Zero: on its own it pushes only frames whose
+# display region changed (plus a heartbeat), and none at all while its edge
+# readings (/edge_reading) are confident, so the blade asks when it needs one
+CAPTURE_NOW_TIMEOUT = 10
+CONFIRM_QUIET_PERIOD = 1.0  # Seconds without a press before the result is captured
+CONFIRM_SETTLE = 0.5  # Pi-side wait for the display to redraw before capturing
+capture_now_stats = {'requested': 0, 'failed': 0, 'confirmations': 0}
+capture_now_lock = threading.Lock()
+confirmation_timer = None
+confirmation_lock = threading.Lock()
+
+def count_capture_now(key):
+    with capture_now_lock:
+        capture_now_stats[key] += 1
+
+def fetch_frame_now(settle=0):
+    """Ask the Pi Zero for a fresh frame; the response, or None without a Pi or on failure."""
+    if args.simulate:
+        return None
+    params = {'settle': settle}
+    calibration = display_calibrator.calibration
+    if calibration is not None:
+        # Only the display region is needed, as raw luminance
+        params.update(format='roi', box=','.join(f"{v:.5f}" for v in calibration.transport_roi()))
+    count_capture_now('requested')
+    try:
+        response = requests.get(f"{PI_ZERO_HOST}/capture_now", params=params,
+                                timeout=CAPTURE_NOW_TIMEOUT + settle)
+        response.raise_for_status()
+        return response
+    except requests.RequestException as e:
+        count_capture_now('failed')
+        logging.warning(f"[CAPTURE NOW] Could not get a frame from the Pi Zero: {e}")
+        return None
+
+def pull_frame(settle=0):
+    """Fetch a frame from the Pi Zero and read it; (fetched, result)."""
+    response = fetch_frame_now(settle)
+    if response is None:
+        return False, None
+    if response.headers.get('Content-Type', '').startswith(LUMA_CONTENT_TYPE):
+        try:
+            return True, update_vision_from_roi(response.content, force=True)
+        except LumaFrameError as e:
+            logging.warning(f"[CAPTURE NOW] Bad ROI frame from the Pi Zero: {e}")
+            return True, None
+    return True, ingest_frame(response.content, force=True)
+
+def schedule_confirmation_capture():
+    """Capture the display once a press sequence has finished, to confirm what it did."""
+    global confirmation_timer
+    with confirmation_lock:
+        # Each press restarts the timer, so a sequence is confirmed once, at its end
+        if confirmation_timer is not None:
+            confirmation_timer.cancel()
+        confirmation_timer = threading.Timer(CONFIRM_QUIET_PERIOD, confirm_display_state)
+        confirmation_timer.daemon = True
+        confirmation_timer.start()
+
+def confirm_display_state():
+    if edge_readings_fresh():
+        # The Pi Zero reports what the display shows within a second anyway
+        return
+    fetched, result = pull_frame(settle=CONFIRM_SETTLE)
+    if fetched:
+        count_capture_now('confirmations')
+    if result:
+        logging.info(f"[CAPTURE NOW] Display after press sequence: {result['temperature']} ({result['confidence']})")
+
+def vision_capture_loop():
+    """Pull a frame whenever the sampler wants one sooner than the Pi Zero's periodic push."""
+    while vision_sampler.wait():
+        if edge_readings_fresh():
+            continue
+        fetched, _ = pull_frame()
+        if not fetched:
+            # Back off rather than retry an unreachable Pi Zero at the burst rate
+            vision_sampler.observe(changed=False)
+
+@app.route('/receive_roi', methods=['POST'])
+def receive_roi():
+    """Raw luminance ROI frame from the Pi Zero (see luma_frames)"""
+    try:
+        update_vision_from_roi(request.get_data(), force=request.args.get('changed') == '1')
+    except LumaFrameError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error reading ROI frame: {e}")
+    return jsonify({"status": "success", **pi_zero_calibration()}), 200
+
+def pi_zero_calibration():
+    """Geometry the Pi Zero crops ROI frames to and decodes digits from; it changes after a re-calibration"""
+    calibration = display_calibrator.calibration
+    return {'transport_roi': calibration.transport_roi() if calibration else None,
+            'digits_box': calibration.digits_box if calibration else None}
+
+# Readings decoded on the Pi Zero itself (see pi_zero_servo_control.EDGE_DECODE)
+EDGE_FRESH_SECONDS = 10  # While edge readings are this recent the blade does not pull frames
+edge_status = {'received': 0, 'recorded': 0, 'stale': 0, 'last': None, 'last_received': 0, 'latency_ms': None}
+edge_lock = threading.Lock()
+
+def edge_readings_fresh():
+    with edge_lock:
+        return time.time() - edge_status['last_received'] < EDGE_FRESH_SECONDS
+
+@app.route('/edge_reading', methods=['GET', 'POST'])
+def edge_reading():
+    """POST: a setpoint decoded on the Pi Zero (temperature, confidence, frame_id, timestamp). GET: status"""
+    if request.method == 'GET':
+        with edge_lock:
+            return jsonify({**edge_status, 'fresh': time.time() - edge_status['last_received'] < EDGE_FRESH_SECONDS}), 200
+    data = request.get_json(silent=True)
+    if not data or 'confidence' not in data or 'timestamp' not in data:
+        return jsonify({"status": "error", "message": "Expected temperature, confidence, frame_id and timestamp"}), 400
+    now = time.time()
+    with edge_lock:
+        edge_status['received'] += 1
+        last = edge_status['last']
+        if last is not None and data['timestamp'] <= last['timestamp']:
+            # Overtaken by a newer reading
+            edge_status['stale'] += 1
+            return jsonify({"status": "success", **pi_zero_calibration()}), 200
+        edge_status['last'] = {key: data.get(key) for key in ('temperature', 'confidence', 'frame_id', 'timestamp')}
+        edge_status['last_received'] = now
+        edge_status['latency_ms'] = round((now - data['timestamp']) * 1000, 1)
+    if data.get('temperature') is not None and data['confidence'] in ('HIGH', 'MEDIUM'):
+        record_vision_reading(data['temperature'], data['confidence'])
+        with edge_lock:
+            edge_status['recorded'] += 1
+    return jsonify({"status": "success", **pi_zero_calibration()}), 200
+
 @app.route('/vision_annotated_image')
 def vision_annotated_image():
     """Get the latest image with temperature annotation overlay"""
@@ -577,6 +891,11 @@ def vision_annotated_image():
         
         height, width = img.shape[:2]
         
+        # The cascade reads the clean frame and only reaches the expensive
+        # backends when the cheap ones are unsure
+        reading = vision_reader.read(image_path=latest_image_path, frame=img,
+                                     calibration=display_calibrator.calibration)
+        
         # Create overlay for temperature display
         overlay = img.copy()
         
@@ -589,33 +908,9 @@ def vision_annotated_image():
         
         img = cv2.addWeighted(overlay, 0.7, img, 0.3, 0)
         
-        # Get detected temperature using Claude vision
-        try:
-            # Import vision integration module
-            from vision_integration import get_claude_temperature, get_vision_confidence
-            
-            # Save current image for Claude to read
-            temp_image_path = f"experimental/temp_vision_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            os.makedirs("experimental", exist_ok=True)
-            cv2.imwrite(temp_image_path, img)
-            
-            # Get Claude's reading
-            logging.info(f"[VISION] Calling Claude to read image: {temp_image_path}")
-            detected_temp = get_claude_temperature(temp_image_path)
-            confidence = get_vision_confidence()
-            logging.info(f"[VISION] Claude returned: {detected_temp}°F with confidence: {confidence}")
-            
-            # Clean up temp image
-            try:
-                os.remove(temp_image_path)
-            except:
-                pass
-                
-        except Exception as e:
-            # If Claude is not available, show error
-            logging.error(f"Claude vision failed: {e}")
-            detected_temp = None
-            confidence = "ERROR"
+        detected_temp = reading['temperature']
+        confidence = reading['confidence']
+        logging.info(f"[VISION] {reading['backend']} returned: {detected_temp}°F with confidence: {confidence}")
         
         # Add temperature text
         font = cv2.FONT_HERSHEY_SIMPLEX
@@ -663,18 +958,15 @@ def vision_annotated_image():
         # Encode image
         _, buffer = cv2.imencode('.jpg', img)
         
-        # Update vision detection
-        vision_last_detection = {
-            'temperature': detected_temp,
-            'confidence': confidence,
-            'timestamp': datetime.datetime.now().isoformat()
-        }
-        
-        # Only add to history if we have a valid temperature
-        if detected_temp is not None:
-            vision_temperature_history.append(vision_last_detection)
-            if len(vision_temperature_history) > 100:  # Keep last 100 readings
-                vision_temperature_history.pop(0)
+        # Publish confident readings like frames from /receive_image
+        if detected_temp is not None and confidence in ('HIGH', 'MEDIUM'):
+            record_vision_reading(detected_temp, confidence)
+        else:
+            vision_last_detection = {
+                'temperature': detected_temp,
+                'confidence': confidence,
+                'timestamp': datetime.datetime.now().isoformat()
+            }
         
         return Response(buffer.tobytes(), mimetype='image/jpeg')
         
@@ -682,6 +974,35 @@ def vision_annotated_image():
         logging.error(f"Error creating annotated image: {e}")
         return '', 500
 
+@app.route('/vision_reader_stats')
+def vision_reader_stats():
+    """Gate skip rates, per-backend call counts, hit rates, latency and escalations, OCR pools and result cache"""
+    stats = vision_reader.get_stats()
+    stats['ocr_pools'] = get_pool_stats()
+    stats['result_cache'] = get_result_cache().get_stats()
+    return jsonify(stats), 200
+
+@app.route('/vision_sampler')
+def vision_sampler_route():
+    """Effective vision sampling interval and rate, and what triggered bursts"""
+    stats = vision_sampler.get_stats()
+    with capture_now_lock:
+        stats['capture_now'] = dict(capture_now_stats)
+    return jsonify(stats), 200
+
+@app.route('/display_calibration', methods=['GET', 'POST'])
+def display_calibration_route():
+    """Show the display calibration; POST re-calibrates from the latest image"""
+    if request.method == 'POST':
+        if not latest_image_path or not os.path.exists(latest_image_path):
+            return jsonify({"status": "error", "message": "No image available"}), 404
+        frame = cv2.imread(latest_image_path, cv2.IMREAD_GRAYSCALE)
+        with display_calibrator.lock:
+            calibration = display_calibrator.calibrate(frame)
+        if calibration is None:
+            return jsonify({"status": "error", "message": "No readable display found in the latest image"}), 422
+    return jsonify(display_calibrator.get_status()), 200
+
 @app.route('/vision_temperature_data')
 @app.route('/vision_temperature_data/<timescale>')
 def vision_temperature_data(timescale=None):
@@ -740,7 +1061,8 @@ def vision_temperature_data(timescale=None):
                     'current_temp': current_temp,
                     'last_update': last_update,
                     'confidence': confidence,
-                    'timescale': timescale
+                    'timescale': timescale,
+                    'sample_interval': vision_sampler.get_stats()['effective_interval']
                 })
         except Exception as e:
             logging.error(f"Error getting database readings: {e}")
@@ -769,7 +1091,8 @@ def vision_temperature_data(timescale=None):
         'current_temp': current_temp,
         'last_update': last_update,
         'confidence': confidence,
-        'timescale': 'realtime'
+        'timescale': 'realtime',
+        'sample_interval': vision_sampler.get_stats()['effective_interval']
     })
 
 
@@ -966,6 +1289,17 @@ def sync_vision_state_continuously():
     AI_TEMP_FILE = "/home/jason/claude_image_detection/current_temp_ai.txt"
     
     while True:
+        # With several workers only the scheduler leader syncs the state file
+        if scheduler is not None and not scheduler.is_leader:
+            time.sleep(10)
+            continue
+
+        # Frame readings are the primary source; only fall back to the AI
+        # file when none has been recorded recently
+        if time.time() - last_vision_reading_time < 30:
+            time.sleep(10)
+            continue
+
         try:
             # Read temperature from AI text file
             temperature = None
@@ -1000,12 +1334,24 @@ def sync_vision_state_continuously():
         # Sleep for 10 seconds before next sync
         time.sleep(10)
 
-def main():
-    global scheduler
-    try:
+# Background services are started once per process, however many times the
+# server (or a WSGI worker hook) asks for them
+background_services_started = False
+background_services_lock = threading.Lock()
+
+def start_background_services():
+    """Load settings and start the scheduler, logging and vision sync threads once."""
+    global scheduler, background_services_started
+    with background_services_lock:
+        if background_services_started:
+            logging.debug("Background services already running")
+            return
+
         # Load settings from the file at startup
-        logging.info("Starting main function")
         load_settings()
+        # Already built by main(); with defaults when a WSGI server imported
+        # the app and the first request got here through ensure_background_services
+        create_vision_services()
         
         # Initialize the scheduler with callbacks
         scheduler = ThermostatScheduler(
@@ -1024,15 +1370,93 @@ def main():
         vision_sync_thread = threading.Thread(target=sync_vision_state_continuously, daemon=True)
         vision_sync_thread.start()
 
-        # Start Flask web server
-        logging.info("Starting Flask web server")
+        # Pull frames from the Pi Zero at the adaptive sampling rate
+        if not args.simulate:
+            threading.Thread(target=vision_capture_loop, daemon=True).start()
+
+        # Start OCR worker pools and load the reader backends before the first frame
+        logging.info("Warming up vision readers")
+        threading.Thread(target=warm_up_vision_reader, daemon=True).start()
+
+        background_services_started = True
+
+def warm_up_vision_reader():
+    """Load the vision reader backends, starting their OCR worker pools."""
+    try:
+        vision_reader.load_model()
+        logging.info("Vision readers warm")
+    except Exception as e:
+        logging.error(f"Vision reader warm-up failed: {e}")
+
+@app.before_request
+def ensure_background_services():
+    """Start the services on the first request when a WSGI server imported the app without main()."""
+    if not background_services_started:
+        start_background_services()
+
+def stop_background_services():
+    """Stop the scheduler so its lease is handed over immediately."""
+    if scheduler:
+        scheduler.stop()
+    stop_pools()
+
+def run_production_server(host, port, workers, threads, keepalive):
+    """Serve the app with gunicorn's threaded (gthread) workers."""
+    from gunicorn.app.base import BaseApplication
+
+    class ThermostatApplication(BaseApplication):
+        """Embedded gunicorn application serving the module-level Flask app"""
+
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            self.cfg.set('keepalive', keepalive)
+            # Workers are forked from this process, so start threads inside
+            # each worker; the scheduler lease keeps timers single-fired
+            self.cfg.set('post_worker_init', lambda worker: start_background_services())
+            self.cfg.set('worker_exit', lambda server, worker: stop_background_services())
+
+        def load(self):
+            return app
+
+    if workers > 1:
+        logging.warning("Running %d workers: thermostat state is per-process, so workers may disagree", workers)
+    logging.info("Starting gunicorn on %s:%d (%d workers x %d threads, keepalive %ds)",
+                 host, port, workers, threads, keepalive)
+    ThermostatApplication().run()
+
+def create_vision_services():
+    """Build the vision reader and sampler from args, once."""
+    global vision_reader, vision_sampler
+    if vision_reader is not None:
+        return
+    vision_reader = GatedVisionReader(create_cascade(args.vision_backends))
+    vision_sampler = AdaptiveSampler(min_interval=args.vision_min_interval, max_interval=args.vision_max_interval)
+
+def main(argv=None):
+    global args, PI_ZERO_HOST
+    args = build_arg_parser().parse_args(argv)
+    PI_ZERO_HOST = args.pi_zero_host
+    # Before gunicorn forks its workers, so each inherits the same configuration
+    create_vision_services()
+    try:
+        logging.info("Starting main function")
         app.debug = False  # Disable debug mode
-        app.run(host="0.0.0.0", port=5000)
+
+        if args.production:
+            run_production_server(args.host, args.port, args.workers, args.threads, args.keepalive)
+        else:
+            start_background_services()
+
+            # Start Flask web server
+            logging.info("Starting Flask web server")
+            app.run(host=args.host, port=args.port)
 
     finally:
         logging.info("Exiting application")
-        if scheduler:
-            scheduler.stop()
+        stop_background_services()
         if not args.simulate:
             # Set all servos to a neutral position before exiting
             servo_down.angle = 0
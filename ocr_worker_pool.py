@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Long-lived OCR worker processes
+
+pytesseract forks a tesseract process for every call and every
+LocalVisionAI instance builds its own EasyOCR Reader, so model loading and
+process start-up dominated the cost of a reading. OCRWorkerPool keeps a few
+worker processes alive with the engine already loaded and warmed up.
+Images are handed over through a per-worker shared memory block, so only
+a small job header crosses the pipe.
+
+Tesseract workers use tesserocr (a persistent in-process API) when it is
+installed and fall back to pytesseract otherwise. Workers answer health
+pings (sent by a pool thread every HEALTH_INTERVAL, which also restores
+workers a failed replacement left missing), are replaced when they die or
+miss a deadline, and are recycled after a fixed number of jobs to bound
+memory growth.
+
+    pool = get_pool('tesseract')
+    text = pool.ocr(roi_array, config='--psm 7 -c tessedit_char_whitelist=0123456789')
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAX_IMAGE_BYTES = 4 * 1024 * 1024  # Shared memory per worker; larger images go through the pipe
+DEFAULT_WORKERS = 2
+MAX_JOBS_PER_WORKER = 500  # Recycle a worker after this many jobs
+JOB_TIMEOUT = 10  # Seconds before a job is abandoned and its worker replaced
+START_TIMEOUT = 120  # Seconds a worker may take to load and warm up its engine
+START_RETRY_INTERVAL = 300  # Seconds before a pool that failed to start is tried again
+HEALTH_INTERVAL = 30  # Seconds between pings of the idle workers
+
+
+class OCRPoolError(RuntimeError):
+    """Raised when a pool's workers cannot be started"""
+
+
+def _load_tesseract():
+    """OCR callable backed by tesserocr if available, else pytesseract"""
+    try:
+        import tesserocr
+        from PIL import Image
+        api = tesserocr.PyTessBaseAPI()
+
+        def run(image, config):
+            # tesserocr takes variables instead of a CLI config string
+            api.SetPageSegMode(_psm_from_config(config))
+            whitelist = _whitelist_from_config(config)
+            api.SetVariable('tessedit_char_whitelist', whitelist or '')
+            api.SetImage(Image.fromarray(image))
+            return api.GetUTF8Text()
+        return run
+    except ImportError:
+        import pytesseract
+
+        def run(image, config):
+            return pytesseract.image_to_string(image, config=config)
+        return run
+
+
+def _load_easyocr():
+    import easyocr
+    reader = easyocr.Reader(['en'])
+
+    def run(image, config):
+        return " ".join(result[1] for result in reader.readtext(image))
+    return run
+
+
+# Engine name -> loader returning run(image, config) -> text, called once per worker
+ENGINES = {
+    'tesseract': _load_tesseract,
+    'easyocr': _load_easyocr,
+}
+
+
+def _psm_from_config(config):
+    """Page segmentation mode from a tesseract config string (default 6)"""
+    parts = config.split()
+    if '--psm' in parts:
+        return int(parts[parts.index('--psm') + 1])
+    return 6
+
+
+def _whitelist_from_config(config):
+    for part in config.split():
+        if part.startswith('tessedit_char_whitelist='):
+            return part.split('=', 1)[1]
+    return None
+
+
+def _warm_up_image():
+    """Small image with two bright bars, enough to exercise the engine once"""
+    image = np.zeros((64, 96), dtype=np.uint8)
+    image[8:56, 20:28] = 255
+    image[8:56, 60:68] = 255
+    return image
+
+
+def _worker_main(engine, shm_name, conn):
+    """Worker process loop: load the engine, warm up, then serve jobs"""
+    # The block belongs to the parent, which unlinks it; workers share the
+    # parent's resource tracker, so attaching here does not take ownership
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    try:
+        run = ENGINES[engine]()
+        run(_warm_up_image(), '--psm 7')
+        conn.send(('ready', None))
+    except Exception as e:
+        conn.send(('failed', str(e)))
+        return
+
+    jobs = 0
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        kind = message[0]
+        if kind == 'stop':
+            break
+        if kind == 'ping':
+            conn.send(('pong', jobs))
+            continue
+
+        _, job_id, shape, config, payload = message
+        start = time.perf_counter()
+        try:
+            if payload is None:
+                image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            else:
+                image = payload
+            text = run(image, config)
+            conn.send(('result', job_id, text, (time.perf_counter() - start) * 1000))
+        except Exception as e:
+            conn.send(('error', job_id, str(e), (time.perf_counter() - start) * 1000))
+        jobs += 1
+    shm.close()
+
+
+def _start_context():
+    """
+    Start workers from a clean process, never by forking this one
+
+    The pool starts from a background thread of an already multi-threaded
+    server (request threads, scheduler, capture loop), and a forked child can
+    inherit locks those threads held (logging, imports) locked for good. The
+    fork server is a fresh interpreter that preloads only this module (and
+    NumPy); as with spawn, each worker still imports the server's __main__ as
+    __mp_main__, so main scripts keep their start-up under a __name__ guard.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class OCRWorker:
+    """Parent-side handle for one worker process and its shared memory"""
+
+    def __init__(self, engine, context):
+        self.engine = engine
+        self.shm = shared_memory.SharedMemory(create=True, size=MAX_IMAGE_BYTES)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(engine, self.shm.name, child_conn),
+                                       daemon=True, name=f"ocr-{engine}")
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.next_job_id = 0
+        self.started_at = time.time()
+
+    def wait_ready(self, timeout):
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"{self.engine} worker did not start within {timeout}s")
+        status, detail = self.conn.recv()
+        if status != 'ready':
+            raise RuntimeError(f"{self.engine} worker failed to start: {detail}")
+
+    def run(self, image, config, timeout):
+        """Send one job and wait for its text"""
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        self.next_job_id += 1
+        job_id = self.next_job_id
+        if image.nbytes <= MAX_IMAGE_BYTES:
+            np.ndarray(image.shape, dtype=np.uint8, buffer=self.shm.buf)[...] = image
+            self.conn.send(('job', job_id, image.shape, config, None))
+        else:
+            self.conn.send(('job', job_id, image.shape, config, image))
+
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"OCR job exceeded {timeout}s")
+        kind, reply_id, text, elapsed_ms = self.conn.recv()
+        self.jobs += 1
+        if kind == 'error':
+            raise RuntimeError(text)
+        return text, elapsed_ms
+
+    def ping(self, timeout=2):
+        """True if the process is alive and answers promptly"""
+        if not self.process.is_alive():
+            return False
+        try:
+            self.conn.send(('ping',))
+            if not self.conn.poll(timeout):
+                return False
+            return self.conn.recv()[0] == 'pong'
+        except (OSError, EOFError):
+            return False
+
+    def stop(self, timeout=2):
+        try:
+            self.conn.send(('stop',))
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class OCRWorkerPool:
+    """Fixed-size pool of warm OCR worker processes"""
+
+    def __init__(self, engine='tesseract', workers=DEFAULT_WORKERS, max_jobs_per_worker=MAX_JOBS_PER_WORKER,
+                 job_timeout=JOB_TIMEOUT, start_timeout=START_TIMEOUT):
+        """
+        Args:
+            engine: Key into ENGINES ('tesseract' or 'easyocr')
+            workers: Number of worker processes
+            max_jobs_per_worker: Jobs after which a worker is replaced
+            job_timeout: Seconds to wait for one OCR job
+            start_timeout: Seconds to wait for a worker to load and warm up
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown OCR engine: {engine}")
+        self.engine = engine
+        self.size = workers
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.job_timeout = job_timeout
+        self.start_timeout = start_timeout
+        self.context = _start_context()
+        self.idle = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()  # Held while workers start, so callers wait for the outcome
+        self.started = False
+        self.start_error = None
+        self.start_failed_at = 0
+        self.spawning = 0  # Workers being started, so the health check does not start extras
+        self.last_health = None
+        self.stop_event = threading.Event()
+        self.stats = {'jobs': 0, 'errors': 0, 'timeouts': 0, 'recycled': 0, 'replaced': 0,
+                      'ocr_time_ms': 0.0, 'wait_time_ms': 0.0}
+
+    def _spawn(self):
+        with self.lock:
+            self.spawning += 1
+        try:
+            worker = OCRWorker(self.engine, self.context)
+            try:
+                worker.wait_ready(self.start_timeout)
+            except Exception:
+                worker.stop()
+                raise
+            with self.lock:
+                self.workers.append(worker)
+            return worker
+        finally:
+            with self.lock:
+                self.spawning -= 1
+
+    def _retire(self, worker, reason):
+        """Stop a worker and start a replacement"""
+        with self.lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+            self.stats[reason] += 1
+        worker.stop()
+        try:
+            self.idle.put(self._spawn())
+        except Exception as e:
+            logging.error(f"[OCR POOL] Could not replace {self.engine} worker: {e}")
+
+    def start(self):
+        """
+        Start and warm up every worker; safe to call more than once
+
+        Raises:
+            OCRPoolError: A worker could not load its engine. The workers that
+            did start are stopped, and the pool is not tried again for
+            START_RETRY_INTERVAL, so callers fail fast and move on.
+        """
+        with self.start_lock:
+            if self.started:
+                return self
+            if self.start_error is not None and time.time() - self.start_failed_at < START_RETRY_INTERVAL:
+                raise OCRPoolError(f"{self.engine} workers unavailable: {self.start_error}")
+            start = time.perf_counter()
+            spawned = []
+            try:
+                for _ in range(self.size):
+                    spawned.append(self._spawn())
+            except Exception as e:
+                with self.lock:
+                    self.workers = [worker for worker in self.workers if worker not in spawned]
+                for worker in spawned:
+                    worker.stop()
+                self.start_error, self.start_failed_at = str(e), time.time()
+                logging.error(f"[OCR POOL] Could not start {self.engine} workers: {e}")
+                raise OCRPoolError(f"Could not start {self.engine} workers: {e}") from e
+            for worker in spawned:
+                self.idle.put(worker)
+            self.start_error = None
+            self.started = True
+            self.stop_event = threading.Event()
+            threading.Thread(target=self._health_loop, args=(self.stop_event,), daemon=True,
+                             name=f"ocr-{self.engine}-health").start()
+        logging.info(f"[OCR POOL] {self.size} {self.engine} workers warm in {time.perf_counter() - start:.1f}s")
+        return self
+
+    def ocr(self, image, config='--psm 6'):
+        """
+        Run OCR on a uint8 grayscale array in a warm worker
+
+        Args:
+            image: 2-D uint8 array (a cropped ROI)
+            config: Tesseract config string (EasyOCR ignores it)
+
+        Returns:
+            str: Recognized text
+        """
+        if not self.started:
+            self.start()
+        wait_start = time.perf_counter()
+        try:
+            worker = self.idle.get(timeout=self.job_timeout)
+        except queue.Empty:
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise TimeoutError(f"No idle {self.engine} worker within {self.job_timeout}s") from None
+        wait_ms = (time.perf_counter() - wait_start) * 1000
+
+        try:
+            text, elapsed_ms = worker.run(image, config, self.job_timeout)
+        except TimeoutError:
+            with self.lock:
+                self.stats['timeouts'] += 1
+            threading.Thread(target=self._retire, args=(worker, 'replaced'), daemon=True).start()
+            raise
+        except (OSError, EOFError) as e:
+            # The worker died mid-job
+            threading.Thread(target=self._retire, args=(worker, 'replaced'), daemon=True).start()
+            raise RuntimeError(f"OCR worker died: {e}")
+        except RuntimeError:
+            with self.lock:
+                self.stats['errors'] += 1
+            self.idle.put(worker)
+            raise
+
+        with self.lock:
+            self.stats['jobs'] += 1
+            self.stats['ocr_time_ms'] += elapsed_ms
+            self.stats['wait_time_ms'] += wait_ms
+        if worker.jobs >= self.max_jobs_per_worker:
+            threading.Thread(target=self._retire, args=(worker, 'recycled'), daemon=True).start()
+        else:
+            self.idle.put(worker)
+        return text
+
+    def _health_loop(self, stop_event):
+        while not stop_event.wait(HEALTH_INTERVAL):
+            try:
+                self.health_check()
+            except Exception as e:
+                logging.error(f"[OCR POOL] {self.engine} health check failed: {e}")
+
+    def health_check(self):
+        """
+        Ping every idle worker, replace the ones that do not answer, and start
+        workers for any a failed replacement left missing (run every HEALTH_INTERVAL)
+        """
+        checked, dead = [], []
+        unhealthy = 0
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.ping():
+                checked.append(worker)
+            else:
+                unhealthy += 1
+                dead.append(worker)
+        for worker in checked:
+            self.idle.put(worker)
+        # Replaced here rather than on threads, so the count below is settled
+        for worker in dead:
+            self._retire(worker, 'replaced')
+
+        with self.lock:
+            missing = self.size - len(self.workers) - self.spawning
+        started = 0
+        for _ in range(max(0, missing)):
+            try:
+                self.idle.put(self._spawn())
+                started += 1
+            except Exception as e:
+                logging.error(f"[OCR POOL] Could not restore {self.engine} worker: {e}")
+                break
+        result = {'healthy': len(checked), 'unhealthy': unhealthy, 'restored': started,
+                  'checked_at': time.time()}
+        with self.lock:
+            self.last_health = result
+        if unhealthy or started:
+            logging.warning(f"[OCR POOL] {self.engine} health check: {result}")
+        return result
+
+    def get_stats(self):
+        with self.lock:
+            jobs = self.stats['jobs']
+            return {
+                'engine': self.engine,
+                'workers': len(self.workers),
+                'idle': self.idle.qsize(),
+                'jobs': jobs,
+                'errors': self.stats['errors'],
+                'timeouts': self.stats['timeouts'],
+                'recycled': self.stats['recycled'],
+                'replaced': self.stats['replaced'],
+                'ocr_mean_ms': self.stats['ocr_time_ms'] / jobs if jobs else None,
+                'queue_wait_mean_ms': self.stats['wait_time_ms'] / jobs if jobs else None,
+                'worker_jobs': [worker.jobs for worker in self.workers],
+                'start_error': self.start_error,
+                'health': self.last_health,
+            }
+
+    def stop(self):
+        self.stop_event.set()
+        with self.lock:
+            workers, self.workers = self.workers, []
+            self.started = False
+        for worker in workers:
+            worker.stop()
+        self.idle = queue.Queue()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(engine='tesseract', **kwargs):
+    """Process-wide pool for an engine, created and warmed up on first use"""
+    with _pools_lock:
+        pool = _pools.get(engine)
+        if pool is None:
+            pool = OCRWorkerPool(engine, **kwargs)
+            _pools[engine] = pool
+    return pool.start()
+
+
+def get_pool_stats():
+    """Statistics for every pool started in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.engine: pool.get_stats() for pool in pools}
+
+
+def stop_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    import sys
+    import cv2
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) > 1:
+        engine = sys.argv[2] if len(sys.argv) > 2 else 'tesseract'
+        image = cv2.imread(sys.argv[1], cv2.IMREAD_GRAYSCALE)
+        pool = get_pool(engine)
+        for _ in range(3):
+            start = time.perf_counter()
+            text = pool.ocr(image, config='--psm 7 -c tessedit_char_whitelist=0123456789')
+            print(f"{engine}: '{text.strip()}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(pool.get_stats())
+        stop_pools()
+    else:
+        print("Usage: python ocr_worker_pool.py <image_path> [tesseract|easyocr]")
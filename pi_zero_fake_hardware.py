@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Stand-ins for the Pi Zero's camera and servos
+
+Lets pi_zero_servo_control.py run its real capture, encode and upload path
+on any Linux machine:
+
+    PI_ZERO_FAKE_HARDWARE=1 BLADE_SERVER_URL=http://127.0.0.1:5000 PI_ZERO_PORT=5001 \
+        python pi_zero_servo_control.py
+
+The fake camera renders the simulated thermostat display from
+pi_zero_simulator, whose buttons the fake servos press, or cycles through
+the images in PI_ZERO_FAKE_FRAMES (a directory of JPEGs).
+"""
+
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from pi_zero_simulator import SimulatedThermostat
+
+thermostat = SimulatedThermostat()
+
+
+class FakeServo:
+    """Servo whose return to its start angle presses a simulated button"""
+
+    def __init__(self, name):
+        self.name = name
+        self._angle = None
+        self.pressed_at = None
+
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        # actuate_servo moves to the target and back: the second move completes the press
+        self._angle = value
+        if self.pressed_at is None:
+            self.pressed_at = time.time()
+        else:
+            thermostat.press(self.name, self.pressed_at, time.time())
+            self.pressed_at = None
+
+
+class FakeCamera:
+    """Picamera2 look-alike that fills preallocated luminance frames"""
+
+    def __init__(self, frames_dir=None, frame_rate=5):
+        """
+        Args:
+            frames_dir: Directory of JPEGs to cycle through (default: PI_ZERO_FAKE_FRAMES,
+                        else the simulated display)
+            frame_rate: Frames per second, like the FrameRate control of the real camera
+        """
+        frames_dir = frames_dir or os.environ.get('PI_ZERO_FAKE_FRAMES')
+        paths = sorted(glob.glob(os.path.join(frames_dir, '*.jpg'))) if frames_dir else []
+        self.frames = [frame for frame in (cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in paths)
+                       if frame is not None]
+        self.frame_period = 1.0 / frame_rate
+        self.index = 0
+        self.last_frame = 0
+        self.config = None
+
+    def create_video_configuration(self, main=None, controls=None):
+        return {'main': main, 'controls': controls}
+
+    def configure(self, config):
+        self.config = config
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read_y_plane(self, out):
+        """Copy the next frame into out (an (height, width) uint8 array)"""
+        # Frames arrive at the configured rate, as from the sensor
+        wait = self.last_frame + self.frame_period - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self.last_frame = time.monotonic()
+        if self.frames:
+            frame = self.frames[self.index % len(self.frames)]
+            self.index += 1
+        else:
+            frame = thermostat.render_frame()
+        if frame.shape == out.shape:
+            np.copyto(out, frame)
+        else:
+            cv2.resize(frame, (out.shape[1], out.shape[0]), dst=out, interpolation=cv2.INTER_AREA)
@@ -1,28 +1,52 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+import os
+import queue
 import time
-import board
-import busio
-from adafruit_pca9685 import PCA9685
-from adafruit_motor import servo
-from picamera2 import Picamera2
 import threading
 import requests
 import logging
+from contextlib import contextmanager
 import cv2 
+import numpy as np
+
+from command_queue import CommandQueue
+from frame_pipeline import StageStats
+from luma_frames import CONTENT_TYPE as LUMA_CONTENT_TYPE, LumaFrameError, box_pixels, max_packed_size, pack_roi
+
+# PI_ZERO_FAKE_HARDWARE=1 runs this script on any Linux machine with the
+# stand-ins from pi_zero_fake_hardware instead of the servo HAT and camera
+FAKE_HARDWARE = os.environ.get('PI_ZERO_FAKE_HARDWARE') == '1'
+if FAKE_HARDWARE:
+    from pi_zero_fake_hardware import FakeCamera as Picamera2, FakeServo
+else:
+    import board
+    import busio
+    from adafruit_pca9685 import PCA9685
+    from adafruit_motor import servo
+    from picamera2 import MappedArray, Picamera2
+
+try:
+    # Copied from the blade along with experimental/seven_segment_ocr.py
+    from seven_segment_decoder import SevenSegmentDecoder
+except ImportError:
+    SevenSegmentDecoder = None
 
 app = Flask(__name__)
 
-# Create the I2C bus interface
-i2c = busio.I2C(board.SCL, board.SDA)
+if FAKE_HARDWARE:
+    servo_down, servo_mode, servo_up = FakeServo('down'), FakeServo('mode'), FakeServo('up')
+else:
+    # Create the I2C bus interface
+    i2c = busio.I2C(board.SCL, board.SDA)
 
-# Create a PCA9685 instance
-pca = PCA9685(i2c)
-pca.frequency = 50  # Set the PWM frequency to 50Hz
+    # Create a PCA9685 instance
+    pca = PCA9685(i2c)
+    pca.frequency = 50  # Set the PWM frequency to 50Hz
 
-# Create servo objects for channels
-servo_down = servo.Servo(pca.channels[0])
-servo_mode = servo.Servo(pca.channels[1])
-servo_up = servo.Servo(pca.channels[2])
+    # Create servo objects for channels
+    servo_down = servo.Servo(pca.channels[0])
+    servo_mode = servo.Servo(pca.channels[1])
+    servo_up = servo.Servo(pca.channels[2])
 
 # Initialize the camera with lower resolution and frame rate
 picam2 = Picamera2()
@@ -34,11 +58,79 @@ picam2.configure(config)
 picam2.start()
 
 # Blade server URL
-BLADE_SERVER_URL = 'http://10.0.0.213:5000'  # Update with the actual IP or hostname
+BLADE_SERVER_URL = os.environ.get('BLADE_SERVER_URL', 'http://10.0.0.213:5000')  # Update with the actual IP or hostname
 
 # Create a session for persistent connections
 session = requests.Session()
 
+# The blade asks for frames with /capture_now when it needs one (after a
+# press, while its sampler is bursting). On its own the Pi Zero checks the
+# display every CAPTURE_INTERVAL but only encodes and uploads a frame when
+# the display region changed, plus a heartbeat frame every HEARTBEAT_INTERVAL.
+CAPTURE_INTERVAL = 2  # Seconds between captures compared against the last sent frame
+HEARTBEAT_INTERVAL = 120  # Longest gap between uploads while nothing changes
+RETRY_INTERVAL = 15  # Seconds to wait after a failed upload
+SIGNATURE_SIZE = (32, 16)  # The display region is shrunk to this many cells (width, height)
+CHANGE_THRESHOLD = 20  # Grey levels a cell must move by to count as a change
+MAX_SETTLE = 5  # Longest settle delay /capture_now accepts
+JPEG_QUALITY = 70
+
+# 'roi': once the blade has calibrated the display, push only that region as
+# raw luminance (luma_frames) and a full JPEG every UI_JPEG_INTERVAL for the
+# web UI. 'jpeg': push full JPEGs as before.
+FRAME_TRANSPORT = 'roi'
+UI_JPEG_INTERVAL = 60
+ROI_COMPRESSION = True  # zlib level 1 (lossless): a few ms of CPU, far fewer bytes over Wi-Fi than raw
+
+# Edge decoding: once the blade has shared its digit box, decode the setpoint
+# here every EDGE_INTERVAL and post only (value, confidence, frame id) to the
+# blade's /edge_reading. Images are uploaded only while the local decode is
+# not confident (or on request via /capture_now), plus the heartbeat.
+EDGE_DECODE = True  # Needs seven_segment_decoder; off when it is not installed
+EDGE_INTERVAL = 0.5  # Seconds between captures while decoding on the device
+EDGE_KEEPALIVE = 5  # Re-post an unchanged reading this often so the blade knows it is current
+CONFIDENT = ('HIGH', 'MEDIUM')
+
+# Frames are copied from the camera into a fixed set of preallocated buffers
+# instead of a new array per capture: on 512 MB the per-frame allocations
+# fragment the heap and trigger GC pauses
+FRAME_SHAPE = (450, 800)  # Luminance rows the blade works with (see read_y_plane)
+FRAME_BUFFERS = 3  # Capture loop, /capture_now, and one spare
+STAGES = ('capture', 'signature', 'decode', 'encode', 'upload')
+
+# picam2 is shared by the push thread and /capture_now
+camera_lock = threading.Lock()
+last_push_time = 0
+last_jpeg_time = 0
+roi_box = None  # Display region (fractions) from the blade's calibration
+edge_decoder = None  # SevenSegmentDecoder for the blade's digit box
+frame_id = 0
+
+capture_stats = {'captured': 0, 'skipped': 0, 'sent': 0, 'heartbeats': 0, 'ui_frames': 0,
+                 'send_failures': 0, 'on_demand': 0, 'last_difference': None,
+                 'decoded': 0, 'edge_sent': 0, 'edge_failures': 0, 'last_edge_reading': None}
+capture_stats_lock = threading.Lock()
+
+def count_capture(key):
+    with capture_stats_lock:
+        capture_stats[key] += 1
+
+stage_stats = StageStats(STAGES)
+
+
+class CaptureBuffer:
+    """A preallocated luminance frame and the buffer its ROI frame is packed into"""
+
+    def __init__(self, shape=FRAME_SHAPE):
+        self.gray = np.empty(shape, dtype=np.uint8)
+        # Room for a full-frame ROI even if zlib expands it
+        self.packed = bytearray(max_packed_size(self.gray.size))
+
+
+free_buffers = queue.Queue()
+for _ in range(FRAME_BUFFERS):
+    free_buffers.put(CaptureBuffer())
+
 def actuate_servo(servo_motor, start_angle, target_angle):
     """Move the servo from start_angle to target_angle and back."""
     servo_motor.angle = target_angle
@@ -46,53 +138,300 @@ def actuate_servo(servo_motor, start_angle, target_angle):
     servo_motor.angle = start_angle
     time.sleep(1.0)  # Increased from 0.5s - more delay between presses
 
+SERVOS = {'down': servo_down, 'mode': servo_mode, 'up': servo_up}
+MAX_PRESSES = 50  # Most presses one command may ask for (more than the whole setpoint range)
+
+# Presses run on the command worker, not in the request handler (see command_queue)
+commands = CommandQueue(lambda name, start, target: actuate_servo(SERVOS[name], start, target)).start()
+
 @app.route('/actuate_servo', methods=['POST'])
 def handle_actuate_servo():
+    """
+    Queue count presses of a servo and return the command id at once
+
+    Poll /commands/<command_id> for its state and per-press timestamps.
+    """
     data = request.get_json()
     servo_name = data.get('servo')
     start_angle = data.get('start_angle', 0)
     target_angle = data.get('target_angle', 180)
+    count = data.get('count', 1)
 
-    if servo_name == 'down':
-        actuate_servo(servo_down, start_angle, target_angle)
-    elif servo_name == 'mode':
-        actuate_servo(servo_mode, start_angle, target_angle)
-    elif servo_name == 'up':
-        actuate_servo(servo_up, start_angle, target_angle)
-    else:
+    if servo_name not in SERVOS:
         return jsonify({"status": "error", "message": "Invalid servo name"}), 400
+    if not isinstance(count, int) or not 1 <= count <= MAX_PRESSES:
+        return jsonify({"status": "error", "message": f"count must be 1 to {MAX_PRESSES}"}), 400
+
+    command = commands.submit(servo_name, start_angle, target_angle, count)
+    return jsonify({"status": "queued", "command_id": command['id'], "command": command}), 202
 
-    return jsonify({"status": "success"})
+@app.route('/commands/<command_id>', methods=['GET', 'DELETE'])
+def handle_command(command_id):
+    """Status of a queued command; DELETE cancels the presses it has not started"""
+    if request.method == 'DELETE':
+        command = commands.cancel(command_id)
+    else:
+        command = commands.get(command_id)
+    if command is None:
+        return jsonify({"status": "error", "message": "Unknown command"}), 404
+    return jsonify(command)
 
 def setup_camera():
     """Initialize and configure the camera with retry logic"""
     global picam2
     try:
-        # Clean up previous instance if exists
-        if picam2:
-            picam2.stop()
-            picam2.close()
-            
-        picam2 = Picamera2()
-        config = picam2.create_video_configuration(
-            main={"size": (800, 600), "format": "YUV420"},
-            controls={"FrameRate": 5}
-        )
-        picam2.configure(config)
-        picam2.start()
+        with camera_lock:
+            # Clean up previous instance if exists
+            if picam2:
+                picam2.stop()
+                picam2.close()
+                
+            picam2 = Picamera2()
+            config = picam2.create_video_configuration(
+                main={"size": (800, 600), "format": "YUV420"},
+                controls={"FrameRate": 5}
+            )
+            picam2.configure(config)
+            picam2.start()
         logging.info("Camera initialized successfully")
         return True
     except Exception as e:
         logging.error(f"Camera initialization failed: {e}")
         return False
 
+def read_y_plane(out):
+    """Copy the grayscale (Y) component of the next camera frame into out"""
+    if FAKE_HARDWARE:
+        picam2.read_y_plane(out)
+        return
+    # Map the camera's own buffer rather than copying it into a new array
+    with picam2.captured_request() as captured:
+        with MappedArray(captured, 'main') as mapped:
+            # Extract the grayscale component (the top rows, skipping the stride padding)
+            np.copyto(out, mapped.array[:out.shape[0], :out.shape[1]])
+
+@contextmanager
+def captured_frame():
+    """
+    Capture into a pooled buffer
+
+    Yields:
+        (buffer, frame_id): the CaptureBuffer, valid only inside the with block
+    """
+    global frame_id
+    buffer = free_buffers.get(timeout=10)
+    try:
+        with stage_stats.timed('capture'):
+            with camera_lock:
+                read_y_plane(buffer.gray)
+                frame_id += 1
+                captured_id = frame_id
+        yield buffer, captured_id
+    finally:
+        free_buffers.put(buffer)
+
+def capture_jpeg():
+    """Capture a frame and encode its grayscale (Y) plane as JPEG bytes"""
+    with captured_frame() as (buffer, _):
+        return encode_jpeg(buffer.gray)
+
+def encode_jpeg(grayscale_frame):
+    # Encode the frame in JPEG format with lower quality. cv2.imencode
+    # always allocates its output, but these are small and, with ROI
+    # transport, only sent for the UI.
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]  # Quality from 0 to 100
+    with stage_stats.timed('encode'):
+        ret, buffer = cv2.imencode('.jpg', grayscale_frame, encode_param)
+    if not ret:
+        return None
+    return buffer.tobytes()
+
+def encode_roi(buffer, box, captured_id):
+    """Pack the box (fractions) of a captured frame as an ROI frame, in the buffer's own packing space"""
+    with stage_stats.timed('encode'):
+        return pack_roi(buffer.gray, box, captured_id, compress=ROI_COMPRESSION, out=buffer.packed)
+
+def frame_signature(grayscale_frame, box=None):
+    """Tiny float32 copy of the display region (or the whole frame) for change detection"""
+    if box is not None:
+        x0, y0, x1, y1 = box_pixels(box, grayscale_frame.shape)
+        grayscale_frame = grayscale_frame[y0:y1, x0:x1]
+    with stage_stats.timed('signature'):
+        return cv2.resize(grayscale_frame, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def signature_changed(signature, reference):
+    """True if any cell moved by more than CHANGE_THRESHOLD, ignoring uniform brightness shifts"""
+    if reference is None or reference.shape != signature.shape:
+        return True
+    difference = signature - reference
+    difference = float(np.abs(difference - np.median(difference)).max())
+    with capture_stats_lock:
+        capture_stats['last_difference'] = round(difference, 1)
+    return difference > CHANGE_THRESHOLD
+
+def send_image(image_data, purpose=None, changed=False):
+    """Post a JPEG to the blade's /receive_image; True on success"""
+    global last_push_time, last_jpeg_time
+    fields = {}
+    if purpose:
+        fields['purpose'] = purpose
+    if changed:
+        # Read the frame now rather than when the blade's sampler is next due
+        fields['changed'] = '1'
+    try:
+        with stage_stats.timed('upload'):
+            response = session.post(
+                f"{BLADE_SERVER_URL}/receive_image",
+                files={'image': ('image.jpg', image_data, 'image/jpeg')},
+                data=fields,
+                timeout=10  # Set a timeout for the request
+            )
+        response.raise_for_status()
+        last_push_time = last_jpeg_time = time.time()
+        logging.info("Image sent successfully")
+        return True
+    except requests.RequestException as e:
+        logging.error(f"Error sending image: {e}")
+        return False
+
+def send_roi(roi_data, changed=False):
+    """Post a packed ROI frame (bytes or a view of a capture buffer) to the blade's /receive_roi; True on success"""
+    global last_push_time
+    try:
+        with stage_stats.timed('upload'):
+            response = session.post(
+                f"{BLADE_SERVER_URL}/receive_roi",
+                data=roi_data,
+                params={'changed': 1} if changed else None,
+                headers={'Content-Type': LUMA_CONTENT_TYPE},
+                timeout=10
+            )
+        response.raise_for_status()
+        last_push_time = time.time()
+        # Follow re-calibrations on the blade
+        update_calibration(response.json())
+        logging.info(f"ROI frame sent ({len(roi_data)} bytes)")
+        return True
+    except (requests.RequestException, ValueError) as e:
+        logging.error(f"Error sending ROI frame: {e}")
+        return False
+
+def update_calibration(data):
+    """Adopt the display ROI and digit box from a blade response"""
+    global roi_box, edge_decoder
+    box = tuple(data['transport_roi']) if data.get('transport_roi') else None
+    if box != roi_box:
+        logging.info(f"Display ROI is now {box}")
+        roi_box = box
+    digits_box = tuple(data['digits_box']) if data.get('digits_box') else None
+    if not (EDGE_DECODE and SevenSegmentDecoder and digits_box):
+        edge_decoder = None
+    elif edge_decoder is None or edge_decoder.digits_box != digits_box:
+        logging.info(f"Decoding digits on the device at {digits_box}")
+        edge_decoder = SevenSegmentDecoder(digits_box=digits_box)
+
+def refresh_calibration():
+    """Fetch the display region and digit box from the blade's calibration"""
+    try:
+        response = session.get(f"{BLADE_SERVER_URL}/display_calibration", timeout=10)
+        response.raise_for_status()
+        update_calibration(response.json())
+    except (requests.RequestException, ValueError) as e:
+        logging.error(f"Error fetching display calibration: {e}")
+
+def send_edge_reading(reading, captured_id, captured_at):
+    """Post a locally decoded reading to the blade's /edge_reading; True on success"""
+    try:
+        with stage_stats.timed('upload'):
+            response = session.post(
+                f"{BLADE_SERVER_URL}/edge_reading",
+                json={'temperature': reading['temperature'], 'confidence': reading['confidence'],
+                      'frame_id': captured_id, 'timestamp': captured_at},
+                timeout=5
+            )
+        response.raise_for_status()
+        update_calibration(response.json())
+        count_capture('edge_sent')
+        return True
+    except (requests.RequestException, ValueError) as e:
+        count_capture('edge_failures')
+        logging.error(f"Error sending edge reading: {e}")
+        return False
+
+def parse_box(text):
+    """'x0,y0,x1,y1' fractions from a query parameter"""
+    box = tuple(float(v) for v in text.split(','))
+    if len(box) != 4 or not 0 <= box[0] < box[2] <= 1 or not 0 <= box[1] < box[3] <= 1:
+        raise ValueError(f"Invalid box {text!r}")
+    return box
+
+@app.route('/capture_now', methods=['GET', 'POST'])
+def handle_capture_now():
+    """
+    Capture a fresh frame right away, optionally after a settle delay
+
+    Query parameters:
+        settle: Seconds to wait first so the display can redraw after a press
+        push: If 1, post the frame to the blade's /receive_image instead of returning it
+        format: 'roi' for a raw luminance ROI frame (luma_frames) instead of a JPEG
+        box: ROI as 'x0,y0,x1,y1' fractions (format=roi; defaults to the pushed ROI)
+    """
+    settle = min(max(request.args.get('settle', 0, type=float), 0), MAX_SETTLE)
+    push = request.args.get('push', 0, type=int) == 1
+    if request.args.get('format') == 'roi':
+        try:
+            box = parse_box(request.args['box']) if 'box' in request.args else roi_box
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if box is None:
+            return jsonify({"status": "error", "message": "No ROI known; pass box"}), 400
+        if settle:
+            time.sleep(settle)
+        count_capture('on_demand')
+        try:
+            with captured_frame() as (buffer, captured_id):
+                # Copied out (a few KB) so the buffer is back in the pool before the upload
+                roi_data = bytes(encode_roi(buffer, box, captured_id))
+        except LumaFrameError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except Exception as e:
+            logging.error(f"Capture on demand failed: {e}")
+            return jsonify({"status": "error", "message": str(e)}), 503
+        if push:
+            if not send_roi(roi_data):
+                return jsonify({"status": "error", "message": "Failed to send ROI frame"}), 502
+            return jsonify({"status": "success", "bytes": len(roi_data)})
+        return Response(roi_data, mimetype=LUMA_CONTENT_TYPE)
+    if settle:
+        time.sleep(settle)
+    count_capture('on_demand')
+    try:
+        image_data = capture_jpeg()
+    except Exception as e:
+        logging.error(f"Capture on demand failed: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 503
+    if image_data is None:
+        return jsonify({"status": "error", "message": "Failed to encode image"}), 500
+    captured_at = time.time()
+    if push:
+        if not send_image(image_data):
+            return jsonify({"status": "error", "message": "Failed to send image"}), 502
+        return jsonify({"status": "success", "captured_at": captured_at, "bytes": len(image_data)})
+    return Response(image_data, mimetype='image/jpeg', headers={'X-Captured-At': str(captured_at)})
+
 def capture_and_send_image():
     retry_delay = 5  # Initial retry delay in seconds
     max_retry_delay = 60  # Maximum retry delay
     camera_initialized = False
+    sent_signature = ui_signature = signature_box = None
+    last_edge_key, last_edge_sent = None, 0
+    delay = 0  # Wait before the next capture, taken after the frame's buffer is back in the pool
     
     while True:
         try:
+            if delay:
+                time.sleep(delay)
+                delay = 0
             if not camera_initialized:
                 camera_initialized = setup_camera()
                 if not camera_initialized:
@@ -102,38 +441,88 @@ def capture_and_send_image():
                 else:
                     retry_delay = 5  # Reset retry delay after success
 
-            logging.info("Capturing and sending image")
-            frame = picam2.capture_array()
-            # Extract the grayscale component
-            grayscale_frame = frame[:frame.shape[0]//2, :]
-            # Encode the frame in JPEG format with lower quality
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 70]  # Quality from 0 to 100
-            ret, buffer = cv2.imencode('.jpg', grayscale_frame, encode_param)
-            if not ret:
-                logging.error("Failed to encode image")
-                continue
-            # Prepare the image data for sending
-            image_data = buffer.tobytes()
-            # Send the image to the blade server
-            try:
-                response = session.post(
-                    f"{BLADE_SERVER_URL}/receive_image",
-                    files={'image': ('image.jpg', image_data, 'image/jpeg')},
-                    timeout=10  # Set a timeout for the request
-                )
-                response.raise_for_status()
-                logging.info("Image sent successfully")
-            except requests.RequestException as e:
-                logging.error(f"Error sending image: {e}")
-            # Release resources
-            del frame
-            del grayscale_frame
-            del buffer
-            del image_data
+            # The frame lives in a pooled buffer until the block ends, so the
+            # ROI frame is packed and uploaded straight from it
+            with captured_frame() as (buffer, captured_id):
+                grayscale_frame = buffer.gray
+                captured_at = time.time()
+                count_capture('captured')
+                decoder = edge_decoder
+                interval = EDGE_INTERVAL if decoder is not None else CAPTURE_INTERVAL
+                roi_mode = FRAME_TRANSPORT == 'roi' and roi_box is not None
+                box = roi_box if roi_mode else None
+                if box != signature_box:
+                    # Signatures of different regions cannot be compared
+                    sent_signature = ui_signature = None
+                    signature_box = box
+                signature = frame_signature(grayscale_frame, box)
+                now = time.time()
+
+                if roi_mode and now >= last_jpeg_time + UI_JPEG_INTERVAL and (
+                        signature_changed(signature, ui_signature) or now >= last_jpeg_time + HEARTBEAT_INTERVAL):
+                    # Low-rate full frame for the web UI and the blade's drift check
+                    image_data = encode_jpeg(grayscale_frame)
+                    if image_data is not None and send_image(image_data, purpose='ui'):
+                        ui_signature = signature
+                        count_capture('ui_frames')
+
+                edge_confident = False
+                if decoder is not None:
+                    with stage_stats.timed('decode'):
+                        reading = decoder.decode(grayscale_frame)
+                    count_capture('decoded')
+                    edge_confident = reading['temperature'] is not None and reading['confidence'] in CONFIDENT
+                    key = (reading['temperature'], reading['confidence'])
+                    with capture_stats_lock:
+                        capture_stats['last_edge_reading'] = {'temperature': key[0], 'confidence': key[1],
+                                                              'frame_id': captured_id}
+                    # Post changes at once, and an unchanged reading now and then
+                    if (key != last_edge_key or now >= last_edge_sent + EDGE_KEEPALIVE) and \
+                            send_edge_reading(reading, captured_id, captured_at):
+                        last_edge_key, last_edge_sent = key, now
+
+                # A push from /capture_now counts towards the heartbeat
+                changed = signature_changed(signature, sent_signature)
+                if edge_confident:
+                    # The blade already has the reading; an image adds nothing
+                    changed = False
+                if not changed and now < last_push_time + HEARTBEAT_INTERVAL:
+                    # Nothing new on the display: skip the encode and the upload
+                    count_capture('skipped')
+                    delay = interval
+                    continue
+
+                if roi_mode:
+                    try:
+                        roi_data = encode_roi(buffer, roi_box, captured_id)
+                    except LumaFrameError as e:
+                        logging.error(f"Bad display ROI, back to full frames: {e}")
+                        update_calibration({})
+                        continue
+                    sent = send_roi(roi_data, changed=changed)
+                else:
+                    logging.info("Capturing and sending image")
+                    image_data = encode_jpeg(grayscale_frame)
+                    if image_data is None:
+                        logging.error("Failed to encode image")
+                        delay = RETRY_INTERVAL
+                        continue
+                    # Send the image to the blade server
+                    sent = send_image(image_data, changed=changed)
+                    if sent and FRAME_TRANSPORT == 'roi':
+                        # The blade calibrates from full frames; switch to ROI frames once it has
+                        refresh_calibration()
+                if sent:
+                    sent_signature = signature
+                    count_capture('sent' if changed else 'heartbeats')
+                    delay = interval
+                else:
+                    count_capture('send_failures')
+                    # Do not retry a down blade in a tight loop
+                    delay = RETRY_INTERVAL
             
             # Reset retry delay after successful capture
             retry_delay = 5
-            time.sleep(3)
 
         except Exception as e:
             logging.error(f"Camera error: {e}")
@@ -145,6 +534,7 @@ def capture_and_send_image():
                 logging.error(f"Error cleaning up camera: {cleanup_error}")
             
             # Wait with exponential backoff
+            delay = 0
             time.sleep(retry_delay)
             retry_delay = min(retry_delay * 2, max_retry_delay)
 
@@ -154,7 +544,10 @@ threading.Thread(target=capture_and_send_image, daemon=True).start()
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "ok"}), 200
+    with capture_stats_lock:
+        stats = dict(capture_stats)
+    return jsonify({"status": "ok", "capture": stats, "timings": stage_stats.get_stats(),
+                    "commands": commands.get_stats()}), 200
 
 if __name__ == '__main__':
     # Configure logging
@@ -164,4 +557,4 @@ if __name__ == '__main__':
         filename='pi_zero.log',
         filemode='a'
     )
-    app.run(host='0.0.0.0', port=5000)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PI_ZERO_PORT', 5000)))
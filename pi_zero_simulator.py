@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Pi Zero stand-in server for load and latency testing
+
+Implements the same HTTP API as pi_zero_servo_control.py (/actuate_servo,
+/commands/<id>, /capture_now and /health) without I2C or picamera2, so the blade can be exercised end
+to end on any machine. Presses are queued like on the device, take a
+configurable time with jitter, can fail or hang on demand, and drive a simulated thermostat display whose
+state can be inspected at /display_state. Optionally pushes a rendered
+frame of the display to the blade's /receive_image like the real camera,
+or with --transport roi raw display ROI frames to /receive_roi.
+
+    python pi_zero_simulator.py --port 5001 --press-latency 1.5 --jitter 0.2
+    python main.py --pi-zero-host http://127.0.0.1:5001
+"""
+
+import argparse
+import logging
+import random
+import threading
+import time
+
+import cv2
+import requests
+from flask import Flask, Response, jsonify, request
+
+from command_queue import CommandQueue
+from luma_frames import CONTENT_TYPE as LUMA_CONTENT_TYPE, LumaFrameError, pack_roi
+from synthetic_frames import render_display
+
+app = Flask(__name__)
+
+MODES = ['OFF', 'HEAT', 'COOL']
+MAX_SETTLE = 5  # Longest settle delay /capture_now accepts
+MAX_PRESSES = 50  # Most presses one command may ask for (more than the whole setpoint range)
+UI_JPEG_INTERVAL = 60  # Full frames pushed in ROI transport mode, for the UI
+
+
+class SimulatedThermostat:
+    """Display state machine driven by the three servo buttons"""
+
+    def __init__(self, screen_timeout=45, heat_temp=75, cool_temp=75):
+        self.screen_timeout = screen_timeout
+        self.mode = 0  # Index into MODES
+        self.heat_temp = heat_temp
+        self.cool_temp = cool_temp
+        self.last_press_time = None
+        self.press_log = []
+        self.lock = threading.Lock()
+
+    def screen_on(self, now=None):
+        """The backlight is on if a button was pressed within the timeout"""
+        now = now or time.time()
+        return self.last_press_time is not None and now - self.last_press_time <= self.screen_timeout
+
+    def press(self, servo_name, started_at, finished_at):
+        """Apply one button press to the display state"""
+        with self.lock:
+            woke = not self.screen_on(started_at)
+            if woke:
+                # The first press on a dark screen only turns the backlight on
+                effect = 'wake'
+            elif servo_name == 'mode':
+                self.mode = (self.mode + 1) % len(MODES)
+                effect = f"mode->{MODES[self.mode]}"
+            elif MODES[self.mode] == 'OFF':
+                effect = 'ignored'
+            elif servo_name == 'up':
+                effect = self._adjust(1)
+            else:
+                effect = self._adjust(-1)
+
+            self.last_press_time = finished_at
+            self.press_log.append({
+                'servo': servo_name,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'effect': effect
+            })
+            return effect
+
+    def _adjust(self, delta):
+        if MODES[self.mode] == 'HEAT':
+            self.heat_temp += delta
+            return f"heat->{self.heat_temp}"
+        self.cool_temp += delta
+        return f"cool->{self.cool_temp}"
+
+    def displayed_setpoint(self):
+        """Setpoint shown on the display for the current mode, or None when OFF"""
+        if MODES[self.mode] == 'HEAT':
+            return self.heat_temp
+        if MODES[self.mode] == 'COOL':
+            return self.cool_temp
+        return None
+
+    def state(self):
+        with self.lock:
+            return {
+                'mode': MODES[self.mode],
+                'heat_temp': self.heat_temp,
+                'cool_temp': self.cool_temp,
+                'setpoint': self.displayed_setpoint(),
+                'screen_on': self.screen_on(),
+                'presses': len(self.press_log)
+            }
+
+    def render_frame(self):
+        """Render a grayscale frame of the display, dim when the backlight is off"""
+        with self.lock:
+            setpoint = self.displayed_setpoint()
+            mode = MODES[self.mode]
+        # Blank digits when OFF, as on the real display
+        frame, _ = render_display(setpoint if setpoint is not None else '--', mode, self.screen_on())
+        return frame
+
+
+# Simulation settings, replaced from the command line in main()
+config = argparse.Namespace(
+    press_latency=1.5,
+    jitter=0.0,
+    failure_rate=0.0,
+    hang_rate=0.0,
+    hang_seconds=8.0,
+    push_images=None,
+    transport='jpeg',
+)
+thermostat = SimulatedThermostat()
+stats = {'requests': 0, 'failures_injected': 0, 'hangs_injected': 0, 'captures_on_demand': 0}
+last_push_time = 0
+last_jpeg_time = 0
+roi_box = None  # Display region (fractions) from the blade's calibration
+frame_id = 0
+stats_lock = threading.Lock()
+
+def press(servo_name, start_angle, target_angle):
+    """One simulated press, run on the command worker like on the real rig"""
+    if random.random() < config.failure_rate:
+        with stats_lock:
+            stats['failures_injected'] += 1
+        logging.warning("Injected failure for %s press", servo_name)
+        raise RuntimeError("Injected failure")
+
+    started_at = time.time()
+    latency = max(0.0, random.gauss(config.press_latency, config.jitter))
+    if random.random() < config.hang_rate:
+        # The press still lands, but only after the caller has likely given up
+        with stats_lock:
+            stats['hangs_injected'] += 1
+        latency = config.hang_seconds
+    time.sleep(latency)
+    effect = thermostat.press(servo_name, started_at, time.time())
+    logging.info("Pressed %s (%s) in %.2fs", servo_name, effect, latency)
+
+
+# Only one button can be pressed at a time, like the real servo rig
+commands = CommandQueue(press)
+
+
+@app.route('/actuate_servo', methods=['POST'])
+def handle_actuate_servo():
+    data = request.get_json()
+    servo_name = data.get('servo')
+    count = data.get('count', 1)
+    if servo_name not in ('down', 'mode', 'up'):
+        return jsonify({"status": "error", "message": "Invalid servo name"}), 400
+    if not isinstance(count, int) or not 1 <= count <= MAX_PRESSES:
+        return jsonify({"status": "error", "message": f"count must be 1 to {MAX_PRESSES}"}), 400
+
+    with stats_lock:
+        stats['requests'] += 1
+    command = commands.submit(servo_name, data.get('start_angle', 0), data.get('target_angle', 180), count)
+    return jsonify({"status": "queued", "command_id": command['id'], "command": command}), 202
+
+
+@app.route('/commands/<command_id>', methods=['GET', 'DELETE'])
+def handle_command(command_id):
+    command = commands.cancel(command_id) if request.method == 'DELETE' else commands.get(command_id)
+    if command is None:
+        return jsonify({"status": "error", "message": "Unknown command"}), 404
+    return jsonify(command)
+
+
+@app.route('/capture_now', methods=['GET', 'POST'])
+def capture_now():
+    """Render the display now, after an optional settle delay; push=1 posts it to the blade"""
+    settle = min(max(request.args.get('settle', 0, type=float), 0), MAX_SETTLE)
+    push = request.args.get('push', 0, type=int) == 1
+    if settle:
+        time.sleep(settle)
+    with stats_lock:
+        stats['captures_on_demand'] += 1
+    if request.args.get('format') == 'roi':
+        try:
+            box = tuple(float(v) for v in request.args['box'].split(',')) if 'box' in request.args else roi_box
+            if box is None:
+                raise ValueError("No ROI known; pass box")
+            roi_data = encode_roi(box)
+        except (ValueError, LumaFrameError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return Response(roi_data, mimetype=LUMA_CONTENT_TYPE)
+    image_data = encode_frame()
+    if image_data is None:
+        return jsonify({"status": "error", "message": "Failed to encode image"}), 500
+    captured_at = time.time()
+    if push:
+        if not config.push_images:
+            return jsonify({"status": "error", "message": "No blade URL to push to"}), 400
+        if not send_image(requests.Session(), config.push_images, image_data):
+            return jsonify({"status": "error", "message": "Failed to send image"}), 502
+        return jsonify({"status": "success", "captured_at": captured_at, "bytes": len(image_data)})
+    return Response(image_data, mimetype='image/jpeg', headers={'X-Captured-At': str(captured_at)})
+
+
+@app.route('/display_state', methods=['GET'])
+def display_state():
+    return jsonify(thermostat.state()), 200
+
+
+@app.route('/presses', methods=['GET'])
+def presses():
+    since = request.args.get('since', 0, type=float)
+    with thermostat.lock:
+        log = [press for press in thermostat.press_log if press['started_at'] >= since]
+    return jsonify(log), 200
+
+
+# Health check endpoint
+@app.route('/health', methods=['GET'])
+def health_check():
+    with stats_lock:
+        snapshot = dict(stats)
+    return jsonify({"status": "ok", "simulated": True, "stats": snapshot, "commands": commands.get_stats()}), 200
+
+
+def encode_frame():
+    ret, buffer = cv2.imencode('.jpg', thermostat.render_frame(), [int(cv2.IMWRITE_JPEG_QUALITY), 70])
+    return buffer.tobytes() if ret else None
+
+
+def encode_roi(box):
+    global frame_id
+    with stats_lock:
+        frame_id += 1
+        captured_id = frame_id
+    return pack_roi(thermostat.render_frame(), box, captured_id, compress=True)
+
+
+def send_image(session, blade_url, image_data, purpose=None):
+    global last_push_time, last_jpeg_time
+    try:
+        response = session.post(
+            f"{blade_url}/receive_image",
+            files={'image': ('image.jpg', image_data, 'image/jpeg')},
+            data={'purpose': purpose} if purpose else None,
+            timeout=10
+        )
+        response.raise_for_status()
+        last_push_time = last_jpeg_time = time.time()
+        return True
+    except requests.RequestException as e:
+        logging.error(f"Error sending image: {e}")
+        return False
+
+
+def send_roi(session, blade_url, roi_data):
+    global last_push_time, roi_box
+    try:
+        response = session.post(f"{blade_url}/receive_roi", data=roi_data,
+                                headers={'Content-Type': LUMA_CONTENT_TYPE}, timeout=10)
+        response.raise_for_status()
+        last_push_time = time.time()
+        box = response.json().get('transport_roi')
+        roi_box = tuple(box) if box else None
+        return True
+    except (requests.RequestException, ValueError) as e:
+        logging.error(f"Error sending ROI frame: {e}")
+        return False
+
+
+def refresh_roi_box(session, blade_url):
+    global roi_box
+    try:
+        response = session.get(f"{blade_url}/display_calibration", timeout=10)
+        response.raise_for_status()
+        box = response.json().get('transport_roi')
+        roi_box = tuple(box) if box else None
+    except (requests.RequestException, ValueError) as e:
+        logging.error(f"Error fetching display calibration: {e}")
+
+
+def push_images(blade_url, interval):
+    """Post a rendered frame to the blade periodically, like capture_and_send_image"""
+    session = requests.Session()
+    while True:
+        now = time.time()
+        roi_mode = config.transport == 'roi' and roi_box is not None
+        if roi_mode and now >= last_jpeg_time + UI_JPEG_INTERVAL:
+            image_data = encode_frame()
+            if image_data is None or not send_image(session, blade_url, image_data, purpose='ui'):
+                time.sleep(interval)
+            continue
+        # A push from /capture_now counts; only fill the gaps
+        wait = last_push_time + interval - now
+        if wait > 0:
+            time.sleep(min(wait, max(0, last_jpeg_time + UI_JPEG_INTERVAL - now)) if roi_mode else wait)
+            continue
+        if roi_mode:
+            sent = send_roi(session, blade_url, encode_roi(roi_box))
+        else:
+            image_data = encode_frame()
+            sent = image_data is not None and send_image(session, blade_url, image_data)
+            if sent and config.transport == 'roi':
+                refresh_roi_box(session, blade_url)
+        if not sent:
+            time.sleep(interval)
+
+
+def main():
+    global config, thermostat
+    parser = argparse.ArgumentParser(description="Simulated Pi Zero servo and camera server")
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=5001, help='Port to listen on')
+    parser.add_argument('--press-latency', type=float, default=1.5,
+                        help='Seconds per press (the real rig holds 0.5s and waits 1.0s)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Standard deviation of press latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of presses that fail their command')
+    parser.add_argument('--hang-rate', type=float, default=0.0,
+                        help='Fraction of presses that land only after --hang-seconds')
+    parser.add_argument('--hang-seconds', type=float, default=8.0, help='Duration of a hanging press')
+    parser.add_argument('--screen-timeout', type=float, default=45, help='Seconds until the backlight turns off')
+    parser.add_argument('--push-images', metavar='BLADE_URL', help='Push frames to BLADE_URL/receive_image')
+    parser.add_argument('--push-interval', type=float, default=15.0,
+                        help='Seconds between pushed frames (the blade pulls /capture_now when it needs one sooner)')
+    parser.add_argument('--transport', choices=('jpeg', 'roi'), default='jpeg',
+                        help="Push full JPEGs, or raw display ROI frames once the blade is calibrated")
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible jitter and failures')
+    config = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    if config.seed is not None:
+        random.seed(config.seed)
+    thermostat = SimulatedThermostat(screen_timeout=config.screen_timeout)
+    commands.start()
+
+    if config.push_images:
+        threading.Thread(target=push_images, args=(config.push_images, config.push_interval), daemon=True).start()
+
+    logging.info("Simulated Pi Zero listening on %s:%d", config.host, config.port)
+    app.run(host=config.host, port=config.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
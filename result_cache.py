@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of vision reader results
+
+The expensive readers are often asked about exactly the same pixels:
+repeated /vision_annotated_image requests, a loop re-reading an unchanged
+upload, and retries. ResultCache keys each result on a hash of the image
+(ROI) bytes plus the backend name and version. Any identical image is
+answered from memory, and changing a backend's version invalidates its
+entries. Entries expire after a TTL and the least recently used ones are
+evicted. With a path the cache is also written to a JSON file, so it
+survives restarts.
+
+    cache = get_result_cache()
+    key = ResultCache.key(roi.tobytes(), 'llava_docker', '1')
+    result = cache.get(key)
+    if result is None:
+        result = reader.read(...)
+        cache.put(key, result)
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+TTL_SECONDS = 900  # A stale answer for identical pixels is still right, but bound it anyway
+SAVE_INTERVAL = 5  # Seconds between writes of the persistent file
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL and optional JSON persistence"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, path=None):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Seconds an entry stays valid
+            path: Optional JSON file the cache is loaded from and saved to
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.entries = OrderedDict()  # key -> (stored_at, result), oldest first
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # One writer of the file at a time
+        self.last_save = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'stored': 0}
+        if path:
+            self._load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def key(data, backend, version):
+        """Cache key for image bytes read by one version of a backend"""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return f"{backend}/{version}/{digest}"
+
+    def get(self, key):
+        """The cached result for a key (a copy marked 'cached'), or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            stored_at, result = entry
+            if time.time() - stored_at > self.ttl:
+                del self.entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+        cached = dict(result)
+        cached['cached'] = True
+        return cached
+
+    def put(self, key, result):
+        """Store a result; errors are not cached so they are retried"""
+        if result.get('confidence') == 'ERROR':
+            return
+        with self.lock:
+            self.entries[key] = (time.time(), {k: v for k, v in result.items() if k != 'cached'})
+            self.entries.move_to_end(key)
+            self.stats['stored'] += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evicted'] += 1
+            # Claim the save here so concurrent puts don't all write the file
+            save = self.path and time.time() - self.last_save >= SAVE_INTERVAL
+            if save:
+                self.last_save = time.time()
+        if save:
+            self.save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"[RESULT CACHE] Ignoring unreadable {self.path}: {e}")
+            return
+        now = time.time()
+        for key, stored_at, result in data.get('entries', []):
+            if now - stored_at <= self.ttl:
+                self.entries[key] = (stored_at, result)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        logging.info(f"[RESULT CACHE] Loaded {len(self.entries)} entries from {self.path}")
+
+    def save(self):
+        """Write the cache to its file (atomically)"""
+        if not self.path:
+            return
+        with self.save_lock:
+            # Snapshot under the save lock so the last writer also has the newest entries
+            with self.lock:
+                data = {'entries': [[key, stored_at, result] for key, (stored_at, result) in self.entries.items()]}
+                self.last_save = time.time()
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                                 suffix='.tmp', dir=os.path.dirname(self.path) or '.')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logging.warning(f"[RESULT CACHE] Could not save {self.path}: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        self.save()
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'persistent': bool(self.path),
+                'hit_rate': self.stats['hits'] / lookups if lookups else None,
+                **self.stats,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide cache; VISION_RESULT_CACHE names a file to persist it to"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache(path=os.environ.get('VISION_RESULT_CACHE'))
+        return _default_cache
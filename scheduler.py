@@ -6,6 +6,8 @@ import time
 import pytz
 from typing import List, Dict, Optional, Tuple
 import uuid
+import os
+import socket
 from contextlib import contextmanager
 
 # Database configuration
@@ -20,6 +22,12 @@ VALID_MODES = ['off', 'heat', 'cool']
 # Timezone configuration - change this to your local timezone
 LOCAL_TIMEZONE = pytz.timezone('US/Pacific')  # PST/PDT timezone
 
+# Leader lease configuration. Only the instance holding the lease arms and
+# fires timers; every instance can still serve CRUD against the database.
+LEASE_TTL = 15  # Seconds a lease stays valid without a heartbeat
+LEASE_HEARTBEAT_INTERVAL = 5  # Seconds between lease renewals
+CHANGE_POLL_INTERVAL = 1  # Seconds between checks of the change log
+
 class SchedulerError(Exception):
     """Custom exception for scheduler-related errors"""
     pass
@@ -85,6 +93,29 @@ def init_database():
             ON execution_history(schedule_id)
         ''')
         
+        # Single-row leader lease shared by every scheduler instance
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scheduler_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                holder TEXT,
+                expires_at REAL NOT NULL DEFAULT 0,
+                heartbeat_at REAL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO scheduler_lease (id, holder, expires_at) VALUES (1, NULL, 0)')
+        
+        # Change log so the leader can pick up mutations made by other
+        # instances without re-reading every schedule
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schedule_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                schedule_id TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                source TEXT,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         conn.commit()
         logging.info("Database initialized successfully")
 
@@ -103,34 +134,193 @@ class ThermostatScheduler:
         self.timers_lock = threading.RLock()
         self.running = True
         self.monitor_thread = None
+        self.lease_thread = None
+        
+        # Leader lease state
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.lease_expires_at = 0.0
+        self.last_change_seq = 0
         
         # Initialize database
         init_database()
         
     def start(self):
-        """Start the scheduler monitoring thread"""
+        """Start the scheduler monitoring and lease threads"""
         self.running = True
+        # Try to take the lease right away so a sole instance starts firing
+        # timers immediately instead of after the first heartbeat
+        self._renew_lease()
+        self.lease_thread = threading.Thread(target=self._maintain_lease, daemon=True)
+        self.lease_thread.start()
         self.monitor_thread = threading.Thread(target=self._monitor_schedules, daemon=True)
         self.monitor_thread.start()
-        self._load_all_schedules()
-        logging.info("Scheduler started")
+        logging.info(f"Scheduler started ({'leader' if self.is_leader else 'follower'}, instance {self.instance_id})")
         
     def stop(self):
         """Stop the scheduler and clean up"""
         self.running = False
-        with self.timers_lock:
-            for timer in self.active_timers.values():
-                timer.cancel()
-            self.active_timers.clear()
+        self._cancel_all_timers()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
+        if self.lease_thread:
+            self.lease_thread.join(timeout=5)
+        self._release_lease()
         logging.info("Scheduler stopped")
         
+    def _maintain_lease(self):
+        """Renew (or try to acquire) the leader lease and apply remote changes"""
+        last_heartbeat = time.time()
+        while self.running:
+            try:
+                time.sleep(CHANGE_POLL_INTERVAL)
+                if not self.running:
+                    break
+                if time.time() - last_heartbeat >= LEASE_HEARTBEAT_INTERVAL:
+                    self._renew_lease()
+                    last_heartbeat = time.time()
+                if self.is_leader:
+                    self._apply_schedule_changes()
+            except Exception as e:
+                logging.error(f"Error in lease thread: {e}")
+                
+    def _renew_lease(self) -> bool:
+        """
+        Acquire or renew the leader lease.
+        
+        The lease is taken if it is free, expired, or already ours. Becoming
+        leader loads every enabled schedule; losing the lease cancels all
+        local timers so that two instances never fire the same schedule.
+        
+        Returns:
+            True if this instance holds the lease
+        """
+        now = time.time()
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE scheduler_lease 
+                    SET holder = ?, expires_at = ?, heartbeat_at = ?
+                    WHERE id = 1 AND (holder = ? OR holder IS NULL OR expires_at < ?)
+                ''', (self.instance_id, now + LEASE_TTL, now, self.instance_id, now))
+                conn.commit()
+                acquired = cursor.rowcount == 1
+        except sqlite3.Error as e:
+            # A transient lock should not drop leadership while our lease is still valid
+            logging.error(f"Error renewing scheduler lease: {e}")
+            acquired = self.is_leader and now < self.lease_expires_at
+            
+        was_leader = self.is_leader
+        if acquired:
+            self.lease_expires_at = now + LEASE_TTL
+        self.is_leader = acquired
+        
+        if acquired and not was_leader:
+            logging.info(f"Acquired scheduler lease as {self.instance_id}")
+            # Read the change counter before loading so nothing made in between is missed
+            self.last_change_seq = self._get_latest_change_seq()
+            self._load_all_schedules()
+        elif was_leader and not acquired:
+            logging.warning(f"Lost scheduler lease, cancelling local timers ({self.instance_id})")
+            self._cancel_all_timers()
+            
+        return acquired
+        
+    def _release_lease(self):
+        """Give up the lease so another instance can take over immediately"""
+        if not self.is_leader:
+            return
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE scheduler_lease 
+                    SET holder = NULL, expires_at = 0
+                    WHERE id = 1 AND holder = ?
+                ''', (self.instance_id,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error releasing scheduler lease: {e}")
+        self.is_leader = False
+        logging.info(f"Released scheduler lease ({self.instance_id})")
+        
+    def _holds_lease(self) -> bool:
+        """Check that this instance is leader and its lease has not lapsed"""
+        return self.is_leader and time.time() < self.lease_expires_at
+        
+    def get_lease_info(self) -> Dict:
+        """Get the current lease holder and this instance's role"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT holder, expires_at, heartbeat_at FROM scheduler_lease WHERE id = 1')
+            row = cursor.fetchone()
+            
+        return {
+            'instance_id': self.instance_id,
+            'is_leader': self._holds_lease(),
+            'holder': row['holder'] if row else None,
+            'expires_in': round(row['expires_at'] - time.time(), 1) if row and row['holder'] else None,
+            'last_change_seq': self.last_change_seq
+        }
+        
+    def _record_change(self, cursor, schedule_id: str, operation: str):
+        """Append a mutation to the change log (within the caller's transaction)"""
+        cursor.execute('''
+            INSERT INTO schedule_changes (schedule_id, operation, source)
+            VALUES (?, ?, ?)
+        ''', (schedule_id, operation, self.instance_id))
+        
+    def _get_latest_change_seq(self) -> int:
+        """Get the current value of the change counter"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(seq) FROM schedule_changes')
+            row = cursor.fetchone()
+            return row[0] or 0
+            
+    def _apply_schedule_changes(self):
+        """Re-arm timers only for schedules other instances changed since the last poll"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT seq, schedule_id, source FROM schedule_changes 
+                WHERE seq > ? 
+                ORDER BY seq
+            ''', (self.last_change_seq,))
+            changes = cursor.fetchall()
+            
+        if not changes:
+            return
+            
+        # Our own mutations already updated local timers directly
+        changed_ids = {change['schedule_id'] for change in changes if change['source'] != self.instance_id}
+        for schedule_id in changed_ids:
+            self._refresh_timer(schedule_id)
+            
+        self.last_change_seq = changes[-1]['seq']
+        if changed_ids:
+            logging.info(f"Applied {len(changed_ids)} schedule change(s) from other instances")
+            
+    def _refresh_timer(self, schedule_id: str):
+        """Re-read a single schedule and replace its timer"""
+        self._cancel_timer(schedule_id)
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT enabled, next_execution FROM schedules WHERE id = ?', (schedule_id,))
+            schedule = cursor.fetchone()
+            
+        if schedule and schedule['enabled'] and schedule['next_execution']:
+            next_exec = datetime.datetime.fromisoformat(schedule['next_execution'])
+            self._schedule_timer(schedule_id, next_exec)
+        
     def _monitor_schedules(self):
         """Monitor for missed schedules and recovery"""
         while self.running:
             try:
-                self._check_missed_schedules()
+                if self._holds_lease():
+                    self._check_missed_schedules()
                 self._cleanup_old_history()
                 time.sleep(60)  # Check every minute
             except Exception as e:
@@ -167,6 +357,13 @@ class ThermostatScheduler:
                 DELETE FROM execution_history 
                 WHERE executed_at < ?
             ''', (thirty_days_ago.isoformat(),))
+            
+            # The change log only needs to cover the gap between polls
+            one_day_ago = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+            cursor.execute('''
+                DELETE FROM schedule_changes 
+                WHERE changed_at < ?
+            ''', (one_day_ago.strftime('%Y-%m-%d %H:%M:%S'),))
             conn.commit()
             
     def create_schedule(self, time_str: str, temperature: int, mode: str, 
@@ -204,9 +401,10 @@ class ThermostatScheduler:
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (schedule_id, time_str, temperature, mode.lower(), 
                   1 if enabled else 0, days_of_week, next_execution.isoformat()))
+            self._record_change(cursor, schedule_id, 'create')
             conn.commit()
             
-        if enabled:
+        if enabled and self.is_leader:
             self._schedule_timer(schedule_id, next_execution)
             
         logging.info(f"Created schedule {schedule_id}: {time_str} {temperature}°F {mode}")
@@ -267,11 +465,12 @@ class ThermostatScheduler:
                 params.append(schedule_id)
                 query = f"UPDATE schedules SET {', '.join(updates)} WHERE id = ?"
                 cursor.execute(query, params)
+                self._record_change(cursor, schedule_id, 'update')
                 conn.commit()
                 
                 # Update timer if needed
                 self._cancel_timer(schedule_id)
-                if kwargs.get('enabled', schedule['enabled']):
+                if self.is_leader and kwargs.get('enabled', schedule['enabled']):
                     cursor.execute('SELECT * FROM schedules WHERE id = ?', (schedule_id,))
                     updated_schedule = cursor.fetchone()
                     next_exec = datetime.datetime.fromisoformat(updated_schedule['next_execution'])
@@ -286,6 +485,7 @@ class ThermostatScheduler:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM schedules WHERE id = ?', (schedule_id,))
+            self._record_change(cursor, schedule_id, 'delete')
             conn.commit()
             
         logging.info(f"Deleted schedule {schedule_id}")
@@ -410,10 +610,22 @@ class ThermostatScheduler:
                 del self.active_timers[schedule_id]
                 logging.info(f"Cancelled timer for schedule {schedule_id}")
                 
+    def _cancel_all_timers(self):
+        """Cancel every active timer"""
+        with self.timers_lock:
+            for timer in self.active_timers.values():
+                timer.cancel()
+            self.active_timers.clear()
+                
     def _execute_schedule(self, schedule_id: str):
         """Execute a scheduled action with retry logic"""
         current_time = datetime.datetime.now(LOCAL_TIMEZONE)
         
+        # A timer can race with losing the lease; never actuate as a follower
+        if not self._holds_lease():
+            logging.warning(f"Skipping schedule {schedule_id}: this instance does not hold the scheduler lease")
+            return
+        
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM schedules WHERE id = ?', (schedule_id,))
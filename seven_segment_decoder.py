@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Pure-NumPy seven-segment decoder for the thermostat display
+
+Instead of running OCR, samples a small grid of pixels in the middle of
+each of the seven segments of every digit inside a calibrated region of
+interest, thresholds them against the unlit "holes" of the same digit, and
+classifies the on/off vector against the pattern table from
+experimental/seven_segment_ocr.create_seven_segment_templates. The
+per-segment distance from the threshold is reported as a margin and used
+as confidence. A frame costs a few hundred pixel reads, so decoding takes
+well under a millisecond and can run on every uploaded frame.
+"""
+
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from experimental.seven_segment_ocr import create_seven_segment_templates
+
+# Digit region as fractions of the frame (x0, y0, x1, y1), matching the
+# display area used by experimental/seven_segment_ocr.py
+DEFAULT_DIGITS_BOX = (0.34, 0.18, 0.66, 0.42)
+DEFAULT_DIGIT_COUNT = 2
+DEFAULT_DIGIT_GAP = 0.12  # Gap between digit cells as a fraction of cell width
+
+# Where to sample inside a digit cell, in the pattern order top, top-right,
+# bottom-right, bottom, bottom-left, top-left, middle. Boxes cover only the
+# centre of each segment so small misalignment does not bleed into neighbours.
+SEGMENT_SAMPLE_BOXES = np.array([
+    (0.30, 0.02, 0.70, 0.08),
+    (0.88, 0.18, 0.97, 0.38),
+    (0.88, 0.62, 0.97, 0.82),
+    (0.30, 0.92, 0.70, 0.98),
+    (0.03, 0.62, 0.12, 0.82),
+    (0.03, 0.18, 0.12, 0.38),
+    (0.30, 0.47, 0.70, 0.53),
+])
+
+# The two enclosed areas of every digit are never lit and give the local
+# background level
+HOLE_SAMPLE_BOXES = np.array([
+    (0.35, 0.20, 0.65, 0.38),
+    (0.35, 0.62, 0.65, 0.80),
+])
+
+SAMPLES_PER_AXIS = 3
+
+DIGITS = sorted(create_seven_segment_templates().keys())
+PATTERNS = np.array([create_seven_segment_templates()[digit] for digit in DIGITS], dtype=bool)
+PATTERN_SIGNS = np.where(PATTERNS, 1.0, -1.0)  # (10, 7) for soft matching
+
+# A digit needs at least this much lit-vs-background contrast (grey levels)
+MIN_CONTRAST = 25
+HIGH_MARGIN = 0.35
+MEDIUM_MARGIN = 0.15
+
+
+class SevenSegmentDecoder:
+    """Samples segment centres in a fixed digit ROI and classifies each digit"""
+
+    name = 'seven_segment'
+
+    def __init__(self, digits_box=DEFAULT_DIGITS_BOX, digit_count=DEFAULT_DIGIT_COUNT,
+                 digit_gap=DEFAULT_DIGIT_GAP):
+        """
+        Args:
+            digits_box: (x0, y0, x1, y1) of the digit region as fractions of the frame
+            digit_count: Number of digits on the display
+            digit_gap: Gap between digit cells as a fraction of cell width
+        """
+        self.digits_box = tuple(digits_box)
+        self.digit_count = digit_count
+        self.digit_gap = digit_gap
+        self._index_cache = {}
+
+    def _sample_points(self, boxes, cell_x, cell_y, cell_w, cell_h):
+        """Grid of (y, x) sample coordinates for each box in one digit cell"""
+        steps = (np.arange(SAMPLES_PER_AXIS) + 0.5) / SAMPLES_PER_AXIS
+        xs = boxes[:, 0:1] + (boxes[:, 2:3] - boxes[:, 0:1]) * steps  # (boxes, n)
+        ys = boxes[:, 1:2] + (boxes[:, 3:4] - boxes[:, 1:2]) * steps
+        grid_x = np.repeat(xs[:, None, :], SAMPLES_PER_AXIS, axis=1).reshape(len(boxes), -1)
+        grid_y = np.repeat(ys[:, :, None], SAMPLES_PER_AXIS, axis=2).reshape(len(boxes), -1)
+        return (cell_y + grid_y * cell_h).astype(np.intp), (cell_x + grid_x * cell_w).astype(np.intp)
+
+    def _indices(self, shape):
+        """Flat pixel indices of every sample for a frame shape, cached"""
+        if shape in self._index_cache:
+            return self._index_cache[shape]
+
+        height, width = shape
+        x0, y0, x1, y1 = self.digits_box
+        x0, x1 = x0 * width, x1 * width
+        y0, y1 = y0 * height, y1 * height
+        cell_w = (x1 - x0) / (self.digit_count + (self.digit_count - 1) * self.digit_gap)
+        cell_h = y1 - y0
+
+        segment_index, hole_index = [], []
+        for position in range(self.digit_count):
+            cell_x = x0 + position * cell_w * (1 + self.digit_gap)
+            ys, xs = self._sample_points(SEGMENT_SAMPLE_BOXES, cell_x, y0, cell_w, cell_h)
+            segment_index.append(np.clip(ys, 0, height - 1) * width + np.clip(xs, 0, width - 1))
+            ys, xs = self._sample_points(HOLE_SAMPLE_BOXES, cell_x, y0, cell_w, cell_h)
+            hole_index.append(np.clip(ys, 0, height - 1) * width + np.clip(xs, 0, width - 1))
+
+        # (digits, 7, samples) and (digits, samples)
+        indices = (np.stack(segment_index), np.stack(hole_index).reshape(self.digit_count, -1))
+        self._index_cache[shape] = indices
+        return indices
+
+    def decode(self, frame):
+        """
+        Decode the digits shown in a frame.
+
+        Args:
+            frame: uint8 image as a NumPy array (grayscale, or BGR from cv2.imread)
+
+        Returns:
+            dict: {'temperature', 'confidence', 'raw_response', 'digits',
+                   'segment_margins', 'min_margin'}
+        """
+        if frame.ndim == 3:
+            frame = frame[:, :, 1]  # The Pi Zero sends luminance only; any channel will do
+        segment_index, hole_index = self._indices(frame.shape)
+        flat = frame.reshape(-1) if frame.flags['C_CONTIGUOUS'] else np.ascontiguousarray(frame).reshape(-1)
+
+        segment_levels = flat[segment_index].mean(axis=2)  # (digits, 7)
+        background = flat[hole_index].mean(axis=1)  # (digits,)
+        lit_level = segment_levels.max(axis=1)
+        contrast = lit_level - background
+        threshold = (lit_level + background) / 2
+        half_range = np.maximum(contrast / 2, 1.0)
+
+        # Signed margin per segment: +1 clearly lit, -1 clearly dark
+        margins = np.clip((segment_levels - threshold[:, None]) / half_range[:, None], -1.0, 1.0)
+        scores = margins @ PATTERN_SIGNS.T  # (digits, 10)
+        best = scores.argmax(axis=1)
+        exact = ((margins > 0) == PATTERNS[best]).all(axis=1)
+        min_margin = float(np.abs(margins).min())
+
+        digits = ''.join(DIGITS[i] for i in best)
+        result = {
+            'temperature': None,
+            'confidence': 'LOW',
+            'raw_response': f"{self.name}: digits={digits} min_margin={min_margin:.2f}",
+            'digits': digits,
+            'segment_margins': np.round(margins, 3).tolist(),
+            'min_margin': min_margin,
+        }
+
+        if (contrast < MIN_CONTRAST).any():
+            result['raw_response'] = f"{self.name}: display too dark or blank (contrast {contrast.min():.0f})"
+            return result
+
+        temperature = int(digits)
+        if not 50 <= temperature <= 90:
+            result['raw_response'] += " (out of range)"
+            return result
+
+        result['temperature'] = temperature
+        if exact.all() and min_margin >= HIGH_MARGIN:
+            result['confidence'] = 'HIGH'
+        elif exact.all() and min_margin >= MEDIUM_MARGIN:
+            result['confidence'] = 'MEDIUM'
+        return result
+
+    def extract_temperature(self, image_path):
+        """
+        Extract temperature from a thermostat image file
+
+        Args:
+            image_path: Path to the thermostat image
+
+        Returns:
+            dict: {'temperature': int, 'confidence': str, 'raw_response': str, ...}
+        """
+        frame = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            return {
+                'temperature': None,
+                'confidence': 'ERROR',
+                'raw_response': f"Could not load image: {image_path}"
+            }
+        return self.decode(frame)
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) > 1:
+        decoder = SevenSegmentDecoder()
+        start = time.perf_counter()
+        result = decoder.extract_temperature(sys.argv[1])
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Temperature: {result['temperature']}")
+        print(f"Confidence: {result['confidence']}")
+        print(f"Raw response: {result['raw_response']}")
+        print(f"Time (including JPEG decode): {elapsed:.2f} ms")
+    else:
+        print("Usage: python seven_segment_decoder.py <image_path>")
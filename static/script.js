@@ -194,6 +194,8 @@ function setMode(mode) {
         userNotRequestingChangeMode = true;
         autoUpdatePaused = false;
         showFeedback(`Mode set to ${mode.toUpperCase()}`);
+        // The display is changing; follow the vision reader's burst
+        scheduleVisionUpdate(VISION_REFRESH_MIN_MS);
     })
     .catch(error => {
         console.error('Error setting mode:', error);
@@ -245,6 +247,7 @@ function sendTemperatureUpdate() {
             userNotRequestingChange = true;
             autoUpdatePaused = false;
             showFeedback("Temperature updated successfully");
+            scheduleVisionUpdate(VISION_REFRESH_MIN_MS);
         })
         .catch(error => {
             console.error('Error sending temperature update:', error);
@@ -619,8 +622,22 @@ function updateVisionTime() {
     }
 }
 
+// Vision data is refreshed at the blade's sampling rate: quickly after a
+// button press, slowly while the display is stable
+const VISION_REFRESH_MIN_MS = 2000;
+const VISION_REFRESH_MAX_MS = 60000;
+let visionUpdateTimer = null;
+
+function scheduleVisionUpdate(delayMs) {
+    clearTimeout(visionUpdateTimer);
+    delayMs = Math.min(VISION_REFRESH_MAX_MS, Math.max(VISION_REFRESH_MIN_MS, delayMs));
+    visionUpdateTimer = setTimeout(updateVisionData, delayMs);
+}
+
 // Update vision temperature data
 function updateVisionData() {
+    // Keep polling even if this request fails
+    scheduleVisionUpdate(VISION_REFRESH_MAX_MS);
     // Fetch the temperature data
     fetchWithTimeout("/vision_temperature_data", {
         method: 'GET',
@@ -647,6 +664,10 @@ function updateVisionData() {
         // Always update the last update time to current time when we fetch data
         visionLastUpdateTime = new Date();
         updateVisionTime();
+        
+        if (data.sample_interval) {
+            scheduleVisionUpdate(data.sample_interval * 1000);
+        }
     })
     .catch(error => console.error('Error fetching vision data:', error));
 }
@@ -734,12 +755,9 @@ window.onload = function() {
     // Display schedules initially
     displayScheduledItems();
     
-    // Update vision data every 60 seconds (1 minute)
-    setInterval(updateVisionData, 60000);
-    
     // Update vision time display every second
     setInterval(updateVisionTime, 1000);
     
-    // Initial vision update
+    // Initial vision update; it schedules the next one at the sampling rate
     updateVisionData();
 };
\ No newline at end of file
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Synthetic seven-segment thermostat frame generator
+
+Renders the thermostat display at any setpoint using the digit patterns
+from experimental/seven_segment_ocr.create_seven_segment_templates, then
+applies configurable noise, blur, glare, perspective and exposure. Frames
+come out as labeled grayscale JPEGs shaped like the Pi Zero's uploads, so
+they can be used as a reproducible corpus for vision benchmarks or
+streamed to the blade's /receive_image for load testing.
+
+    # Write 500 labeled frames to a corpus directory
+    python synthetic_frames.py corpus --count 500 --output-dir corpus/
+
+    # Stream 2 frames per second to a running blade
+    python synthetic_frames.py stream --rate 2 --url http://localhost:5000
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, asdict, field
+
+import cv2
+import numpy as np
+import requests
+
+from experimental.seven_segment_ocr import create_seven_segment_templates
+
+# Pi Zero uploads the top half of an 800x600 YUV420 buffer
+FRAME_WIDTH = 800
+FRAME_HEIGHT = 450
+
+# Segment boxes as fractions of a digit cell, in the pattern order used by
+# create_seven_segment_templates: top, top-right, bottom-right, bottom,
+# bottom-left, top-left, middle. Each box is (x0, y0, x1, y1).
+SEGMENT_BOXES = [
+    (0.15, 0.00, 0.85, 0.10),
+    (0.85, 0.07, 1.00, 0.48),
+    (0.85, 0.52, 1.00, 0.93),
+    (0.15, 0.90, 0.85, 1.00),
+    (0.00, 0.52, 0.15, 0.93),
+    (0.00, 0.07, 0.15, 0.48),
+    (0.15, 0.45, 0.85, 0.55),
+]
+
+DIGIT_PATTERNS = {digit: np.array(pattern, dtype=bool)
+                  for digit, pattern in create_seven_segment_templates().items()}
+
+
+@dataclass
+class DisplayGeometry:
+    """Where the display and its digits sit in the frame, as fractions of the frame size"""
+    display_box: tuple = (0.28, 0.12, 0.72, 0.50)
+    digits_box: tuple = (0.34, 0.18, 0.66, 0.42)
+    digit_gap: float = 0.12  # Gap between digit cells as a fraction of cell width
+
+
+@dataclass
+class Degradation:
+    """Image degradations applied after rendering"""
+    noise_sigma: float = 4.0  # Gaussian sensor noise (grey levels)
+    blur_sigma: float = 0.8  # Gaussian blur (pixels)
+    glare_strength: float = 0.0  # Peak brightness added by a glare blob (grey levels)
+    glare_radius: float = 0.15  # Glare radius as a fraction of frame width
+    perspective: float = 0.0  # Maximum corner displacement as a fraction of frame size
+    exposure: float = 1.0  # Gain applied to the whole frame
+    gamma: float = 1.0
+    jpeg_quality: int = 70
+
+    @classmethod
+    def random(cls, rng, severity=1.0):
+        """Draw a random degradation; severity scales every effect"""
+        return cls(
+            noise_sigma=float(rng.uniform(0, 8) * severity),
+            blur_sigma=float(rng.uniform(0, 2) * severity),
+            glare_strength=float(rng.uniform(0, 120) * severity) if rng.random() < 0.3 else 0.0,
+            glare_radius=float(rng.uniform(0.05, 0.25)),
+            perspective=float(rng.uniform(0, 0.03) * severity),
+            exposure=float(np.clip(rng.normal(1.0, 0.25 * severity), 0.3, 2.0)),
+            gamma=float(np.clip(rng.normal(1.0, 0.2 * severity), 0.5, 2.0)),
+            jpeg_quality=int(rng.integers(50, 90)),
+        )
+
+
+@dataclass
+class FrameLabel:
+    """Ground truth for one synthetic frame"""
+    frame_id: int
+    setpoint: int
+    mode: str
+    backlight: bool
+    digits_box_px: tuple
+    degradation: dict = field(default_factory=dict)
+
+
+def fraction_to_pixels(box, width, height):
+    x0, y0, x1, y1 = box
+    return int(x0 * width), int(y0 * height), int(x1 * width), int(y1 * height)
+
+
+def render_digit(canvas, digit, x0, y0, cell_w, cell_h, on_level, off_level):
+    """Draw one seven-segment digit; unlit segments keep a faint LCD ghost"""
+    pattern = DIGIT_PATTERNS.get(digit)
+    for index, (sx0, sy0, sx1, sy1) in enumerate(SEGMENT_BOXES):
+        lit = pattern is not None and pattern[index]
+        canvas[y0 + int(sy0 * cell_h):y0 + int(sy1 * cell_h),
+               x0 + int(sx0 * cell_w):x0 + int(sx1 * cell_w)] = on_level if lit else off_level
+
+
+def render_display(setpoint, mode='HEAT', backlight=True, geometry=None,
+                   width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    """
+    Render a clean grayscale frame of the thermostat showing `setpoint`.
+
+    Returns:
+        (frame, digits_box_px): uint8 image and the digit region in pixels
+    """
+    geometry = geometry or DisplayGeometry()
+    frame = np.full((height, width), 35, dtype=np.uint8)  # Wall / housing
+
+    dx0, dy0, dx1, dy1 = fraction_to_pixels(geometry.display_box, width, height)
+    lcd_level = 70 if backlight else 30
+    frame[dy0:dy1, dx0:dx1] = lcd_level
+
+    digits_box = fraction_to_pixels(geometry.digits_box, width, height)
+    gx0, gy0, gx1, gy1 = digits_box
+    text = str(setpoint)
+    count = len(text)
+    cell_w = int((gx1 - gx0) / (count + (count - 1) * geometry.digit_gap))
+    cell_h = gy1 - gy0
+    on_level = 225 if backlight else 90
+    off_level = lcd_level + 6
+
+    for position, digit in enumerate(text):
+        x = gx0 + int(position * cell_w * (1 + geometry.digit_gap))
+        render_digit(frame, digit, x, gy0, cell_w, cell_h, on_level, off_level)
+
+    if mode:
+        cv2.putText(frame, mode, (dx0 + 10, dy1 - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                    on_level - 30, 1, cv2.LINE_AA)
+    return frame, digits_box
+
+
+def degrade(frame, degradation, rng):
+    """
+    Apply perspective, glare, exposure, blur and noise to a rendered frame.
+
+    Returns:
+        (image, matrix): degraded uint8 image and the perspective matrix
+        applied (None if there was no warp)
+    """
+    height, width = frame.shape
+    image = frame.astype(np.float32)
+    matrix = None
+
+    if degradation.perspective > 0:
+        corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+        shift = rng.uniform(-1, 1, size=(4, 2)) * degradation.perspective * np.float32([width, height])
+        matrix = cv2.getPerspectiveTransform(corners, (corners + shift).astype(np.float32))
+        image = cv2.warpPerspective(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE)
+
+    if degradation.glare_strength > 0:
+        cx, cy = rng.uniform(0.2, 0.8) * width, rng.uniform(0.1, 0.6) * height
+        radius = degradation.glare_radius * width
+        yy, xx = np.ogrid[:height, :width]
+        image += degradation.glare_strength * np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (2 * radius ** 2))
+
+    image = image * degradation.exposure
+    if degradation.gamma != 1.0:
+        image = 255.0 * (np.clip(image, 0, 255) / 255.0) ** degradation.gamma
+
+    if degradation.blur_sigma > 0:
+        image = cv2.GaussianBlur(image, (0, 0), degradation.blur_sigma)
+
+    if degradation.noise_sigma > 0:
+        image += rng.normal(0, degradation.noise_sigma, size=image.shape).astype(np.float32)
+
+    return np.clip(image, 0, 255).astype(np.uint8), matrix
+
+
+def warp_box(box, matrix):
+    """Bounding box of `box` after a perspective warp"""
+    if matrix is None:
+        return box
+    x0, y0, x1, y1 = box
+    corners = np.float32([[[x0, y0]], [[x1, y0]], [[x1, y1]], [[x0, y1]]])
+    warped = cv2.perspectiveTransform(corners, matrix).reshape(-1, 2)
+    return (int(warped[:, 0].min()), int(warped[:, 1].min()),
+            int(np.ceil(warped[:, 0].max())), int(np.ceil(warped[:, 1].max())))
+
+
+class FrameGenerator:
+    """Reproducible source of labeled synthetic frames"""
+
+    def __init__(self, seed=0, setpoints=(50, 90), modes=('HEAT', 'COOL'), severity=1.0,
+                 backlight_off_rate=0.0, geometry=None, degradation=None):
+        """
+        Args:
+            seed: Random seed; the same seed yields the same frames
+            setpoints: Inclusive (low, high) range of setpoints to draw from
+            modes: Mode labels to draw from
+            severity: Scale of random degradations (ignored if degradation is given)
+            backlight_off_rate: Fraction of frames rendered with the backlight off
+            geometry: Fixed DisplayGeometry (default layout if None)
+            degradation: Fixed Degradation for every frame instead of random ones
+        """
+        self.rng = np.random.default_rng(seed)
+        self.setpoints = setpoints
+        self.modes = modes
+        self.severity = severity
+        self.backlight_off_rate = backlight_off_rate
+        self.geometry = geometry or DisplayGeometry()
+        self.degradation = degradation
+        self.frame_id = 0
+
+    def generate(self, setpoint=None):
+        """
+        Produce one frame.
+
+        Returns:
+            (frame, label): uint8 grayscale image and its FrameLabel
+        """
+        if setpoint is None:
+            setpoint = int(self.rng.integers(self.setpoints[0], self.setpoints[1] + 1))
+        mode = str(self.rng.choice(self.modes))
+        backlight = bool(self.rng.random() >= self.backlight_off_rate)
+        degradation = self.degradation or Degradation.random(self.rng, self.severity)
+
+        clean, digits_box = render_display(setpoint, mode, backlight, self.geometry)
+        frame, matrix = degrade(clean, degradation, self.rng)
+
+        self.frame_id += 1
+        label = FrameLabel(self.frame_id, setpoint, mode, backlight, warp_box(digits_box, matrix),
+                           asdict(degradation))
+        return frame, label
+
+    def generate_jpeg(self, setpoint=None):
+        """Produce one frame encoded as JPEG bytes along with its label"""
+        frame, label = self.generate(setpoint)
+        ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY),
+                                                   label.degradation['jpeg_quality']])
+        if not ret:
+            raise ValueError("Failed to encode synthetic frame")
+        return buffer.tobytes(), label
+
+    def stream(self, rate, count=None):
+        """Yield (jpeg_bytes, label) pairs paced at `rate` frames per second"""
+        interval = 1.0 / rate if rate > 0 else 0
+        next_time = time.perf_counter()
+        produced = 0
+        while count is None or produced < count:
+            yield self.generate_jpeg()
+            produced += 1
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def write_corpus(generator, count, output_dir):
+    """Write `count` frames plus a labels.jsonl index to output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'labels.jsonl'), 'w') as labels:
+        for _ in range(count):
+            jpeg, label = generator.generate_jpeg()
+            filename = f"frame_{label.frame_id:06d}.jpg"
+            with open(os.path.join(output_dir, filename), 'wb') as f:
+                f.write(jpeg)
+            labels.write(json.dumps(dict(asdict(label), file=filename)) + '\n')
+
+
+def load_corpus(corpus_dir):
+    """Load labels.jsonl from a corpus directory, adding the absolute image path"""
+    entries = []
+    with open(os.path.join(corpus_dir, 'labels.jsonl'), 'r') as f:
+        for line in f:
+            entry = json.loads(line)
+            entry['path'] = os.path.join(corpus_dir, entry['file'])
+            entries.append(entry)
+    return entries
+
+
+def stream_to_blade(generator, url, rate, count=None):
+    """Post frames to the blade's /receive_image like the Pi Zero does"""
+    session = requests.Session()
+    sent = failed = 0
+    for jpeg, label in generator.stream(rate, count):
+        try:
+            response = session.post(f"{url}/receive_image",
+                                    files={'image': ('image.jpg', jpeg, 'image/jpeg')}, timeout=10)
+            response.raise_for_status()
+            sent += 1
+        except requests.RequestException as e:
+            failed += 1
+            logging.error(f"Error sending frame {label.frame_id}: {e}")
+    return sent, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic seven-segment thermostat frames")
+    parser.add_argument('command', choices=['corpus', 'stream'], help='Write a corpus or stream to a blade')
+    parser.add_argument('--count', type=int, help='Number of frames (default: 200 for corpus, unbounded for stream)')
+    parser.add_argument('--output-dir', default='synthetic_corpus', help='Corpus output directory')
+    parser.add_argument('--url', default='http://localhost:5000', help='Blade base URL for streaming')
+    parser.add_argument('--rate', type=float, default=1.0, help='Frames per second when streaming')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--severity', type=float, default=1.0, help='Scale of random degradations')
+    parser.add_argument('--min-setpoint', type=int, default=50)
+    parser.add_argument('--max-setpoint', type=int, default=90)
+    parser.add_argument('--backlight-off-rate', type=float, default=0.0,
+                        help='Fraction of frames rendered with the backlight off')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    generator = FrameGenerator(seed=args.seed, setpoints=(args.min_setpoint, args.max_setpoint),
+                               severity=args.severity, backlight_off_rate=args.backlight_off_rate)
+
+    if args.command == 'corpus':
+        count = args.count or 200
+        write_corpus(generator, count, args.output_dir)
+        print(f"Wrote {count} frames to {args.output_dir}")
+    else:
+        sent, failed = stream_to_blade(generator, args.url, args.rate, args.count)
+        print(f"Sent {sent} frames ({failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
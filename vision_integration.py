@@ -4,12 +4,22 @@ Vision integration module for reading temperature with Claude
 import subprocess
 import json
 import os
+import shlex
+import threading
 from datetime import datetime
 
+from vision_worker import (ClaudeStreamCodec, ExternalVisionPool, LineCodec, VisionWorkerError,
+                           VisionWorkerUnavailable, claude_stream_command)
+
 # Global storage for Claude readings
 claude_readings_file = "experimental/claude_vision_log.json"
 last_claude_reading = None
 last_claude_time = None
+CLAUDE_PATH = '/home/jason/.nvm/versions/node/v18.20.8/bin/claude'
+CLAUDE_WORKER_COMMAND = os.environ.get('CLAUDE_WORKER_COMMAND')
+CLAUDE_SESSION_REQUESTS = 10  # Readings per CLI session before it is restarted
+claude_worker = None
+claude_worker_lock = threading.Lock()
 
 def get_claude_temperature(image_path):
     """Get temperature reading from Claude CLI"""
@@ -29,44 +39,102 @@ def get_claude_temperature(image_path):
                 print(f"[CLAUDE CACHE] Using cached reading: {state['temperature']}°F (age: {age:.1f}s)")
                 return state['temperature']
         
-        # Ask Claude to read the temperature
-        prompt = f"Look at {image_path} - what temperature number is shown on this thermostat display? Reply with just the number."
-        claude_path = '/home/jason/.nvm/versions/node/v18.20.8/bin/claude'
-        
-        # Log the command being executed
-        cmd = [claude_path, prompt]
-        print(f"[CLAUDE CMD] Running: {' '.join(cmd)}")
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-        print(f"[CLAUDE RESULT] Return code: {result.returncode}")
-        print(f"[CLAUDE STDOUT] {result.stdout}")
-        if result.stderr:
-            print(f"[CLAUDE STDERR] {result.stderr}")
-        
-        if result.returncode == 0:
-            response = result.stdout.strip()
-            try:
-                temp = int(response.replace('°F', '').replace('°', '').strip())
-                if 50 <= temp <= 90:
-                    last_claude_reading = temp
-                    last_claude_time = datetime.now()
-                    
-                    # Save to shared state
-                    from vision_state import save_state
-                    save_state(temp, datetime.now())
-                    
-                    # Log the reading
-                    log_claude_reading(temp)
-                    
-                    return temp
-            except ValueError:
-                pass
+        result = read_temperature_with_claude(image_path)
+        if result['temperature'] is not None:
+            temp = result['temperature']
+            last_claude_reading = temp
+            last_claude_time = datetime.now()
+            
+            # Save to shared state
+            save_state(temp, datetime.now())
+            
+            # Log the reading
+            log_claude_reading(temp)
+            
+            return temp
     except Exception as e:
         print(f"Error getting Claude temperature: {e}")
     
     # Return last known reading or default
     return last_claude_reading if last_claude_reading else 77
 
+def get_claude_worker():
+    """
+    Long-lived Claude CLI session shared by this process
+    
+    CLAUDE_WORKER_COMMAND, if set, replaces the CLI with any command speaking
+    vision_worker's line protocol, e.g. debug/stub_vision_worker.py.
+    """
+    global claude_worker
+    with claude_worker_lock:
+        if claude_worker is None:
+            if CLAUDE_WORKER_COMMAND:
+                claude_worker = ExternalVisionPool(shlex.split(CLAUDE_WORKER_COMMAND), LineCodec(),
+                                                   name='claude-worker')
+            else:
+                # The session accumulates every exchange, so restart it often
+                claude_worker = ExternalVisionPool(claude_stream_command(CLAUDE_PATH), ClaudeStreamCodec(),
+                                                   max_requests=CLAUDE_SESSION_REQUESTS, name='claude-worker')
+        return claude_worker
+
+def read_temperature_with_claude(image_path, timeout=15):
+    """
+    Ask the Claude CLI for the temperature shown in an image
+    
+    Uses the long-lived worker session and falls back to a one-off CLI
+    call if the session cannot be started.
+    
+    Args:
+        image_path: Path to the thermostat image
+        timeout: Seconds to wait for the answer
+        
+    Returns:
+        dict: {'temperature': int, 'confidence': str, 'raw_response': str}
+    """
+    prompt = f"Look at {image_path} - what temperature number is shown on this thermostat display? Reply with just the number."
+    
+    try:
+        response = get_claude_worker().ask(image_path, prompt, timeout=timeout).strip()
+    except TimeoutError:
+        return {'temperature': None, 'confidence': 'ERROR', 'raw_response': 'Claude command timed out'}
+    except VisionWorkerUnavailable as e:
+        print(f"[CLAUDE WORKER] Unavailable ({e}), running the CLI once")
+        return run_claude_once(prompt, timeout)
+    except VisionWorkerError as e:
+        return {'temperature': None, 'confidence': 'ERROR', 'raw_response': str(e)}
+    print(f"[CLAUDE RESULT] {response}")
+    return parse_claude_response(response)
+
+def run_claude_once(prompt, timeout):
+    """One-off CLI call, paying process start-up"""
+    # Log the command being executed
+    cmd = [CLAUDE_PATH, prompt]
+    print(f"[CLAUDE CMD] Running: {' '.join(cmd)}")
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'temperature': None, 'confidence': 'ERROR', 'raw_response': 'Claude command timed out'}
+    print(f"[CLAUDE RESULT] Return code: {result.returncode}")
+    print(f"[CLAUDE STDOUT] {result.stdout}")
+    if result.stderr:
+        print(f"[CLAUDE STDERR] {result.stderr}")
+    
+    if result.returncode != 0:
+        return {'temperature': None, 'confidence': 'ERROR', 'raw_response': result.stderr.strip()}
+    return parse_claude_response(result.stdout.strip())
+
+def parse_claude_response(response):
+    """Turn Claude's answer into a reading dict"""
+    try:
+        temp = int(response.replace('°F', '').replace('°', '').strip())
+    except ValueError:
+        return {'temperature': None, 'confidence': 'LOW', 'raw_response': response}
+    
+    if 50 <= temp <= 90:
+        return {'temperature': temp, 'confidence': 'HIGH', 'raw_response': response}
+    return {'temperature': None, 'confidence': 'LOW', 'raw_response': f"{response} (out of range)"}
+
 def log_claude_reading(temperature):
     """Log Claude reading to file and database"""
     try:
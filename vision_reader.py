@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Common interface over the temperature readers and a cascade that runs them
+cheapest first
+
+Every backend (seven-segment decoding, Tesseract/EasyOCR, the LLaVA
+container, the Claude CLI) is wrapped in a VisionReader with the same
+read(image_path, frame) -> {'temperature', 'confidence', 'raw_response'}
+contract; a DisplayCalibration, when given, tells each backend where the
+digits are so it can crop to them. CascadingVisionReader tries them in order and only escalates to
+the next, more expensive backend when the current one is not confident
+enough or its reading disagrees with the recent trend. Per-backend call
+counts, hit rate, latency and escalation reasons are kept so it is easy to
+check that the expensive backends stay off most frames.
+"""
+
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+CONFIDENCE_RANK = {'ERROR': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3}
+
+# Cheapest first; the order a cascade uses when none is given
+DEFAULT_BACKENDS = ['seven_segment', 'tesseract_simple', 'tesseract', 'easyocr', 'llava_docker', 'claude']
+
+# Seconds between calls for backends that are too slow or costly to run on
+# every frame; a rate-limited backend is skipped rather than waited for
+DEFAULT_MIN_INTERVALS = {'llava_docker': 5, 'claude': 30}
+
+LATENCY_WINDOW = 200  # Latency samples kept per backend
+
+
+class VisionReader:
+    """Base class for a temperature reader backend"""
+
+    name = 'base'
+    accepts_frames = False  # True if read() can use an in-memory frame instead of a file
+
+    def load_model(self):
+        """Load whatever the backend needs; called once before the first read"""
+        pass
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        """
+        Read the temperature from an image
+
+        Args:
+            image_path: Path to the image on disk
+            frame: The same image as a uint8 NumPy array, if already decoded
+            calibration: DisplayCalibration to crop to instead of the backend's default region
+
+        Returns:
+            dict: {'temperature': int, 'confidence': str, 'raw_response': str}
+        """
+        raise NotImplementedError
+
+    def cleanup(self):
+        """Release resources held by the backend"""
+        pass
+
+
+class SevenSegmentReader(VisionReader):
+    """Pure-NumPy seven-segment decoding, cheap enough for every frame"""
+
+    name = 'seven_segment'
+    accepts_frames = True
+
+    def __init__(self, decoder=None):
+        from seven_segment_decoder import SevenSegmentDecoder
+        self.decoder = decoder or SevenSegmentDecoder()
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        if calibration is not None and calibration.digits_box != self.decoder.digits_box:
+            from seven_segment_decoder import SevenSegmentDecoder
+            self.decoder = SevenSegmentDecoder(digits_box=calibration.digits_box)
+        if frame is not None:
+            return self.decoder.decode(frame)
+        return self.decoder.extract_temperature(image_path)
+
+
+class LocalVisionReader(VisionReader):
+    """Adapter for the LocalVisionAI classes (load_model/extract_temperature/cleanup)"""
+
+    def __init__(self, name, factory):
+        """
+        Args:
+            name: Backend name used in statistics
+            factory: Callable returning the LocalVisionAI instance, called on first use
+        """
+        self.name = name
+        self.factory = factory
+        self.backend = None
+
+    def load_model(self):
+        if self.backend is None:
+            self.backend = self.factory()
+            self.backend.load_model()
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        self.load_model()
+        if calibration is not None:
+            return self.backend.extract_temperature(image_path, roi=calibration.ocr_roi())
+        return self.backend.extract_temperature(image_path)
+
+    def cleanup(self):
+        if self.backend is not None:
+            self.backend.cleanup()
+            self.backend = None
+
+
+class ClaudeCLIReader(VisionReader):
+    """Claude CLI via vision_integration, the most expensive backend"""
+
+    name = 'claude'
+
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        from vision_integration import read_temperature_with_claude
+        if calibration is None or frame is None:
+            return read_temperature_with_claude(image_path, timeout=self.timeout)
+
+        # Show Claude only the display rather than the whole frame
+        fd, crop_path = tempfile.mkstemp(suffix='.jpg')
+        os.close(fd)
+        try:
+            cv2.imwrite(crop_path, calibration.crop(frame, region='display'))
+            return read_temperature_with_claude(crop_path, timeout=self.timeout)
+        finally:
+            os.remove(crop_path)
+
+
+def _local_vision_ai(module_name, pool_engine=None, **kwargs):
+    """
+    Factory for a LocalVisionAI class imported only when first used
+
+    With pool_engine set, the instance shares the process-wide warm
+    ocr_worker_pool for that engine instead of loading its own.
+    """
+    def factory():
+        module = __import__(module_name)
+        if pool_engine is not None:
+            from ocr_worker_pool import get_pool
+            kwargs['worker_pool'] = get_pool(pool_engine)
+        return module.LocalVisionAI(**kwargs)
+    return factory
+
+
+BACKEND_FACTORIES = {
+    'seven_segment': SevenSegmentReader,
+    'tesseract_simple': lambda: LocalVisionReader('tesseract_simple', _local_vision_ai('local_vision_ai_simple',
+                                                                                        pool_engine='tesseract')),
+    'tesseract': lambda: LocalVisionReader('tesseract', _local_vision_ai('local_vision_ai', pool_engine='tesseract')),
+    'easyocr': lambda: LocalVisionReader('easyocr', _local_vision_ai('local_vision_ai', pool_engine='easyocr')),
+    'llava_docker': lambda: LocalVisionReader('llava_docker', _local_vision_ai('local_vision_ai_docker')),
+    'claude': ClaudeCLIReader,
+}
+
+
+# Backends whose results are cached by image content. Bump a backend's
+# version when its behaviour changes so old entries stop matching.
+BACKEND_VERSIONS = {
+    'tesseract_simple': '1',
+    'tesseract': '1',
+    'easyocr': '1',
+    'llava_docker': '1',
+    'claude': '1',
+}
+
+
+def create_reader(name, cache=True):
+    """
+    Create a single backend by name
+
+    Args:
+        name: Key into BACKEND_FACTORIES
+        cache: Wrap backends listed in BACKEND_VERSIONS in the shared result cache
+    """
+    if name not in BACKEND_FACTORIES:
+        raise ValueError(f"Unknown vision backend: {name} (choose from {', '.join(BACKEND_FACTORIES)})")
+    reader = BACKEND_FACTORIES[name]()
+    if cache and name in BACKEND_VERSIONS:
+        from result_cache import get_result_cache
+        reader = CachedVisionReader(reader, get_result_cache(), BACKEND_VERSIONS[name])
+    return reader
+
+
+class CachedVisionReader(VisionReader):
+    """Answers repeat reads of identical pixels from a result_cache.ResultCache"""
+
+    def __init__(self, reader, cache, version):
+        """
+        Args:
+            reader: The backend to cache
+            cache: ResultCache shared with the other backends
+            version: Backend version, part of the cache key
+        """
+        self.reader = reader
+        self.cache = cache
+        self.version = version
+        self.name = reader.name
+        self.accepts_frames = reader.accepts_frames
+
+    def _content(self, image_path, frame, calibration):
+        """Bytes that determine the answer: the display region if known, else the image"""
+        if frame is not None:
+            region = calibration.crop(frame, region='display') if calibration is not None else frame
+            return np.ascontiguousarray(region).tobytes() + str(region.shape).encode()
+        with open(image_path, 'rb') as f:
+            return f.read()
+
+    def load_model(self):
+        self.reader.load_model()
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        key = self.cache.key(self._content(image_path, frame, calibration), self.name, self.version)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.reader.read(image_path=image_path, frame=frame, calibration=calibration)
+            self.cache.put(key, result)
+        return result
+
+    def cleanup(self):
+        self.reader.cleanup()
+
+
+class BackendStats:
+    """Counters and recent latencies for one backend in a cascade"""
+
+    def __init__(self):
+        self.calls = 0
+        self.accepted = 0
+        self.escalated_low_confidence = 0
+        self.escalated_trend = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self):
+        latencies = sorted(self.latencies)
+        return {
+            'calls': self.calls,
+            'accepted': self.accepted,
+            'hit_rate': self.accepted / self.calls if self.calls else None,
+            'escalated_low_confidence': self.escalated_low_confidence,
+            'escalated_trend': self.escalated_trend,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'latency_mean_ms': statistics.mean(latencies) if latencies else None,
+            'latency_p50_ms': latencies[len(latencies) // 2] if latencies else None,
+            'latency_p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        }
+
+
+class CascadingVisionReader(VisionReader):
+    """Runs backends cheapest first and escalates only when needed"""
+
+    name = 'cascade'
+    accepts_frames = True
+
+    def __init__(self, readers, min_confidence='MEDIUM', trend_window=5, trend_tolerance=2,
+                 min_intervals=None):
+        """
+        Args:
+            readers: VisionReader instances ordered from cheapest to most expensive
+            min_confidence: Lowest confidence accepted without escalating
+            trend_window: Number of recent accepted readings that form the trend
+            trend_tolerance: Degrees a reading may differ from the trend median
+            min_intervals: Optional {backend name: seconds} between calls to that backend
+        """
+        self.readers = list(readers)
+        self.min_confidence = min_confidence
+        self.trend_tolerance = trend_tolerance
+        self.min_intervals = dict(DEFAULT_MIN_INTERVALS if min_intervals is None else min_intervals)
+        self.recent = deque(maxlen=trend_window)
+        self.last_called = {}
+        self.stats = {reader.name: BackendStats() for reader in self.readers}
+        self.reads = 0
+        self.escalated_reads = 0
+        self.unresolved_reads = 0
+        self.lock = threading.Lock()
+
+    def _is_confident(self, result):
+        return (result.get('temperature') is not None and
+                CONFIDENCE_RANK.get(result.get('confidence'), 0) >= CONFIDENCE_RANK[self.min_confidence])
+
+    def _trend(self):
+        """Median of the recent accepted readings, or None without history"""
+        with self.lock:
+            return statistics.median(self.recent) if self.recent else None
+
+    def _rate_limited(self, reader):
+        interval = self.min_intervals.get(reader.name)
+        if not interval:
+            return False
+        with self.lock:
+            last = self.last_called.get(reader.name)
+            if last is not None and time.time() - last < interval:
+                return True
+            self.last_called[reader.name] = time.time()
+            return False
+
+    def _accept(self, reader, result, escalations):
+        with self.lock:
+            self.stats[reader.name].accepted += 1
+            self.recent.append(result['temperature'])
+        result = dict(result)
+        result['backend'] = reader.name
+        result['escalations'] = escalations
+        return result
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        """
+        Read the temperature, escalating through the backends as needed
+
+        Returns:
+            dict: The accepted backend's result plus 'backend' and 'escalations'
+                  (list of (backend, reason) for every backend passed over)
+        """
+        with self.lock:
+            self.reads += 1
+
+        trend = self._trend()
+        escalations = []
+        candidate = None  # (reader, result) confident but off-trend
+        best = None
+        temp_path = None
+
+        try:
+            for reader in self.readers:
+                stats = self.stats[reader.name]
+                if self._rate_limited(reader):
+                    with self.lock:
+                        stats.rate_limited += 1
+                    continue
+
+                # File-based backends need the frame on disk
+                if not reader.accepts_frames and image_path is None:
+                    fd, temp_path = tempfile.mkstemp(suffix='.jpg')
+                    os.close(fd)
+                    cv2.imwrite(temp_path, frame)
+                    image_path = temp_path
+
+                start = time.perf_counter()
+                try:
+                    result = reader.read(image_path=image_path, frame=frame, calibration=calibration)
+                except Exception as e:
+                    logging.error(f"[VISION] {reader.name} failed: {e}")
+                    result = {'temperature': None, 'confidence': 'ERROR', 'raw_response': str(e)}
+                latency = (time.perf_counter() - start) * 1000
+
+                with self.lock:
+                    stats.calls += 1
+                    stats.latencies.append(latency)
+                    if result.get('confidence') == 'ERROR':
+                        stats.errors += 1
+
+                if not self._is_confident(result):
+                    with self.lock:
+                        stats.escalated_low_confidence += 1
+                    escalations.append((reader.name, 'low_confidence'))
+                    if best is None or (CONFIDENCE_RANK.get(result.get('confidence'), 0) >
+                                        CONFIDENCE_RANK.get(best[1].get('confidence'), 0)):
+                        best = (reader, result)
+                    continue
+
+                temperature = result['temperature']
+                # A second backend agreeing with an off-trend reading confirms a real change
+                if candidate is not None and candidate[1]['temperature'] == temperature:
+                    return self._finish(reader, result, escalations)
+                if trend is None or abs(temperature - trend) <= self.trend_tolerance:
+                    return self._finish(reader, result, escalations)
+
+                with self.lock:
+                    stats.escalated_trend += 1
+                escalations.append((reader.name, 'trend'))
+                if candidate is None:
+                    candidate = (reader, result)
+
+            # Nothing confirmed: trust the cheapest confident reading so the
+            # trend can follow a real setpoint change, otherwise report failure
+            if candidate is not None:
+                return self._finish(candidate[0], candidate[1], escalations)
+
+            with self.lock:
+                self.unresolved_reads += 1
+                if escalations:
+                    self.escalated_reads += 1
+            if best is None:
+                return {'temperature': None, 'confidence': 'ERROR', 'raw_response': 'No vision backend available',
+                        'backend': None, 'escalations': escalations}
+            result = dict(best[1])
+            result['confidence'] = 'LOW' if result.get('confidence') != 'ERROR' else 'ERROR'
+            result['backend'] = best[0].name
+            result['escalations'] = escalations
+            return result
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+
+    def _finish(self, reader, result, escalations):
+        if escalations:
+            with self.lock:
+                self.escalated_reads += 1
+        return self._accept(reader, result, escalations)
+
+    def extract_temperature(self, image_path):
+        """Same contract as the LocalVisionAI classes"""
+        return self.read(image_path=image_path)
+
+    def get_stats(self):
+        """Cascade totals and per-backend counters"""
+        with self.lock:
+            return {
+                'reads': self.reads,
+                'escalated_reads': self.escalated_reads,
+                'unresolved_reads': self.unresolved_reads,
+                'min_confidence': self.min_confidence,
+                'trend': statistics.median(self.recent) if self.recent else None,
+                'backends': {name: stats.to_dict() for name, stats in self.stats.items()},
+            }
+
+    def load_model(self):
+        """Load every backend up front so the first reads do not pay for it"""
+        for reader in self.readers:
+            try:
+                reader.load_model()
+            except Exception as e:
+                # Left to fail (and be escalated past) at read time
+                logging.warning(f"Could not load {reader.name}: {e}")
+
+    def cleanup(self):
+        for reader in self.readers:
+            try:
+                reader.cleanup()
+            except Exception as e:
+                logging.warning(f"Error cleaning up {reader.name}: {e}")
+
+
+class GatedVisionReader(VisionReader):
+    """Puts the frame_gates quality and change gates in front of another reader"""
+
+    accepts_frames = True
+
+    def __init__(self, reader, change_gate=None, quality_gate=None):
+        """
+        Args:
+            reader: The reader (usually a cascade) to run on usable frames that changed
+            change_gate: ChangeGate instance (a default one if None)
+            quality_gate: QualityGate instance (a default one if None)
+        """
+        from frame_gates import ChangeGate, QualityGate
+        self.reader = reader
+        self.name = f"gated_{reader.name}"
+        self.change_gate = change_gate or ChangeGate()
+        self.quality_gate = quality_gate or QualityGate()
+        self.last_temperature = None  # Last confident reading, to tell a new value from a re-read
+
+    def read(self, image_path=None, frame=None, calibration=None):
+        """
+        Reject unusable frames, reuse the previous reading for unchanged ones, otherwise read
+
+        The result's 'display_changed' is True only when the digit region
+        visibly changed or the confident reading has a new value; failed
+        readings and periodic re-reads of the same display are not changes.
+        """
+        if frame is None:
+            frame = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if frame is None:
+                return {'temperature': None, 'confidence': 'ERROR',
+                        'raw_response': f"Could not load image: {image_path}",
+                        'backend': None, 'escalations': []}
+
+        verdict, metrics = self.quality_gate.check(frame, calibration)
+        if verdict != 'usable':
+            return {'temperature': None, 'confidence': 'LOW',
+                    'raw_response': f"Frame rejected: {verdict} " +
+                                    ', '.join(f"{key}={value:.2f}" for key, value in metrics.items()),
+                    'rejected': verdict, 'backend': None, 'escalations': []}
+
+        cached, signature, changed = self.change_gate.check(frame, calibration)
+        if cached is not None:
+            cached['display_changed'] = False
+            return cached
+
+        result = self.reader.read(image_path=image_path, frame=frame, calibration=calibration)
+        self.change_gate.remember(signature, result, calibration)
+        if result['temperature'] is not None and result['confidence'] in ('HIGH', 'MEDIUM'):
+            changed = changed or (self.last_temperature is not None and result['temperature'] != self.last_temperature)
+            self.last_temperature = result['temperature']
+        result['display_changed'] = changed
+        return result
+
+    def extract_temperature(self, image_path):
+        return self.read(image_path=image_path)
+
+    def get_stats(self):
+        stats = self.reader.get_stats() if hasattr(self.reader, 'get_stats') else {}
+        stats['quality_gate'] = self.quality_gate.get_stats()
+        stats['change_gate'] = self.change_gate.get_stats()
+        return stats
+
+    def load_model(self):
+        self.reader.load_model()
+
+    def cleanup(self):
+        self.reader.cleanup()
+
+
+def create_cascade(names=None, cache=True, **kwargs):
+    """
+    Build a cascade from backend names ordered cheapest first
+
+    Args:
+        names: List of backend names, or a comma-separated string (default: DEFAULT_BACKENDS)
+        cache: Put the expensive backends behind the shared result cache
+        **kwargs: Passed to CascadingVisionReader
+
+    Returns:
+        CascadingVisionReader
+    """
+    if names is None:
+        names = DEFAULT_BACKENDS
+    elif isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    return CascadingVisionReader([create_reader(name, cache=cache) for name in names], **kwargs)
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) > 1:
+        cascade = create_cascade(sys.argv[2] if len(sys.argv) > 2 else None)
+        result = cascade.read(image_path=sys.argv[1])
+        print(f"Temperature: {result['temperature']}")
+        print(f"Confidence: {result['confidence']}")
+        print(f"Backend: {result['backend']} (escalations: {result['escalations']})")
+        print(json.dumps(cascade.get_stats(), indent=2))
+    else:
+        print("Usage: python vision_reader.py <image_path> [backend,backend,...]")
@@ -3,6 +3,16 @@
 Centralized Vision Temperature Service
 This service continuously monitors the thermostat display using AI vision
 and writes the temperature to a file that multiple frontends can read.
+
+The work runs as a pipeline of four threads, capture -> decode -> infer ->
+publish. Latest-only mailboxes connect them, so capturing frame N+1
+overlaps reading frame N. A slow inference stage only ever sees the
+newest frame, and frames older than MAX_FRAME_AGE are dropped unread.
+Per-stage timings are written to the output file.
+
+Frames are captured on an adaptive schedule: every SAMPLE_MIN_INTERVAL
+seconds after a button press (signalled by main.py) or a display change,
+backing off towards SAMPLE_MAX_INTERVAL while the display stays the same.
 """
 
 import time
@@ -11,16 +21,29 @@ import os
 import logging
 import requests
 from datetime import datetime
-import subprocess
 import signal
 import sys
+import threading
+
+import cv2
+import numpy as np
+
+from display_calibration import load_calibration
+from frame_gates import ChangeGate, QualityGate
+from adaptive_sampler import ACTUATION_SIGNAL_FILE, AdaptiveSampler
+from frame_pipeline import DropOldestQueue, LatestMailbox, StageStats
+from vision_integration import read_temperature_with_claude
 
 # Configuration
-UPDATE_INTERVAL = 30  # Update every 30 seconds
+SAMPLE_MIN_INTERVAL = 5  # Seconds between captures after a button press or display change
+SAMPLE_MAX_INTERVAL = 300  # Slowest capture rate once the display has been stable
 OUTPUT_FILE = "/var/tmp/thermostat_temperature.json"
 LOG_FILE = "/var/log/vision_temperature_service.log"
 IMAGE_URL = "http://localhost:5000/video_feed"  # URL to get latest image
 TEMP_IMAGE_PATH = "/tmp/vision_temp_capture.jpg"
+MAX_FRAME_AGE = 60  # Frames older than this when inference is free are not read
+PUBLISH_QUEUE_SIZE = 4
+STAGES = ('capture', 'decode', 'infer', 'publish', 'end_to_end')
 
 # Set up logging
 logging.basicConfig(
@@ -38,6 +61,20 @@ class VisionTemperatureService:
         self.last_temperature = None
         self.last_update = None
         self.confidence = "LOW"
+        # Skip Claude for unreadable frames and when the digits look the
+        # same as at the last reading
+        self.quality_gate = QualityGate()
+        self.change_gate = ChangeGate()
+        self.sampler = AdaptiveSampler(min_interval=SAMPLE_MIN_INTERVAL, max_interval=SAMPLE_MAX_INTERVAL,
+                                       signal_file=ACTUATION_SIGNAL_FILE)
+        
+        # Pipeline plumbing: capture -> decode -> infer -> publish
+        self.stop_event = threading.Event()
+        self.frames = LatestMailbox()
+        self.to_infer = LatestMailbox()
+        self.to_publish = DropOldestQueue(PUBLISH_QUEUE_SIZE)
+        self.stage_stats = StageStats(STAGES)
+        self.frame_count = 0
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGTERM, self.handle_shutdown)
@@ -47,9 +84,15 @@ class VisionTemperatureService:
         """Handle shutdown signals gracefully"""
         logging.info(f"Received signal {signum}, shutting down...")
         self.running = False
+        self.stop_event.set()
         
     def capture_image(self):
-        """Capture the latest image from the thermostat camera"""
+        """
+        Capture the latest image from the thermostat camera
+        
+        Returns:
+            bytes: The JPEG, or None if no image could be obtained
+        """
         try:
             # Get the latest image from the Flask server
             response = requests.get(IMAGE_URL, timeout=10, stream=True)
@@ -70,17 +113,10 @@ class VisionTemperatureService:
                                 image_data += chunk.split(b'--frame')[0]
                                 break
                             image_data += chunk
-                        
-                        # Save image
-                        with open(TEMP_IMAGE_PATH, 'wb') as f:
-                            f.write(image_data)
-                        return True
+                        return image_data
             else:
                 # Direct image response
-                with open(TEMP_IMAGE_PATH, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                return True
+                return response.content
                 
         except Exception as e:
             logging.error(f"Error capturing image: {e}")
@@ -88,45 +124,23 @@ class VisionTemperatureService:
             try:
                 static_image_path = "/home/jason/smart-thermostat/static/images/latest_image.jpg"
                 if os.path.exists(static_image_path):
-                    # Copy the file
-                    subprocess.run(['cp', static_image_path, TEMP_IMAGE_PATH], check=True)
-                    return True
+                    with open(static_image_path, 'rb') as f:
+                        return f.read()
             except Exception as e2:
                 logging.error(f"Error using static image: {e2}")
                 
-        return False
+        return None
         
-    def get_claude_temperature(self):
+    def get_claude_temperature(self, image_path=TEMP_IMAGE_PATH):
         """Get temperature reading from Claude"""
         try:
-            # Use the claude command to read the temperature
-            claude_path = '/home/jason/.nvm/versions/node/v18.20.8/bin/claude'
-            prompt = f"Look at {TEMP_IMAGE_PATH} - what temperature number is shown on this thermostat display? Reply with just the number."
-            
-            result = subprocess.run(
-                [claude_path, prompt],
-                capture_output=True,
-                text=True,
-                timeout=20
-            )
-            
-            if result.returncode == 0:
-                response = result.stdout.strip()
-                try:
-                    # Extract just the number
-                    temp = int(response.replace('°F', '').replace('°', '').strip())
-                    if 50 <= temp <= 90:
-                        logging.info(f"Claude read temperature: {temp}°F")
-                        return temp
-                    else:
-                        logging.warning(f"Temperature {temp} out of valid range")
-                except ValueError:
-                    logging.error(f"Could not parse temperature from response: {response}")
-            else:
-                logging.error(f"Claude command failed: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            logging.error("Claude command timed out")
+            # The long-lived Claude session in vision_integration avoids
+            # starting the CLI for every reading
+            result = read_temperature_with_claude(image_path, timeout=20)
+            if result['temperature'] is not None:
+                logging.info(f"Claude read temperature: {result['temperature']}°F")
+                return result['temperature']
+            logging.error(f"Claude gave no usable temperature: {result['raw_response']}")
         except Exception as e:
             logging.error(f"Error getting Claude temperature: {e}")
             
@@ -148,7 +162,11 @@ class VisionTemperatureService:
                 "temperature": self.last_temperature,
                 "timestamp": self.last_update.isoformat() if self.last_update else None,
                 "confidence": self.confidence,
-                "age_seconds": (datetime.now() - self.last_update).total_seconds() if self.last_update else None
+                "age_seconds": (datetime.now() - self.last_update).total_seconds() if self.last_update else None,
+                "quality_gate": self.quality_gate.get_stats(),
+                "change_gate": self.change_gate.get_stats(),
+                "pipeline": self.get_pipeline_stats(),
+                "sampler": self.sampler.get_stats()
             }
             
             # Write to a temporary file first, then move it atomically
@@ -167,56 +185,130 @@ class VisionTemperatureService:
         except Exception as e:
             logging.error(f"Error writing temperature file: {e}")
             
-    def run_update_cycle(self):
-        """Run a single update cycle"""
-        try:
-            # Capture image
-            if self.capture_image():
-                # Get temperature from Claude
-                temp = self.get_claude_temperature()
-                
-                if temp is not None:
-                    self.last_temperature = temp
-                    self.last_update = datetime.now()
-                    self.confidence = "HIGH"
-                else:
-                    # Update confidence based on age of last reading
-                    if self.last_update:
-                        age = (datetime.now() - self.last_update).total_seconds()
-                        self.confidence = self.calculate_confidence(age)
-                        
-                # Always write the file, even if we couldn't get a new reading
-                self.write_temperature_file()
+    def get_pipeline_stats(self):
+        """Per-stage timings and drops, including frames replaced in the mailboxes"""
+        stats = self.stage_stats.get_stats()
+        stats['decode']['superseded'] = self.frames.dropped
+        stats['infer']['superseded'] = self.to_infer.dropped
+        stats['publish']['overflowed'] = self.to_publish.dropped
+        return stats
+        
+    def capture_loop(self):
+        """Stage 1: fetch a frame whenever the sampler says one is due, whatever the later stages are doing"""
+        while self.sampler.wait(self.stop_event):
+            cycle_start = time.monotonic()
+            with self.stage_stats.timed('capture'):
+                image = self.capture_image()
+            if image:
+                self.frame_count += 1
+                self.frames.put({'frame_id': self.frame_count, 'image': image,
+                                 'captured_at': cycle_start, 'captured_time': datetime.now()})
             else:
                 logging.warning("Failed to capture image")
-                # Still update confidence and write file
-                if self.last_update:
+                self.to_publish.put({'frame_id': None, 'captured_at': cycle_start, 'temperature': None,
+                                     'source': 'no_frame'})
+            
+    def decode_loop(self):
+        """Stage 2: decode and gate; unchanged displays skip inference entirely"""
+        while not self.stop_event.is_set():
+            item = self.frames.get(timeout=1)
+            if item is None:
+                continue
+            with self.stage_stats.timed('decode'):
+                frame = cv2.imdecode(np.frombuffer(item['image'], dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+                if frame is None:
+                    item.update(temperature=None, source='undecodable')
+                    self.to_publish.put(item)
+                    continue
+                calibration = load_calibration()
+                verdict, metrics = self.quality_gate.check(frame, calibration)
+                if verdict != 'usable':
+                    logging.info(f"Skipping unusable frame ({verdict}): {metrics}")
+                    item.update(temperature=None, source=verdict)
+                    self.to_publish.put(item)
+                    continue
+                cached, signature, changed = self.change_gate.check(frame, calibration)
+                if cached is not None:
+                    # Display unchanged, so the last reading is still current
+                    logging.info(f"Display unchanged, reusing {cached['temperature']}°F")
+                    item.update(temperature=cached['temperature'], source='reused')
+                    self.to_publish.put(item)
+                    continue
+                item.update(signature=signature, calibration=calibration, display_changed=changed)
+            self.to_infer.put(item)
+            
+    def infer_loop(self):
+        """Stage 3: read the newest changed frame with Claude, dropping stale ones"""
+        while not self.stop_event.is_set():
+            item = self.to_infer.get(timeout=1)
+            if item is None:
+                continue
+            if time.monotonic() - item['captured_at'] > MAX_FRAME_AGE:
+                self.stage_stats.drop('infer')
+                continue
+            with self.stage_stats.timed('infer'):
+                # Each frame gets its own file so the capture stage never overwrites it mid-read
+                image_path = f"{TEMP_IMAGE_PATH[:-4]}_{item['frame_id']}.jpg"
+                with open(image_path, 'wb') as f:
+                    f.write(item['image'])
+                try:
+                    temp = self.get_claude_temperature(image_path)
+                finally:
+                    os.remove(image_path)
+                self.change_gate.remember(
+                    item['signature'], {'temperature': temp, 'confidence': 'HIGH' if temp is not None else 'ERROR'},
+                    item['calibration'])
+            item.update(temperature=temp, source='claude')
+            self.to_publish.put(item)
+            
+    def publish_loop(self):
+        """Stage 4: fold each outcome into the current reading and write the file"""
+        while not self.stop_event.is_set():
+            item = self.to_publish.get(timeout=1)
+            if item is None:
+                continue
+            with self.stage_stats.timed('publish'):
+                # Speed up only after a real change: the digit region moved past the
+                # change gate's threshold, or the reading has a new value. Failed
+                # reads and periodic re-reads of the same display do not count.
+                changed = item.get('display_changed', False) or (
+                    item['temperature'] is not None and self.last_temperature is not None
+                    and item['temperature'] != self.last_temperature)
+                self.sampler.observe(changed=changed)
+                if item['temperature'] is not None:
+                    self.last_temperature = item['temperature']
+                    self.last_update = item['captured_time']
+                    self.confidence = "HIGH"
+                elif self.last_update:
+                    # Update confidence based on age of last reading
                     age = (datetime.now() - self.last_update).total_seconds()
                     self.confidence = self.calculate_confidence(age)
-                    self.write_temperature_file()
                     
-        except Exception as e:
-            logging.error(f"Error in update cycle: {e}")
+                # Always write the file, even if we couldn't get a new reading
+                if item['temperature'] is not None or self.last_update or item['source'] != 'no_frame':
+                    self.write_temperature_file()
+            self.stage_stats.record('end_to_end', (time.monotonic() - item['captured_at']) * 1000)
             
     def run(self):
-        """Main service loop"""
+        """Start the pipeline stages and wait for shutdown"""
         logging.info("Vision Temperature Service starting...")
         
-        # Initial update
-        self.run_update_cycle()
-        
+        threads = [threading.Thread(target=loop, name=name, daemon=True)
+                   for name, loop in (('capture', self.capture_loop), ('decode', self.decode_loop),
+                                      ('infer', self.infer_loop), ('publish', self.publish_loop))]
+        for thread in threads:
+            thread.start()
+            
         # Main loop
         while self.running:
-            try:
-                # Wait for the update interval
-                time.sleep(UPDATE_INTERVAL)
-                
-                if self.running:
-                    self.run_update_cycle()
-                    
-            except Exception as e:
-                logging.error(f"Unexpected error in main loop: {e}")
-                time.sleep(5)  # Brief pause before continuing
+            self.stop_event.wait(1)
+            
+        self.stop_event.set()
+        for mailbox in (self.frames, self.to_infer, self.to_publish):
+            mailbox.close()
+        for thread in threads:
+            # Inference may be mid-call; it is a daemon thread, so do not wait long
+            thread.join(timeout=5)
                 
         logging.info("Vision Temperature Service stopped")
         
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Long-lived external vision workers
+
+Calling the Claude CLI with subprocess.run for every reading pays Node
+start-up and process creation each time. ExternalVisionPool keeps one or
+more worker processes running, and talks to each one over stdin/stdout,
+one JSON object per line. Requests wait in a bounded queue and each one
+carries a deadline. A request whose deadline passes while it waits is
+dropped unsent. A worker that misses a deadline mid-request is killed and
+restarted.
+
+Two codecs describe the wire format:
+
+  LineCodec    {"id": 1, "image_path": ..., "prompt": ...} in,
+               {"id": 1, "text": ...} or {"id": 1, "error": ...} out.
+               Any model server (or debug/stub_vision_worker.py) can speak it.
+  ClaudeStreamCodec
+               The Claude CLI's stream-json mode. It sends one user message
+               per request and reads events until the "result" event. The
+               session keeps the conversation, so workers are recycled after
+               max_requests to keep the context small.
+
+    pool = ExternalVisionPool([sys.executable, 'debug/stub_vision_worker.py'], LineCodec())
+    text = pool.ask('/tmp/frame.jpg', 'What temperature is shown?', timeout=15)
+"""
+
+import json
+import logging
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_TIMEOUT = 20  # Seconds from submit to answer
+MAX_REQUESTS_PER_WORKER = 50
+MAX_QUEUED = 8  # Requests waiting for a worker before submit() refuses more
+
+
+class VisionWorkerError(Exception):
+    """The worker answered with an error or could not be reached"""
+
+
+class VisionWorkerUnavailable(VisionWorkerError):
+    """The worker process could not be started or exited"""
+
+
+class LineCodec:
+    """Plain request/response protocol with ids"""
+
+    def encode(self, request_id, image_path, prompt):
+        return {'id': request_id, 'image_path': image_path, 'prompt': prompt}
+
+    def decode(self, message, request_id):
+        """
+        Interpret one output line
+
+        Returns:
+            str or None: The answer text, or None if more lines follow
+        """
+        if message.get('id') != request_id:
+            # A late answer to a request that was already abandoned
+            return None
+        if 'error' in message:
+            raise VisionWorkerError(message['error'])
+        return message.get('text', '')
+
+
+class ClaudeStreamCodec:
+    """Claude CLI `-p --input-format stream-json --output-format stream-json`"""
+
+    def encode(self, request_id, image_path, prompt):
+        return {'type': 'user', 'message': {'role': 'user', 'content': [{'type': 'text', 'text': prompt}]}}
+
+    def decode(self, message, request_id):
+        if message.get('type') != 'result':
+            return None  # system, assistant and tool events precede the result
+        if message.get('is_error'):
+            raise VisionWorkerError(message.get('result') or message.get('subtype', 'error'))
+        return message.get('result', '')
+
+
+def claude_stream_command(claude_path):
+    """Command line that keeps a Claude CLI session reading requests from stdin"""
+    return [claude_path, '-p', '--input-format', 'stream-json', '--output-format', 'stream-json', '--verbose']
+
+
+class ExternalVisionWorker:
+    """One worker process and a thread that reads its output lines"""
+
+    def __init__(self, command, codec, name):
+        self.command = command
+        self.codec = codec
+        self.name = name
+        self.requests = 0
+        self.lines = queue.Queue()
+        try:
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE, text=True, bufsize=1)
+        except OSError as e:
+            raise VisionWorkerUnavailable(f"Could not start {command[0]}: {e}")
+        threading.Thread(target=self._read_stdout, daemon=True, name=f"{name}-stdout").start()
+        threading.Thread(target=self._read_stderr, daemon=True, name=f"{name}-stderr").start()
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.lines.put(json.loads(line))
+            except ValueError:
+                logging.debug(f"[{self.name}] Ignoring non-JSON output: {line[:200]}")
+        self.lines.put(None)  # EOF: the process exited
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            logging.debug(f"[{self.name}] {line.rstrip()}")
+
+    def request(self, request_id, image_path, prompt, deadline):
+        """Send one request and wait for its answer until the deadline"""
+        if self.process.poll() is not None:
+            raise VisionWorkerUnavailable(f"{self.name} exited with code {self.process.returncode}")
+        try:
+            self.process.stdin.write(json.dumps(self.codec.encode(request_id, image_path, prompt)) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise VisionWorkerUnavailable(f"{self.name} stdin closed: {e}")
+        self.requests += 1
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{self.name} missed the deadline")
+            try:
+                message = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(f"{self.name} missed the deadline")
+            if message is None:
+                raise VisionWorkerUnavailable(f"{self.name} exited mid-request")
+            text = self.codec.decode(message, request_id)
+            if text is not None:
+                return text
+
+    def stop(self, timeout=2):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+
+class ExternalVisionPool:
+    """Queue of vision requests served by long-lived worker processes"""
+
+    def __init__(self, command, codec=None, workers=1, max_requests=MAX_REQUESTS_PER_WORKER,
+                 max_queued=MAX_QUEUED, name='vision-worker'):
+        """
+        Args:
+            command: Worker command line (list)
+            codec: LineCodec (default) or ClaudeStreamCodec
+            workers: Number of worker processes, each serving one request at a time
+            max_requests: Requests after which a worker is restarted
+            max_queued: Waiting requests beyond which submit() raises VisionWorkerError
+            name: Prefix for thread and log names
+        """
+        self.command = list(command)
+        self.codec = codec or LineCodec()
+        self.size = workers
+        self.max_requests = max_requests
+        self.name = name
+        self.pending = queue.Queue(maxsize=max_queued)
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.started = False
+        self.stats = {'requests': 0, 'answered': 0, 'errors': 0, 'timeouts': 0, 'expired': 0,
+                      'rejected': 0, 'restarts': 0, 'queue_wait_ms': 0.0, 'service_ms': 0.0}
+
+    def start(self):
+        """Start the dispatcher threads; processes start lazily in them"""
+        with self.lock:
+            if self.started:
+                return self
+            self.started = True
+        for index in range(self.size):
+            threading.Thread(target=self._serve, args=(f"{self.name}-{index}",), daemon=True,
+                             name=f"{self.name}-{index}").start()
+        return self
+
+    def _serve(self, name):
+        """Dispatcher loop owning one worker process"""
+        worker = None
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            request_id, image_path, prompt, deadline, submitted, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.monotonic()
+            if start >= deadline:
+                with self.lock:
+                    self.stats['expired'] += 1
+                future.set_exception(TimeoutError("Request expired while queued"))
+                continue
+
+            try:
+                if worker is None:
+                    worker = ExternalVisionWorker(self.command, self.codec, name)
+                text = worker.request(request_id, image_path, prompt, deadline)
+            except TimeoutError as e:
+                with self.lock:
+                    self.stats['timeouts'] += 1
+                    self.stats['restarts'] += 1
+                worker.stop(timeout=0)
+                worker = None
+                future.set_exception(e)
+                continue
+            except VisionWorkerUnavailable as e:
+                with self.lock:
+                    self.stats['errors'] += 1
+                if worker is not None:
+                    worker.stop(timeout=0)
+                    worker = None
+                future.set_exception(e)
+                continue
+            except VisionWorkerError as e:
+                with self.lock:
+                    self.stats['errors'] += 1
+                future.set_exception(e)
+                continue
+
+            with self.lock:
+                self.stats['answered'] += 1
+                self.stats['queue_wait_ms'] += (start - submitted) * 1000
+                self.stats['service_ms'] += (time.monotonic() - start) * 1000
+            future.set_result(text)
+
+            if worker.requests >= self.max_requests:
+                with self.lock:
+                    self.stats['restarts'] += 1
+                worker.stop()
+                worker = None
+        if worker is not None:
+            worker.stop()
+
+    def submit(self, image_path, prompt, timeout=DEFAULT_TIMEOUT):
+        """
+        Queue a request
+
+        Returns:
+            concurrent.futures.Future resolving to the answer text
+        """
+        if not self.started:
+            self.start()
+        future = Future()
+        now = time.monotonic()
+        with self.lock:
+            self.next_id += 1
+            request_id = self.next_id
+            self.stats['requests'] += 1
+        try:
+            self.pending.put_nowait((request_id, image_path, prompt, now + timeout, now, future))
+        except queue.Full:
+            with self.lock:
+                self.stats['rejected'] += 1
+            raise VisionWorkerError(f"{self.pending.maxsize} requests already queued")
+        return future
+
+    def ask(self, image_path, prompt, timeout=DEFAULT_TIMEOUT):
+        """Submit a request and wait for its answer text"""
+        future = self.submit(image_path, prompt, timeout)
+        # The dispatcher enforces the deadline; the margin covers a worker restart
+        return future.result(timeout=timeout + 5)
+
+    def get_stats(self):
+        with self.lock:
+            answered = self.stats['answered']
+            return {
+                'command': self.command[0],
+                'workers': self.size,
+                'queued': self.pending.qsize(),
+                'requests': self.stats['requests'],
+                'answered': answered,
+                'errors': self.stats['errors'],
+                'timeouts': self.stats['timeouts'],
+                'expired': self.stats['expired'],
+                'rejected': self.stats['rejected'],
+                'restarts': self.stats['restarts'],
+                'queue_wait_mean_ms': self.stats['queue_wait_ms'] / answered if answered else None,
+                'service_mean_ms': self.stats['service_ms'] / answered if answered else None,
+            }
+
+    def stop(self):
+        """Stop the dispatchers after the queued requests; workers exit with them"""
+        with self.lock:
+            if not self.started:
+                return
+            self.started = False
+        for _ in range(self.size):
+            self.pending.put(None)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Send images to a long-lived vision worker")
+    parser.add_argument('images', nargs='+', help='Images to read')
+    parser.add_argument('--command', default=f"{sys.executable} debug/stub_vision_worker.py",
+                        help='Worker command line (default: the stub worker)')
+    parser.add_argument('--claude', action='store_true', help='Command is the Claude CLI in stream-json mode')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='Per-request deadline in seconds')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.claude:
+        pool = ExternalVisionPool(claude_stream_command(args.command), ClaudeStreamCodec())
+    else:
+        pool = ExternalVisionPool(args.command.split(), LineCodec())
+    for image_path in args.images:
+        start = time.perf_counter()
+        try:
+            text = pool.ask(image_path, f"Look at {image_path} - what temperature number is shown on this "
+                                        f"thermostat display? Reply with just the number.", timeout=args.timeout)
+        except Exception as e:
+            text = f"error: {e}"
+        print(f"{image_path}: {text} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    print(json.dumps(pool.get_stats(), indent=2))
+    pool.stop()